@@ -0,0 +1,87 @@
+"""add exclusion constraint against overlapping bookings
+
+Revision ID: f6a7b8c9d0e1
+Revises: e5f6a7b8c9d0
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6a7b8c9d0e1'
+down_revision = 'e5f6a7b8c9d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # btree_gist lets the GiST index compare service_id with "="
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.execute("""
+        ALTER TABLE bookings
+        ADD COLUMN during tstzrange
+        GENERATED ALWAYS AS (tstzrange(start_time, end_time, '[)')) STORED
+    """)
+    # Nothing prevented double-booking before this constraint. Confirmed
+    # and completed bookings may be paid for or already happened, so they
+    # are never cancelled here: if two of them overlap, stop and report
+    # them for someone to resolve by hand. Pending requests give way to
+    # them, and to older pending requests, walking in id order so a
+    # request is only cancelled for clashing with one that stays live.
+    op.execute("""
+        DO $$
+        DECLARE
+            b record;
+            clashes text;
+            cancelled integer := 0;
+        BEGIN
+            SELECT string_agg(format('%s/%s', older.id, mine.id), ', ' ORDER BY older.id, mine.id)
+            INTO clashes
+            FROM bookings mine
+            JOIN bookings older
+              ON older.service_id = mine.service_id
+             AND older.id < mine.id
+             AND older.during && mine.during
+            WHERE mine.status IN ('CONFIRMED', 'COMPLETED')
+              AND older.status IN ('CONFIRMED', 'COMPLETED');
+            IF clashes IS NOT NULL THEN
+                RAISE EXCEPTION 'Confirmed or completed bookings overlap: %', clashes
+                    USING HINT = 'Cancel or move one booking of each id pair, then run this migration again';
+            END IF;
+
+            FOR b IN
+                SELECT id, service_id, during FROM bookings
+                WHERE status = 'PENDING'
+                ORDER BY id
+            LOOP
+                UPDATE bookings SET status = 'CANCELLED', updated_at = now()
+                WHERE id = b.id AND EXISTS (
+                    SELECT 1 FROM bookings other
+                    WHERE other.service_id = b.service_id
+                      AND other.id <> b.id
+                      AND other.during && b.during
+                      AND (other.status IN ('CONFIRMED', 'COMPLETED')
+                           OR (other.status = 'PENDING' AND other.id < b.id))
+                );
+                IF FOUND THEN
+                    cancelled := cancelled + 1;
+                    RAISE NOTICE 'Cancelled pending booking % (overlaps a live booking)', b.id;
+                END IF;
+            END LOOP;
+            IF cancelled > 0 THEN
+                RAISE NOTICE 'Cancelled % overlapping pending bookings', cancelled;
+            END IF;
+        END $$
+    """)
+    op.execute("""
+        ALTER TABLE bookings
+        ADD CONSTRAINT bookings_no_overlap
+        EXCLUDE USING gist (service_id WITH =, during WITH &&)
+        WHERE (status <> 'CANCELLED')
+    """)
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE bookings DROP CONSTRAINT IF EXISTS bookings_no_overlap")
+    op.drop_column('bookings', 'during')
@@ -0,0 +1,65 @@
+"""denormalize provider_id onto bookings
+
+Revision ID: c9d0e1f2a3b4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9d0e1f2a3b4'
+down_revision = 'b8c9d0e1f2a3'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    # Nullable without a default: a catalog-only change, no table rewrite
+    op.add_column('bookings', sa.Column('provider_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'bookings_provider_id_fkey', 'bookings', 'users', ['provider_id'], ['id'],
+        postgresql_not_valid=True,
+    )
+
+    # Backfill and index outside the migration transaction: each batch
+    # commits on its own so row locks are short-lived, and the indexes
+    # are built concurrently so writes keep flowing.
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        max_id = bind.execute(sa.text("SELECT coalesce(max(id), 0) FROM bookings")).scalar()
+        for low in range(0, max_id + 1, BATCH_SIZE):
+            bind.execute(sa.text("""
+                UPDATE bookings b SET provider_id = s.provider_id
+                FROM services s
+                WHERE s.id = b.service_id
+                  AND b.id >= :low AND b.id < :high
+                  AND b.provider_id IS NULL
+            """), {"low": low, "high": low + BATCH_SIZE})
+        # Rows inserted by the old code while the loop ran
+        bind.execute(sa.text("""
+            UPDATE bookings b SET provider_id = s.provider_id
+            FROM services s
+            WHERE s.id = b.service_id AND b.provider_id IS NULL AND b.id > :max_id
+        """), {"max_id": max_id})
+
+        bind.execute(sa.text("ALTER TABLE bookings VALIDATE CONSTRAINT bookings_provider_id_fkey"))
+        bind.execute(sa.text("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bookings_provider_id_start_time
+            ON bookings (provider_id, start_time, id)
+        """))
+        bind.execute(sa.text("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bookings_customer_id_created_at
+            ON bookings (customer_id, created_at, id)
+        """))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_bookings_customer_id_created_at', table_name='bookings')
+    op.drop_index('ix_bookings_provider_id_start_time', table_name='bookings')
+    op.drop_constraint('bookings_provider_id_fkey', 'bookings', type_='foreignkey')
+    op.drop_column('bookings', 'provider_id')
@@ -0,0 +1,75 @@
+"""add booking series
+
+Revision ID: f2a3b4c5d6e7
+Revises: e1f2a3b4c5d6
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a3b4c5d6e7'
+down_revision = 'e1f2a3b4c5d6'
+branch_labels = None
+depends_on = None
+
+# Reuse the enum created with the bookings table
+booking_status = postgresql.ENUM(
+    'PENDING', 'CONFIRMED', 'CANCELLED', 'COMPLETED', name='bookingstatus', create_type=False)
+
+
+def upgrade() -> None:
+    op.create_table('booking_series',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('service_id', sa.Integer(), nullable=False),
+    sa.Column('provider_id', sa.Integer(), nullable=True),
+    sa.Column('start_time', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('rrule', sa.String(), nullable=False),
+    sa.Column('timezone', sa.String(), nullable=False),
+    sa.Column('duration_minutes', sa.Integer(), nullable=False),
+    sa.Column('series_end', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('span', postgresql.TSTZRANGE(),
+              sa.Computed("tstzrange(start_time, series_end, '[)')", persisted=True)),
+    sa.Column('status', booking_status, nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['customer_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['service_id'], ['services.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['provider_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_booking_series_id'), 'booking_series', ['id'], unique=False)
+    op.create_index('ix_booking_series_customer_id', 'booking_series', ['customer_id'], unique=False)
+    # GiST over (service_id, span) relies on btree_gist (installed with
+    # the booking overlap constraint)
+    op.create_index(
+        'ix_booking_series_service_span', 'booking_series', ['service_id', 'span'],
+        unique=False, postgresql_using='gist',
+        postgresql_where=sa.text("status <> 'CANCELLED'"),
+    )
+
+    op.add_column('bookings', sa.Column('series_id', sa.Integer(), nullable=True))
+    op.add_column('bookings', sa.Column('occurrence_start', sa.DateTime(timezone=True), nullable=True))
+    op.create_foreign_key(
+        'bookings_series_id_fkey', 'bookings', 'booking_series',
+        ['series_id'], ['id'], ondelete='CASCADE')
+    op.create_index(
+        'ix_bookings_series_occurrence', 'bookings', ['series_id', 'occurrence_start'],
+        unique=True, postgresql_where=sa.text('series_id IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_bookings_series_occurrence', table_name='bookings')
+    op.drop_constraint('bookings_series_id_fkey', 'bookings', type_='foreignkey')
+    op.drop_column('bookings', 'occurrence_start')
+    op.drop_column('bookings', 'series_id')
+    op.drop_index('ix_booking_series_service_span', table_name='booking_series')
+    op.drop_index('ix_booking_series_customer_id', table_name='booking_series')
+    op.drop_index(op.f('ix_booking_series_id'), table_name='booking_series')
+    op.drop_table('booking_series')
@@ -0,0 +1,37 @@
+"""add booking_series.week_hours
+
+Revision ID: e7f8a9b0c1d2
+Revises: d6e7f8a9b0c1
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7f8a9b0c1d2'
+down_revision = 'd6e7f8a9b0c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('booking_series', sa.Column(
+        'week_hours', postgresql.ARRAY(sa.SmallInteger()), nullable=True))
+    # Existing series are not re-expanded here: marking every hour keeps
+    # them conflict candidates for any slot, as before
+    op.execute(
+        "UPDATE booking_series SET week_hours = ARRAY(SELECT generate_series(0, 167))::smallint[]")
+    op.alter_column('booking_series', 'week_hours', nullable=False)
+    op.create_index(
+        'ix_booking_series_week_hours', 'booking_series', ['week_hours'],
+        unique=False, postgresql_using='gin',
+        postgresql_where=sa.text("status <> 'CANCELLED'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_booking_series_week_hours', table_name='booking_series')
+    op.drop_column('booking_series', 'week_hours')
@@ -0,0 +1,29 @@
+"""add checkout slot holds to bookings
+
+Revision ID: a7b8c9d0e1f2
+Revises: f6a7b8c9d0e1
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7b8c9d0e1f2'
+down_revision = 'f6a7b8c9d0e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('bookings', sa.Column('hold_expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        'ix_bookings_hold_expires_at', 'bookings', ['hold_expires_at'], unique=False,
+        postgresql_where=sa.text("hold_expires_at IS NOT NULL AND status = 'PENDING'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_bookings_hold_expires_at', table_name='bookings')
+    op.drop_column('bookings', 'hold_expires_at')
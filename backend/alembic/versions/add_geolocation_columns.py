@@ -0,0 +1,34 @@
+"""add geolocation columns to services and provider profiles
+
+Revision ID: e5f6a7b8c9d0
+Revises: d4e5f6a7b8c9
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5f6a7b8c9d0'
+down_revision = 'd4e5f6a7b8c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Coordinates plus a geohash; "C" collation keeps prefix LIKE index-friendly.
+    # Populate with `python geocode_locations.py` after upgrading.
+    for table in ('services', 'provider_profiles'):
+        op.add_column(table, sa.Column('latitude', sa.Float(), nullable=True))
+        op.add_column(table, sa.Column('longitude', sa.Float(), nullable=True))
+        op.add_column(table, sa.Column('geohash', sa.String(length=12, collation='C'), nullable=True))
+        op.create_index(op.f(f'ix_{table}_geohash'), table, ['geohash'], unique=False)
+
+
+def downgrade() -> None:
+    for table in ('provider_profiles', 'services'):
+        op.drop_index(op.f(f'ix_{table}_geohash'), table_name=table)
+        op.drop_column(table, 'geohash')
+        op.drop_column(table, 'longitude')
+        op.drop_column(table, 'latitude')
@@ -0,0 +1,44 @@
+"""add rating aggregates to services
+
+Revision ID: a1b2c3d4e5f6
+Revises: def456789abc
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1b2c3d4e5f6'
+down_revision = 'def456789abc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Denormalized review totals so listings don't aggregate reviews per row
+    op.add_column('services', sa.Column('rating_sum', sa.Float(),
+                  server_default='0', nullable=False))
+    op.add_column('services', sa.Column('review_count', sa.Integer(),
+                  server_default='0', nullable=False))
+    op.create_index(op.f('ix_reviews_service_id'), 'reviews', ['service_id'], unique=False)
+
+    # Backfill from existing reviews
+    op.execute("""
+        UPDATE services SET
+            rating_sum = COALESCE(r.rating_sum, 0),
+            review_count = COALESCE(r.review_count, 0)
+        FROM (
+            SELECT service_id, SUM(rating) AS rating_sum, COUNT(id) AS review_count
+            FROM reviews
+            GROUP BY service_id
+        ) AS r
+        WHERE r.service_id = services.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_reviews_service_id'), table_name='reviews')
+    op.drop_column('services', 'review_count')
+    op.drop_column('services', 'rating_sum')
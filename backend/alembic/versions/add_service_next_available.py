@@ -0,0 +1,34 @@
+"""add next_available_at projection to services
+
+Revision ID: b8c9d0e1f2a3
+Revises: a7b8c9d0e1f2
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8c9d0e1f2a3'
+down_revision = 'a7b8c9d0e1f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Populate with `python refresh_next_available.py` after upgrading;
+    # the API's rollover job also fills it in gradually.
+    op.add_column('services', sa.Column('next_available_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(op.f('ix_services_next_available_at'), 'services', ['next_available_at'], unique=False)
+    # Must match Service.next_available_sort so keyset pages use it
+    op.execute("""
+        CREATE INDEX ix_services_next_available_sort_id ON services
+        (coalesce(next_available_at, '9999-12-31 00:00:00+00'::timestamptz), id)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_services_next_available_sort_id', table_name='services')
+    op.drop_index(op.f('ix_services_next_available_at'), table_name='services')
+    op.drop_column('services', 'next_available_at')
@@ -0,0 +1,49 @@
+"""add service popularity table
+
+Revision ID: d4e5f6a7b8c9
+Revises: c3d4e5f6a7b8
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4e5f6a7b8c9'
+down_revision = 'c3d4e5f6a7b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('service_popularity',
+    sa.Column('service_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['service_id'], ['services.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('service_id')
+    )
+    op.create_index(op.f('ix_service_popularity_score'), 'service_popularity', ['score'], unique=False)
+
+    # Backfill with the same forward-decay formula as app.core.popularity
+    # (epoch 2026-01-01 UTC, 14 day half-life)
+    op.execute("""
+        INSERT INTO service_popularity (service_id, score)
+        SELECT service_id, SUM(w * power(2.0,
+            extract(epoch FROM created_at - TIMESTAMPTZ '2026-01-01 00:00:00+00') / 1209600))
+        FROM (
+            SELECT service_id, 3.0 AS w, created_at FROM bookings
+            UNION ALL
+            SELECT service_id, rating / 5.0, created_at FROM reviews
+            UNION ALL
+            SELECT service_id, 2.0, created_at FROM favorites
+        ) AS events
+        WHERE service_id IS NOT NULL AND created_at IS NOT NULL
+        GROUP BY service_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_service_popularity_score'), table_name='service_popularity')
+    op.drop_table('service_popularity')
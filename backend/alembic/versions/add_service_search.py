@@ -0,0 +1,79 @@
+"""add service full-text and trigram search
+
+Revision ID: b7c8d9e0f1a2
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c8d9e0f1a2'
+down_revision = 'a1b2c3d4e5f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column('services', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    # Weighted document: name (A) > category (B) > description (C) > location (D)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION services_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(
+                    (SELECT name FROM categories WHERE id = NEW.category_id), '')), 'B') ||
+                setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C') ||
+                setweight(to_tsvector('english', coalesce(NEW.location, '')), 'D');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER services_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF name, description, location, category_id
+        ON services
+        FOR EACH ROW EXECUTE FUNCTION services_search_vector_update()
+    """)
+
+    # Renaming a category re-indexes its services
+    op.execute("""
+        CREATE OR REPLACE FUNCTION categories_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            UPDATE services SET category_id = category_id WHERE category_id = NEW.id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER categories_search_vector_trigger
+        AFTER UPDATE OF name ON categories
+        FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+        EXECUTE FUNCTION categories_search_vector_update()
+    """)
+
+    # Backfill existing rows through the trigger
+    op.execute("UPDATE services SET name = name")
+
+    op.create_index('ix_services_search_vector', 'services', ['search_vector'],
+                    unique=False, postgresql_using='gin')
+    op.create_index('ix_services_name_trgm', 'services', ['name'],
+                    unique=False, postgresql_using='gin',
+                    postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_services_name_trgm', table_name='services')
+    op.drop_index('ix_services_search_vector', table_name='services')
+    op.execute("DROP TRIGGER IF EXISTS categories_search_vector_trigger ON categories")
+    op.execute("DROP FUNCTION IF EXISTS categories_search_vector_update()")
+    op.execute("DROP TRIGGER IF EXISTS services_search_vector_trigger ON services")
+    op.execute("DROP FUNCTION IF EXISTS services_search_vector_update()")
+    op.drop_column('services', 'search_vector')
@@ -0,0 +1,26 @@
+"""add user calendar token
+
+Revision ID: a3b4c5d6e7f8
+Revises: f2a3b4c5d6e7
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3b4c5d6e7f8'
+down_revision = 'f2a3b4c5d6e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('calendar_token_hash', sa.String(), nullable=True))
+    op.create_unique_constraint('users_calendar_token_hash_key', 'users', ['calendar_token_hash'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('users_calendar_token_hash_key', 'users', type_='unique')
+    op.drop_column('users', 'calendar_token_hash')
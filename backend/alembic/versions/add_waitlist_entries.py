@@ -0,0 +1,65 @@
+"""add waitlist entries
+
+Revision ID: e1f2a3b4c5d6
+Revises: d0e1f2a3b4c5
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1f2a3b4c5d6'
+down_revision = 'd0e1f2a3b4c5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('waitlist_entries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('service_id', sa.Integer(), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('window_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('window_end', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('window', postgresql.TSTZRANGE(),
+              sa.Computed("tstzrange(window_start, window_end, '[)')", persisted=True)),
+    sa.Column('status', sa.Enum('WAITING', 'OFFERED', 'ACCEPTED', 'EXPIRED', 'CANCELLED',
+                                name='waitliststatus'), nullable=False),
+    sa.Column('booking_id', sa.Integer(), nullable=True),
+    sa.Column('offer_expires_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['service_id'], ['services.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['customer_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['booking_id'], ['bookings.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_waitlist_entries_id'), 'waitlist_entries', ['id'], unique=False)
+    # GiST over (service_id, window) relies on btree_gist (installed with
+    # the booking overlap constraint)
+    op.create_index(
+        'ix_waitlist_entries_waiting_window', 'waitlist_entries', ['service_id', 'window'],
+        unique=False, postgresql_using='gist',
+        postgresql_where=sa.text("status = 'WAITING'"),
+    )
+    op.create_index(
+        'ix_waitlist_entries_waiting_fifo', 'waitlist_entries',
+        ['service_id', 'created_at', 'id'], unique=False,
+        postgresql_where=sa.text("status = 'WAITING'"),
+    )
+    op.create_index(
+        'ix_waitlist_entries_offer_expires_at', 'waitlist_entries', ['offer_expires_at'],
+        unique=False, postgresql_where=sa.text("status = 'OFFERED'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_waitlist_entries_offer_expires_at', table_name='waitlist_entries')
+    op.drop_index('ix_waitlist_entries_waiting_fifo', table_name='waitlist_entries')
+    op.drop_index('ix_waitlist_entries_waiting_window', table_name='waitlist_entries')
+    op.drop_index(op.f('ix_waitlist_entries_id'), table_name='waitlist_entries')
+    op.drop_table('waitlist_entries')
+    sa.Enum(name='waitliststatus').drop(op.get_bind(), checkfirst=True)
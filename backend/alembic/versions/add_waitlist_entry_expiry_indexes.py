@@ -0,0 +1,55 @@
+"""retire lapsed waitlist entries and forbid duplicate active ones
+
+Revision ID: f8a9b0c1d2e3
+Revises: e7f8a9b0c1d2
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8a9b0c1d2e3'
+down_revision = 'e7f8a9b0c1d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        UPDATE waitlist_entries SET status = 'EXPIRED', updated_at = now()
+        WHERE status = 'WAITING' AND window_end <= now()
+    """)
+    # Keep one active entry per customer, service and window: an open
+    # offer if there is one, else the oldest. A superseded offer's hold
+    # lapses and is released by the hold sweeper as usual.
+    op.execute("""
+        UPDATE waitlist_entries e
+        SET status = CASE WHEN e.status = 'OFFERED' THEN 'EXPIRED'::waitliststatus
+                          ELSE 'CANCELLED'::waitliststatus END,
+            updated_at = now()
+        FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY customer_id, service_id, window_start, window_end
+                ORDER BY status = 'OFFERED' DESC, created_at, id
+            ) AS rank
+            FROM waitlist_entries
+            WHERE status IN ('WAITING', 'OFFERED')
+        ) ranked
+        WHERE e.id = ranked.id AND ranked.rank > 1
+    """)
+    op.create_index(
+        'ix_waitlist_entries_waiting_window_end', 'waitlist_entries', ['window_end'],
+        unique=False, postgresql_where=sa.text("status = 'WAITING'"),
+    )
+    op.create_index(
+        'ix_waitlist_entries_active_unique', 'waitlist_entries',
+        ['customer_id', 'service_id', 'window_start', 'window_end'], unique=True,
+        postgresql_where=sa.text("status IN ('WAITING', 'OFFERED')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_waitlist_entries_active_unique', table_name='waitlist_entries')
+    op.drop_index('ix_waitlist_entries_waiting_window_end', table_name='waitlist_entries')
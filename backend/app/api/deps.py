@@ -1,38 +1,135 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import jwt, JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from ..database import get_db
 from ..core.config import settings
+from ..core.principal import Principal, cached_user, principal_from_claims
+from ..core.revocation import is_revoked, revocations
+from ..core import ratelimit
+from ..core.ratelimit import rate_limiter
 from ..models.user import User
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
 )
 
-async def get_current_user(
-    db: AsyncSession = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> User:
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+def decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Could not validate credentials",
-            )
     except JWTError:
+        raise credentials_exception
+    if payload.get("sub") is None:
+        raise credentials_exception
+    return payload
+
+
+async def get_token_claims(token: str = Depends(reusable_oauth2)) -> dict:
+    return decode_token(token)
+
+
+async def get_current_principal(
+    claims: dict = Depends(get_token_claims),
+    db: AsyncSession = Depends(get_db),
+) -> Principal:
+    """
+    Id and role of the caller, taken from the token without a query.
+
+    Tokens issued before login put user_id in the claims are resolved
+    by email once. Revocation is checked against the in-memory filter;
+    only a hit costs a query.
+    """
+    principal = principal_from_claims(claims)
+    if principal is None:
+        result = await db.execute(select(User.id, User.role).where(User.email == claims["sub"]))
+        row = result.first()
+        if row is None:
+            raise credentials_exception
+        principal = Principal(id=row.id, role=row.role, email=claims["sub"])
+    flagged = revocations.might_be_revoked(claims.get("jti"), principal.id)
+    if flagged and await is_revoked(db, claims, principal.id):
+        raise credentials_exception
+    return principal
+
+
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    """The caller's User row, served from the principal cache when warm."""
+    user = await cached_user(db, principal.id)
+    if user is None:
+        raise credentials_exception
+    if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
+            detail="Your account has been deactivated. Please contact support.",
         )
-    
-    result = await db.execute(select(User).where(User.email == username))
-    user = result.scalar_one_or_none()
-    
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
     return user
+
+
+async def limit_auth(request: Request) -> None:
+    """Per-IP throttle for endpoints that hash passwords or call Google."""
+    await rate_limiter.enforce("auth", [(ratelimit.ip_key(request), ratelimit.AUTH_PER_IP)])
+
+
+async def limit_login(
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+) -> None:
+    """
+    Per-IP and per-account throttle for password login, checked before
+    any bcrypt work.
+
+    The account bucket is shared by every address, so guessing spread
+    over many addresses is still capped, but only failed logins drain it
+    (`charge_failed_login`): the owner signing in with the right password
+    never does. It applies whether or not the email exists, so
+    throttling reveals nothing about accounts.
+    """
+    await rate_limiter.enforce(
+        "login", [(ratelimit.account_key(form_data.username), ratelimit.LOGIN_PER_ACCOUNT)],
+        consume=False,
+    )
+    await rate_limiter.enforce("auth", [(ratelimit.ip_key(request), ratelimit.AUTH_PER_IP)])
+
+
+async def charge_failed_login(identifier: str) -> None:
+    """Count a failed password login against the account's bucket."""
+    await rate_limiter.charge(
+        "login", [(ratelimit.account_key(identifier), ratelimit.LOGIN_PER_ACCOUNT)])
+
+
+async def limit_refresh(request: Request) -> None:
+    """Per-IP throttle for token refresh, apart from the login budget."""
+    await rate_limiter.enforce("refresh", [(ratelimit.ip_key(request), ratelimit.REFRESH_PER_IP)])
+
+
+async def limit_booking_writes(
+    request: Request,
+    current_user: Principal = Depends(get_current_principal),
+) -> None:
+    await rate_limiter.enforce("booking", [
+        (ratelimit.ip_key(request), ratelimit.BOOKING_PER_IP),
+        (ratelimit.user_key(current_user.id), ratelimit.BOOKING_PER_ACCOUNT),
+    ])
+
+
+async def limit_checkout(
+    request: Request,
+    current_user: Principal = Depends(get_current_principal),
+) -> None:
+    await rate_limiter.enforce("checkout", [
+        (ratelimit.ip_key(request), ratelimit.CHECKOUT_PER_IP),
+        (ratelimit.user_key(current_user.id), ratelimit.CHECKOUT_PER_ACCOUNT),
+    ])
@@ -1,17 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from typing import List, Dict
+from typing import List, Dict, Literal, Optional, Union
+from datetime import datetime, timezone
 from ...database import get_db
 from ...models.user import User, UserRole
 from ...models.service import Service
 from ...models.booking import Booking
 from ...schemas.user import User as UserSchema
-from ...api.v1.auth import get_current_user
+from ...schemas.pagination import CursorPage
+from ...core.pagination import apply_keyset, keyset_page, sort_order
+from ...core.security import password_hasher
+from ...core.export import MEDIA_TYPES, booking_export_query, stream_export
+from ...core.tokens import revoke_user_tokens
+from .bookings import BookingFilters
+from ...core.principal import Principal, invalidate_user
+from ..deps import get_current_principal
 
 router = APIRouter()
 
-async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_admin(
+    current_user: Principal = Depends(get_current_principal)
+) -> Principal:
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -22,7 +33,7 @@ async def get_current_admin(current_user: User = Depends(get_current_user)) -> U
 @router.get("/stats")
 async def get_admin_stats(
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Get system-wide statistics for the admin dashboard
@@ -46,13 +57,31 @@ async def get_admin_stats(
         "bookings": total_bookings
     }
 
-@router.get("/users", response_model=List[UserSchema])
+@router.get("/metrics/password-hashing")
+async def get_password_hashing_metrics(admin: Principal = Depends(get_current_admin)):
+    """Load on the bcrypt thread pool: queue depth, rejections and latencies."""
+    return password_hasher.metrics()
+
+# Stable sort keys for the user listing, paired with User.id as tiebreaker
+USER_SORT_KEYS = {
+    "id": User.id,
+    "created_at": User.created_at,
+}
+
+@router.get("/users", response_model=Union[List[UserSchema], CursorPage[UserSchema]])
 async def list_users(
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(
+        None,
+        description="Opaque cursor from a previous page. Pass an empty value "
+                    "to start; the response is then a page with next_cursor.",
+    ),
+    sort: Literal["id", "created_at"] = "id",
+    order: Literal["asc", "desc"] = "asc",
     role: UserRole = None,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     List all users with optional role filtering
@@ -60,16 +89,28 @@ async def list_users(
     query = select(User)
     if role:
         query = query.where(User.role == role)
-    
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
+
+    key = USER_SORT_KEYS[sort]
+    descending = order == "desc"
+
+    if cursor is not None:
+        query = apply_keyset(query, key, User.id, sort, cursor, limit, descending)
+        result = await db.execute(query)
+        rows, next_cursor = keyset_page(result.all(), limit, sort, descending)
+        return CursorPage[UserSchema](
+            items=[UserSchema.model_validate(row[0]) for row in rows],
+            next_cursor=next_cursor,
+        )
+
+    query = query.order_by(*sort_order(key, User.id, descending))
+    result = await db.execute(query.offset(skip).limit(limit))
     return result.scalars().all()
 
 @router.get("/users/{user_id}", response_model=UserSchema)
 async def get_user_details(
     user_id: int,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Get detailed information about a specific user
@@ -79,3 +120,49 @@ async def get_user_details(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
+
+@router.patch("/users/{user_id}/active", response_model=UserSchema)
+async def set_user_active(
+    user_id: int,
+    is_active: bool,
+    db: AsyncSession = Depends(get_db),
+    admin: Principal = Depends(get_current_admin)
+):
+    """
+    Activate or deactivate a user. Deactivating revokes all of the user's
+    access and refresh tokens, so they are signed out everywhere at once.
+    """
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if user.id == admin.id and not is_active:
+        raise HTTPException(status_code=400, detail="Admins cannot deactivate themselves")
+    user.is_active = is_active
+    if not is_active:
+        await revoke_user_tokens(db, user.id)
+    await db.commit()
+    await db.refresh(user)
+    await invalidate_user(user.id)
+    return user
+
+@router.get("/bookings/export")
+async def export_bookings(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    filters: BookingFilters = Depends(),
+    admin: Principal = Depends(get_current_admin)
+):
+    """
+    Stream every booking matching the filters, with service and customer
+    columns, as NDJSON or CSV.
+
+    Rows are fetched through a server-side cursor and written as they
+    arrive (see app.core.export), so exports of any size use the same
+    memory.
+    """
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return StreamingResponse(
+        stream_export(filters.apply(booking_export_query()), format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="bookings-{stamp}.{format}"'},
+    )
@@ -1,60 +1,76 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
+from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from datetime import timedelta, datetime
-from jose import JWTError, jwt
 from pydantic import BaseModel
+from typing import Optional
 import re
 import logging
-import httpx
+import secrets
 from ...database import get_db
 from ...models.user import User
-from ...schemas.user import Token, UserCreate, User as UserSchema, UserProfileUpdate
+from ...schemas.user import (
+    Token,
+    RefreshTokenRequest,
+    LogoutRequest,
+    UserCreate,
+    User as UserSchema,
+    UserProfileUpdate,
+)
 from ...core.security import (
-    verify_password,
-    get_password_hash,
     create_access_token,
+    password_hasher,
 )
 from ...core.config import settings
+from ...core import google
+from ...core.principal import Principal, cached_user, invalidate_user
+from ...core.revocation import revoke_access_token
+from ...core.tokens import (
+    issue_refresh_token,
+    revoke_refresh_token,
+    revoke_user_tokens,
+    rotate_refresh_token,
+)
+from ..deps import (
+    charge_failed_login,
+    get_current_principal,
+    get_current_user,
+    get_token_claims,
+    limit_auth,
+    limit_login,
+    limit_refresh,
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(
-    tokenUrl=f"{settings.API_V1_STR}/auth/login"
-)
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db),
-) -> User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
+def _access_token(user: User) -> str:
+    return create_access_token(
+        data={"sub": user.email, "role": user.role, "user_id": user.id},
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
     )
-    try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM],
-        )
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    result = await db.execute(select(User).where(User.email == email))
-    user = result.scalar_one_or_none()
-    if user is None:
-        raise credentials_exception
-    return user
 
 
-@router.post("/register", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
+async def _issue_tokens(db: AsyncSession, user: User) -> dict:
+    """An access token plus a refresh token starting a new family."""
+    refresh_token = await issue_refresh_token(db, user.id)
+    await db.commit()
+    return {
+        "access_token": _access_token(user),
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
+
+
+@router.post(
+    "/register",
+    response_model=UserSchema,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limit_auth)],
+)
 async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Register a new user with email and password.
@@ -107,11 +123,14 @@ async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
             detail="Full name must be at least 2 characters long",
         )
 
+    # Hash off the event loop; may raise 503 when the hashing pool is full
+    hashed_password = await password_hasher.hash(user_in.password)
+
     # Create new user
     try:
         db_user = User(
             email=user_in.email.lower().strip(),  # Normalize email
-            hashed_password=get_password_hash(user_in.password),
+            hashed_password=hashed_password,
             full_name=user_in.full_name.strip() if user_in.full_name else None,
             role=user_in.role,
             is_active=True,
@@ -132,7 +151,7 @@ async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
         )
 
 
-@router.post("/login", response_model=Token)
+@router.post("/login", response_model=Token, dependencies=[Depends(limit_login)])
 async def login(
     db: AsyncSession = Depends(get_db),
     form_data: OAuth2PasswordRequestForm = Depends(),
@@ -143,7 +162,8 @@ async def login(
     - **username**: User's email address (OAuth2 spec uses 'username' field)
     - **password**: User's password
 
-    Returns an access token that should be included in subsequent requests.
+    Returns an access token that should be included in subsequent requests,
+    and a refresh token to get a new one from /auth/refresh when it expires.
     """
     # Normalize email
     email = form_data.username.lower().strip()
@@ -157,14 +177,18 @@ async def login(
     # Validate credentials
     if not user:
         logger.warning(f"Login attempt with non-existent email: {email}")
+        await charge_failed_login(email)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    if not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = await password_hasher.verify_and_update(
+        form_data.password, user.hashed_password)
+    if not valid:
         logger.warning(f"Failed login attempt for user: {email}")
+        await charge_failed_login(email)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -179,17 +203,68 @@ async def login(
             detail="Your account has been deactivated. Please contact support.",
         )
 
-    # Create access token
-    access_token_expires = timedelta(
-        minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
-    )
-    access_token = create_access_token(
-        data={"sub": user.email, "role": user.role, "user_id": user.id},
-        expires_delta=access_token_expires,
-    )
+    # The stored hash used another bcrypt cost; replace it while we have the password
+    if new_hash is not None:
+        user.hashed_password = new_hash
+
+    tokens = await _issue_tokens(db, user)
+    if new_hash is not None:
+        await invalidate_user(user.id)
 
     logger.info(f"Successful login for user: {email} with role {user.role}")
-    return {"access_token": access_token, "token_type": "bearer"}
+    return tokens
+
+
+@router.post("/refresh", response_model=Token, dependencies=[Depends(limit_refresh)])
+async def refresh_access_token(
+    request: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Trade a refresh token for a new access token and a new refresh token.
+
+    Each refresh token works once. Presenting one that was already used
+    signs that login out everywhere.
+    """
+    user_id, refresh_token = await rotate_refresh_token(db, request.refresh_token)
+    user = await cached_user(db, user_id)
+    if user is None or not user.is_active:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    await db.commit()
+    return {
+        "access_token": _access_token(user),
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    request: Optional[LogoutRequest] = None,
+    claims: dict = Depends(get_token_claims),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    """Revoke the presented access token and, if given, its refresh token."""
+    await revoke_access_token(db, claims)
+    if request is not None and request.refresh_token:
+        await revoke_refresh_token(db, request.refresh_token, current_user.id)
+    await db.commit()
+
+
+@router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_everywhere(
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    """Revoke every access and refresh token of the current user."""
+    await revoke_user_tokens(db, current_user.id)
+    await db.commit()
 
 
 @router.get("/me", response_model=UserSchema)
@@ -227,6 +302,7 @@ async def update_current_user_profile(
 
     await db.commit()
     await db.refresh(current_user)
+    await invalidate_user(current_user.id)
 
     logger.info(f"Profile updated successfully for user {current_user.email}")
     return current_user
@@ -246,34 +322,28 @@ class GoogleTokenRequest(BaseModel):
 
 class GoogleTokenInfo(BaseModel):
     email: str
-    name: str
+    name: str | None = None
     picture: str | None = None
 
 
 async def verify_google_token(token: str) -> GoogleTokenInfo:
-    """Verify Google OAuth token and return user info"""
+    """Verify a Google ID token (locally) or access token and return user info"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://www.googleapis.com/oauth2/v1/userinfo",
-                headers={"Authorization": f"Bearer {token}"},
-                timeout=10.0,
-            )
-            response.raise_for_status()
-            data = response.json()
-            return GoogleTokenInfo(
-                email=data.get("email"),
-                name=data.get("name"),
-                picture=data.get("picture"),
-            )
+        data = await google.verify_google_token(token)
+        return GoogleTokenInfo(
+            email=data.get("email"),
+            name=data.get("name"),
+            picture=data.get("picture"),
+        )
     except Exception as e:
+        logger.info(f"Google token rejected: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid Google token",
         )
 
 
-@router.post("/google", response_model=Token)
+@router.post("/google", response_model=Token, dependencies=[Depends(limit_auth)])
 async def google_login(
     request: GoogleTokenRequest,
     db: AsyncSession = Depends(get_db),
@@ -288,20 +358,17 @@ async def google_login(
         user = User(
             email=user_info.email,
             full_name=user_info.name or user_info.email,
-            hashed_password=get_password_hash(
-                f"google_oauth_{user_info.email}"
-            ),
+            # Google accounts sign in without a password; store an unguessable one
+            hashed_password=await password_hasher.hash(secrets.token_urlsafe(32)),
             role="CUSTOMER",
         )
         db.add(user)
         await db.commit()
         await db.refresh(user)
+    elif not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Your account has been deactivated. Please contact support.",
+        )
 
-    access_token_expires = timedelta(
-        minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
-    )
-    access_token = create_access_token(
-        data={"sub": user.email, "role": user.role},
-        expires_delta=access_token_expires,
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return await _issue_tokens(db, user)
@@ -1,39 +1,189 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from datetime import datetime, date
-from typing import List
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+import logging
 from ...database import get_db
-from ...models.booking import Booking, BookingStatus
-from ...models.provider import ProviderProfile
+from ...models.service import Service
+from ...core.cache import cached
+from ...schemas.availability import (
+    BatchAvailabilityRequest,
+    BatchAvailabilityResponse,
+    ServiceAvailability,
+)
+from ...core.availability import (
+    MAX_RANGE_DAYS,
+    free_slots,
+    load_busy,
+    load_schedule,
+    load_schedules,
+    slot_bitmap,
+    subtract,
+    working_intervals,
+)
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
-@router.get("/{provider_id}")
-async def get_availability(
-    provider_id: int,
-    start_date: date = Query(..., description="Date to check availability for (ISO-8601)"),
+
+def _check_range(start_date: date, end_date: date) -> None:
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if (end_date - start_date).days >= MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=400, detail=f"Date range is limited to {MAX_RANGE_DAYS} days")
+
+
+@router.post("/batch", response_model=BatchAvailabilityResponse)
+async def get_batch_availability(
+    request: BatchAvailabilityRequest,
     db: AsyncSession = Depends(get_db)
 ):
-    # This is a simplified version. In a real app, you'd calculate slots based on provider working hours.
+    """
+    Free slots for many services over a date window in one call.
+
+    Runs three queries regardless of batch size: the services, their
+    providers' schedules, and all overlapping bookings grouped by service.
+    With format=bitmap each service gets a hex bitmap over a UTC grid
+    starting the day before start_date, at UTC midnight, instead of a
+    slot list.
+    """
+    end_date = request.end_date or request.start_date
+    _check_range(request.start_date, end_date)
+
+    service_ids = list(dict.fromkeys(request.service_ids))
     result = await db.execute(
-        select(Booking).where(
-            Booking.service_id.in_(
-                select(ProviderProfile.id).where(ProviderProfile.user_id == provider_id)
-            ),
-            func.date(Booking.start_time) == start_date,
-            Booking.status != BookingStatus.CANCELLED
+        select(Service.id, Service.provider_id, Service.duration_minutes)
+        .where(Service.id.in_(service_ids))
+    )
+    services = {row.id: row for row in result.all()}
+    schedules = await load_schedules(
+        db, {s.provider_id for s in services.values() if s.provider_id is not None},
+        strict=False,
+    )
+
+    working: Dict[int, List] = {
+        provider_id: working_intervals(schedule, request.start_date, end_date)
+        for provider_id, schedule in schedules.items()
+    }
+    spans = [w for w in working.values() if w]
+    busy = {}
+    if spans:
+        window = (min(w[0][0] for w in spans), max(w[-1][1] for w in spans))
+        busy = await load_busy(db, list(services), window)
+
+    now = datetime.now(timezone.utc)
+    # Local working days map to UTC anywhere from 14 hours earlier to 12
+    # hours later, so the grid starts a day early and ends a day late
+    origin = datetime(
+        request.start_date.year, request.start_date.month, request.start_date.day,
+        tzinfo=timezone.utc) - timedelta(days=1)
+    items = []
+    for service_id in service_ids:
+        service = services.get(service_id)
+        if service is None:
+            continue
+        hours = working.get(service.provider_id, [])
+        step_minutes = request.step_minutes or service.duration_minutes
+        item = ServiceAvailability(
+            service_id=service_id,
+            provider_id=service.provider_id,
+            duration_minutes=service.duration_minutes,
         )
+        if request.format == "bitmap":
+            free = subtract(hours, busy.get(service_id, []))
+            step = timedelta(minutes=step_minutes)
+            count = ((end_date - request.start_date).days + 3) * 24 * 60 // step_minutes
+            bits = slot_bitmap(
+                free, origin, count, step, timedelta(minutes=service.duration_minutes), now)
+            item.origin = origin
+            item.step_minutes = step_minutes
+            item.bitmap = format(bits, "x").zfill(-(-count // 4))
+            if bits:
+                item.next_available = origin + (count - bits.bit_length()) * step
+        else:
+            slots = free_slots(
+                hours, busy.get(service_id, []), service.duration_minutes,
+                request.step_minutes, now)
+            item.available_slots = slots
+            item.next_available = slots[0] if slots else None
+        items.append(item)
+
+    return BatchAvailabilityResponse(
+        start_date=request.start_date,
+        end_date=end_date,
+        services=items,
+        missing_service_ids=[i for i in service_ids if i not in services],
     )
-    bookings = result.scalars().all()
-    
-    # Mocking available slots for demonstration (9 AM to 5 PM, 1-hour slots)
-    # Real logic would use the provider's `availability` JSON column.
+
+
+@router.get("/{provider_id}")
+@cached(ttl=15, tags=("availability:{provider_id}",))
+async def get_availability(
+    provider_id: int,
+    start_date: date = Query(..., description="First date to check availability for (ISO-8601)"),
+    end_date: Optional[date] = Query(None, description="Last date to include; defaults to start_date"),
+    service_id: Optional[int] = Query(None, description="Only compute slots for this service"),
+    step_minutes: Optional[int] = Query(
+        None, ge=5, le=240, description="Spacing between slot starts; defaults to the service duration"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Free slots of a provider's services between start_date and end_date.
+
+    Slots come from the provider's working hours (see app.core.availability)
+    minus each service's non-cancelled bookings, and are as long as the
+    service's duration. `available_slots` holds the requested service's
+    slots, or every distinct start time across services.
+    """
+    end_date = end_date or start_date
+    _check_range(start_date, end_date)
+
+    query = select(Service.id, Service.name, Service.duration_minutes).where(
+        Service.provider_id == provider_id)
+    if service_id is not None:
+        query = query.where(Service.id == service_id)
+    services = (await db.execute(query.order_by(Service.id))).all()
+    if service_id is not None and not services:
+        raise HTTPException(status_code=404, detail="Service not found for this provider")
+
+    try:
+        schedule = await load_schedule(db, provider_id)
+    except ValueError as e:
+        logger.warning(f"Unreadable availability for provider {provider_id}: {str(e)}")
+        raise HTTPException(status_code=422, detail=f"Provider availability is invalid: {str(e)}")
+
+    working = working_intervals(schedule, start_date, end_date)
+    if working:
+        window = (working[0][0], working[-1][1])
+        busy = await load_busy(db, [s.id for s in services], window)
+    else:
+        busy = {s.id: [] for s in services}
+
+    per_service = []
+    for service in services:
+        per_service.append({
+            "service_id": service.id,
+            "name": service.name,
+            "duration_minutes": service.duration_minutes,
+            "available_slots": free_slots(
+                working, busy[service.id], service.duration_minutes, step_minutes),
+        })
+
+    if service_id is not None:
+        available = per_service[0]["available_slots"]
+    else:
+        available = sorted({slot for s in per_service for slot in s["available_slots"]})
+
     return {
         "date": start_date,
+        "start_date": start_date,
+        "end_date": end_date,
         "provider_id": provider_id,
-        "booked_slots": [b.start_time for b in bookings],
-        "available_slots": [
-            f"{start_date}T{hour:02d}:00:00Z" for hour in range(9, 17)
-        ]
+        "timezone": schedule.tz.key,
+        "working_hours": [{"start": s, "end": e} for s, e in working],
+        "booked_slots": sorted(start for b in busy.values() for start, _ in b),
+        "available_slots": available,
+        "services": per_service,
     }
@@ -0,0 +1,316 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from ...database import get_db
+from ...models.booking import Booking, BookingStatus
+from ...models.booking_series import BookingSeries
+from ...models.service import Service
+from ...schemas.booking_series import (
+    BookingSeries as BookingSeriesSchema,
+    BookingSeriesCreate,
+    SeriesOccurrence,
+    SeriesOccurrenceCancel,
+)
+from ...core.bookings import (
+    CONFLICT_DETAIL,
+    flush_booking,
+    live_booking,
+    release_expired_holds,
+    slot_range,
+    status_change_error,
+)
+from ...core.recurrence import (
+    MAX_OCCURRENCES,
+    MAX_SERIES_DAYS,
+    Recurrence,
+    first_overlap,
+    load_series_busy,
+    lock_service_slots,
+    materialized_occurrences,
+    parse_rrule,
+    recurrence_for,
+    series_timezone,
+    week_hours,
+)
+from ...core.availability import (
+    MAX_RANGE_DAYS,
+    refresh_next_available,
+    update_next_available_for_booking,
+)
+from ...core.cache import invalidate_tags
+from ...core.waitlist import slot_freed
+from ...core.principal import Principal
+from ..deps import get_current_principal, limit_booking_writes
+
+router = APIRouter()
+
+
+async def _get_series(db: AsyncSession, series_id: int, user: Principal, lock: bool = False) -> BookingSeries:
+    query = select(BookingSeries).where(BookingSeries.id == series_id)
+    if lock:
+        query = query.with_for_update()
+    series = (await db.execute(query)).scalar_one_or_none()
+    if not series or (user.id not in (series.customer_id, series.provider_id) and user.role != "admin"):
+        raise HTTPException(status_code=404, detail="Booking series not found")
+    return series
+
+
+@router.post(
+    "/",
+    response_model=BookingSeriesSchema,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limit_booking_writes)],
+)
+async def create_booking_series(
+    series_in: BookingSeriesCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Book a recurring slot, e.g. every Monday at 10:00 for 12 weeks.
+
+    The series is stored as one row; occurrences are expanded on demand
+    (see app.core.recurrence). Every occurrence is checked against the
+    service's bookings and other series up front, so a conflict anywhere
+    in the series yields 409 and nothing is booked.
+    """
+    result = await db.execute(select(Service).where(Service.id == series_in.service_id))
+    service = result.scalar_one_or_none()
+    if not service:
+        raise HTTPException(status_code=404, detail="Service not found")
+
+    start_time = series_in.start_time
+    if start_time.tzinfo is None:
+        start_time = start_time.replace(tzinfo=timezone.utc)
+    duration = timedelta(minutes=service.duration_minutes)
+    try:
+        recurrence = Recurrence(
+            parse_rrule(series_in.rrule), start_time, duration, series_timezone(series_in.timezone))
+        series_end = recurrence.last_end()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OverflowError:
+        # e.g. UNTIL=99991231: the series would run past the last representable date
+        raise HTTPException(status_code=400, detail="The series runs past the supported date range")
+    if series_end - start_time > timedelta(days=MAX_SERIES_DAYS):
+        raise HTTPException(
+            status_code=400, detail=f"A series may span at most {MAX_SERIES_DAYS} days")
+    occurrences = [(s, s + duration) for _, s in recurrence.between(start_time, series_end)]
+    if len(occurrences) > MAX_OCCURRENCES:
+        raise HTTPException(
+            status_code=400, detail=f"A series may have at most {MAX_OCCURRENCES} occurrences")
+
+    # Exclusive until commit: no booking or series can slip in between
+    # the check below and the insert
+    await lock_service_slots(db, service.id, exclusive=True)
+    await release_expired_holds(db, service.id, start_time, series_end)
+    window = (start_time, series_end)
+    booked = await db.execute(
+        select(Booking.start_time, Booking.end_time)
+        .where(
+            Booking.service_id == service.id,
+            live_booking(),
+            Booking.during.op("&&")(slot_range(*window)),
+        )
+        .order_by(Booking.start_time)
+    )
+    busy = sorted(list(booked.all()) + (await load_series_busy(db, [service.id], window))[service.id])
+    clash = first_overlap(occurrences, busy)
+    if clash is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"{CONFLICT_DETAIL} (occurrence at {clash[0].isoformat()})",
+        )
+
+    series = BookingSeries(
+        customer_id=current_user.id,
+        service_id=service.id,
+        provider_id=service.provider_id,
+        start_time=start_time,
+        rrule=series_in.rrule,
+        timezone=recurrence.tz.key,
+        duration_minutes=service.duration_minutes,
+        series_end=series_end,
+        week_hours=week_hours(occurrences),
+        notes=series_in.notes,
+    )
+    db.add(series)
+    await db.flush()
+    await refresh_next_available(db, [service.id])
+    await db.commit()
+    await db.refresh(series)
+    await invalidate_tags(f"availability:{service.provider_id}")
+    return series
+
+
+@router.get("/me", response_model=List[BookingSeriesSchema])
+async def get_my_booking_series(
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    result = await db.execute(
+        select(BookingSeries)
+        .where(BookingSeries.customer_id == current_user.id)
+        .order_by(BookingSeries.start_time.desc(), BookingSeries.id.desc())
+    )
+    return result.scalars().all()
+
+
+@router.get("/managed", response_model=List[BookingSeriesSchema])
+async def get_managed_booking_series(
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Series booked on the current provider's services."""
+    if current_user.role != "provider":
+        raise HTTPException(status_code=403, detail="Only providers can view managed bookings")
+    result = await db.execute(
+        select(BookingSeries)
+        .where(BookingSeries.provider_id == current_user.id)
+        .order_by(BookingSeries.start_time.desc(), BookingSeries.id.desc())
+    )
+    return result.scalars().all()
+
+
+@router.get("/{series_id}/occurrences", response_model=List[SeriesOccurrence])
+async def get_series_occurrences(
+    series_id: int,
+    start: Optional[datetime] = Query(None, description="Window start; defaults to now"),
+    end: Optional[datetime] = Query(None, description="Window end; defaults to 31 days after start"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Occurrences of a series within a window, expanded on the fly.
+
+    Occurrences with their own booking row (e.g. cancelled ones) show
+    that row's status and id.
+    """
+    series = await _get_series(db, series_id, current_user)
+    start = start or datetime.now(timezone.utc)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    end = end or start + timedelta(days=31)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if end - start > timedelta(days=MAX_RANGE_DAYS):
+        raise HTTPException(
+            status_code=400, detail=f"Window is limited to {MAX_RANGE_DAYS} days")
+
+    duration = timedelta(minutes=series.duration_minutes)
+    replaced = await materialized_occurrences(db, [series.id], (start, end), duration)
+    occurrences = []
+    for _, occurrence_start in recurrence_for(series).between(start, end):
+        booking = replaced.get((series.id, occurrence_start))
+        occurrences.append(SeriesOccurrence(
+            start_time=booking.start_time if booking else occurrence_start,
+            end_time=booking.end_time if booking else occurrence_start + duration,
+            status=booking.status if booking else series.status,
+            booking_id=booking.id if booking else None,
+        ))
+    return occurrences
+
+
+@router.post("/{series_id}/occurrences/cancel", response_model=SeriesOccurrence)
+async def cancel_series_occurrence(
+    series_id: int,
+    request: SeriesOccurrenceCancel,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Cancel one occurrence of a series, leaving the others booked.
+
+    This is what gives an occurrence its own booking row: a cancelled
+    booking linked to the series, which stops the occurrence from being
+    expanded. Cancelling an already cancelled occurrence is a no-op.
+    """
+    series = await _get_series(db, series_id, current_user, lock=True)
+    error = status_change_error(
+        current_user, series.customer_id, series.provider_id, series.status, "cancelled")
+    if error:
+        raise HTTPException(status_code=error[0], detail=error[1])
+
+    occurrence_start = request.occurrence_start
+    if occurrence_start.tzinfo is None:
+        occurrence_start = occurrence_start.replace(tzinfo=timezone.utc)
+    duration = timedelta(minutes=series.duration_minutes)
+    matches = [
+        s for _, s in recurrence_for(series).between(occurrence_start, occurrence_start + duration)
+        if s == occurrence_start
+    ]
+    if not matches:
+        raise HTTPException(status_code=404, detail="No occurrence of this series starts then")
+
+    replaced = await materialized_occurrences(
+        db, [series.id], (occurrence_start, occurrence_start + duration), timedelta(0))
+    booking = replaced.get((series.id, occurrence_start))
+    if booking is not None:
+        return SeriesOccurrence(
+            start_time=booking.start_time, end_time=booking.end_time,
+            status=booking.status, booking_id=booking.id)
+    if series.status == BookingStatus.CANCELLED:
+        return SeriesOccurrence(
+            start_time=occurrence_start, end_time=occurrence_start + duration,
+            status=series.status)
+
+    booking = Booking(
+        customer_id=series.customer_id,
+        service_id=series.service_id,
+        provider_id=series.provider_id,
+        start_time=occurrence_start,
+        end_time=occurrence_start + duration,
+        status=BookingStatus.CANCELLED,
+        series_id=series.id,
+        occurrence_start=occurrence_start,
+        notes=series.notes,
+    )
+    db.add(booking)
+    await flush_booking(db)
+    await update_next_available_for_booking(
+        db, series.service_id, booking.start_time, booking.end_time, freed=True)
+    await slot_freed(db, series.service_id, booking.start_time, booking.end_time)
+    await db.commit()
+    if series.provider_id is not None:
+        await invalidate_tags(f"availability:{series.provider_id}")
+    return SeriesOccurrence(
+        start_time=booking.start_time, end_time=booking.end_time,
+        status=booking.status, booking_id=booking.id)
+
+
+@router.patch("/{series_id}/status", response_model=BookingSeriesSchema)
+async def update_booking_series_status(
+    series_id: int,
+    status: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Confirm or cancel a whole series, with the same rules as a booking.
+
+    The status applies to every occurrence without its own booking row.
+    """
+    series = await _get_series(db, series_id, current_user, lock=True)
+    status_lower = status.lower()
+    if status_lower == "completed":
+        raise HTTPException(status_code=400, detail="A series can only be confirmed or cancelled")
+    error = status_change_error(
+        current_user, series.customer_id, series.provider_id, series.status, status_lower)
+    if error:
+        raise HTTPException(status_code=error[0], detail=error[1])
+    if series.status == BookingStatus(status_lower):
+        return series
+
+    series.status = BookingStatus(status_lower)
+    await db.flush()
+    if series.status == BookingStatus.CANCELLED:
+        await refresh_next_available(db, [series.service_id])
+    await db.commit()
+    await db.refresh(series)
+    if series.status == BookingStatus.CANCELLED and series.provider_id is not None:
+        await invalidate_tags(f"availability:{series.provider_id}")
+    return series
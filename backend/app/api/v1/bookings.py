@@ -1,26 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import func, select, tuple_, update
 from sqlalchemy.orm import selectinload
-from typing import List
-from datetime import timedelta
+from typing import List, Literal, Optional, Union
+from datetime import datetime, timedelta
 from ...database import get_db
 from ...models.booking import Booking, BookingStatus
 from ...models.service import Service
-from ...schemas.booking import Booking as BookingSchema, BookingCreate
-from ...api.v1.auth import User  # We'll need a way to get the current user
-
-from ...api.deps import get_current_user
-from ...models.user import User
+from ...schemas.booking import (
+    Booking as BookingSchema,
+    BookingCreate,
+    BookingStatusBulkUpdate,
+    BookingStatusBulkResult,
+    BookingStatusResult,
+)
+from ...schemas.pagination import CursorPage
+from ...core.pagination import apply_keyset, keyset_page, sort_order
+from ...core.popularity import record_event, BOOKING_WEIGHT
+from ...core.cache import invalidate_tags
+from ...core.bookings import (
+    STALE_DETAIL,
+    ensure_slot_free,
+    flush_booking,
+    status_change_error,
+)
+from ...core.availability import refresh_next_available, update_next_available_for_booking
+from ...core.waitlist import slot_freed
+from ...core.principal import Principal
+from ..deps import get_current_principal, limit_booking_writes
 
 router = APIRouter()
 
 
-@router.post("/", response_model=BookingSchema, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/",
+    response_model=BookingSchema,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limit_booking_writes)],
+)
 async def create_booking(
     booking_in: BookingCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     # 1. Check if service exists
     result = await db.execute(select(Service).where(Service.id == booking_in.service_id))
@@ -32,29 +53,26 @@ async def create_booking(
     start_time = booking_in.start_time
     end_time = start_time + timedelta(minutes=service.duration_minutes)
 
-    # 3. Check for conflicts
-    conflict_query = select(Booking).where(
-        Booking.service_id == booking_in.service_id,
-        Booking.status == BookingStatus.CONFIRMED,
-        Booking.start_time < end_time,
-        Booking.end_time > start_time
-    )
-    conflict_result = await db.execute(conflict_query)
-    if conflict_result.scalar_one_or_none():
-        raise HTTPException(
-            status_code=409, detail="Booking conflict: slot already taken")
+    # 3. Check for conflicts; the exclusion constraint settles races
+    await ensure_slot_free(db, booking_in.service_id, start_time, end_time)
 
     # 4. Create booking
     db_booking = Booking(
         customer_id=current_user.id,
         service_id=booking_in.service_id,
+        provider_id=service.provider_id,
         start_time=start_time,
         end_time=end_time,
         notes=booking_in.notes
     )
     db.add(db_booking)
+    await flush_booking(db)
+    await update_next_available_for_booking(
+        db, booking_in.service_id, start_time, end_time, freed=False)
+    await record_event(db, booking_in.service_id, BOOKING_WEIGHT)
     await db.commit()
     await db.refresh(db_booking)
+    await invalidate_tags(f"availability:{service.provider_id}")
 
     # Eagerly load the service relationship to avoid lazy loading issues
     result = await db.execute(
@@ -66,24 +84,103 @@ async def create_booking(
     return booking_with_service
 
 
-@router.get("/me", response_model=List[BookingSchema])
+# Stable sort keys for booking listings, paired with Booking.id as tiebreaker
+BOOKING_SORT_KEYS = {
+    "id": Booking.id,
+    "created_at": Booking.created_at,
+    "start_time": Booking.start_time,
+}
+
+BookingPage = Union[List[BookingSchema], CursorPage[BookingSchema]]
+
+CURSOR_DESCRIPTION = (
+    "Opaque cursor from a previous page. Pass an empty value to start; "
+    "the response is then a page with next_cursor."
+)
+
+
+class BookingFilters:
+    """Date-range and status filters shared by the booking listings."""
+
+    def __init__(
+        self,
+        start_from: Optional[datetime] = Query(
+            None, description="Only bookings starting at or after this time"),
+        start_to: Optional[datetime] = Query(
+            None, description="Only bookings starting before this time"),
+        status: Optional[List[BookingStatus]] = Query(
+            None, description="Only bookings in these statuses (repeatable)"),
+    ):
+        if start_from and start_to and start_to <= start_from:
+            raise HTTPException(
+                status_code=400, detail="start_to must be after start_from")
+        self.start_from = start_from
+        self.start_to = start_to
+        self.status = status
+
+    def apply(self, query):
+        if self.start_from is not None:
+            query = query.where(Booking.start_time >= self.start_from)
+        if self.start_to is not None:
+            query = query.where(Booking.start_time < self.start_to)
+        if self.status:
+            query = query.where(Booking.status.in_(self.status))
+        return query
+
+
+async def _paginate_bookings(
+    db: AsyncSession,
+    query,
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    sort: str,
+    order: str,
+):
+    """Run a booking query in offset mode, or keyset mode when a cursor is given."""
+    key = BOOKING_SORT_KEYS[sort]
+    descending = order == "desc"
+    query = query.options(selectinload(Booking.service))
+
+    if cursor is not None:
+        query = apply_keyset(query, key, Booking.id, sort, cursor, limit, descending)
+        result = await db.execute(query)
+        rows, next_cursor = keyset_page(result.all(), limit, sort, descending)
+        return CursorPage[BookingSchema](
+            items=[BookingSchema.model_validate(row[0]) for row in rows],
+            next_cursor=next_cursor,
+        )
+
+    query = query.order_by(*sort_order(key, Booking.id, descending))
+    result = await db.execute(query.offset(skip).limit(limit))
+    return result.scalars().all()
+
+
+@router.get("/me", response_model=BookingPage)
 async def get_my_bookings(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    sort: Literal["id", "created_at", "start_time"] = "created_at",
+    order: Literal["asc", "desc"] = "desc",
+    filters: BookingFilters = Depends(),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
-    result = await db.execute(
-        select(Booking)
-        .where(Booking.customer_id == current_user.id)
-        .options(selectinload(Booking.service))
-        .order_by(Booking.created_at.desc())
-    )
-    return result.scalars().all()
+    query = filters.apply(select(Booking).where(Booking.customer_id == current_user.id))
+    return await _paginate_bookings(db, query, skip, limit, cursor, sort, order)
 
 
-@router.get("/managed", response_model=List[BookingSchema])
+@router.get("/managed", response_model=BookingPage)
 async def get_provider_bookings(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    sort: Literal["id", "created_at", "start_time"] = "created_at",
+    order: Literal["asc", "desc"] = "desc",
+    filters: BookingFilters = Depends(),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Get bookings for services owned by the current provider.
@@ -91,23 +188,22 @@ async def get_provider_bookings(
     if current_user.role != "provider":
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    # Join Booking -> Service to filter by Service.provider_id
-    query = (
-        select(Booking)
-        .join(Booking.service)
-        .where(Service.provider_id == current_user.id)
-        .options(selectinload(Booking.service))
-    )
-    result = await db.execute(query)
-    return result.scalars().all()
+    # Booking.provider_id is denormalized, so (provider_id, start_time)
+    # serves date-range views without joining services
+    query = filters.apply(select(Booking).where(Booking.provider_id == current_user.id))
+    return await _paginate_bookings(db, query, skip, limit, cursor, sort, order)
 
 
-@router.get("/all", response_model=List[BookingSchema])
+@router.get("/all", response_model=BookingPage)
 async def get_all_bookings(
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    sort: Literal["id", "created_at", "start_time"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    filters: BookingFilters = Depends(),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Get all bookings (Admin only).
@@ -115,27 +211,28 @@ async def get_all_bookings(
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    query = (
-        select(Booking)
-        .options(selectinload(Booking.service))
-        .offset(skip)
-        .limit(limit)
-    )
-    result = await db.execute(query)
-    return result.scalars().all()
+    return await _paginate_bookings(
+        db, filters.apply(select(Booking)), skip, limit, cursor, sort, order)
 
 
 @router.patch("/{booking_id}/status", response_model=BookingSchema)
 async def update_booking_status(
     booking_id: int,
     status: str,
+    version: Optional[int] = Query(
+        None, description="Version the client last saw; 409 if the booking changed since"),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Update booking status. Providers can confirm/complete bookings for their services.
     Customers can cancel their own pending bookings.
     Admins can update any booking status.
+
+    Only the changes in TRANSITIONS are allowed. The write is a
+    compare-and-set on the booking's version, so a concurrent change
+    yields 409 instead of being overwritten; repeating a request that
+    already succeeded is a no-op.
     """
     # Fetch booking with service info
     result = await db.execute(
@@ -148,45 +245,140 @@ async def update_booking_status(
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
 
-    # Authorization check
-    is_customer = booking.customer_id == current_user.id
-    is_provider = booking.service and booking.service.provider_id == current_user.id
-    is_admin = current_user.role == "admin"
-
-    if not (is_customer or is_provider or is_admin):
-        raise HTTPException(
-            status_code=403, detail="Not authorized to update this booking")
-
-    # Validate status transitions
-    valid_statuses = ["pending", "confirmed", "completed", "cancelled"]
+    # Authorization and transition rules, shared with the bulk endpoint
     status_lower = status.lower()
-
-    if status_lower not in valid_statuses:
-        raise HTTPException(
-            status_code=400, detail=f"Invalid status. Must be one of: {valid_statuses}")
-
-    # Customers can only cancel their pending bookings
-    if is_customer and not is_admin:
-        if status_lower != "cancelled":
-            raise HTTPException(
-                status_code=403, detail="Customers can only cancel bookings")
-        if booking.status != BookingStatus.PENDING:
-            raise HTTPException(
-                status_code=400, detail="Can only cancel pending bookings")
-
-    # Update status
+    error = status_change_error(
+        current_user,
+        booking.customer_id,
+        booking.service.provider_id if booking.service else None,
+        booking.status,
+        status_lower,
+        on_hold=booking.hold_expires_at is not None,
+    )
+    if error:
+        raise HTTPException(status_code=error[0], detail=error[1])
+    if booking.status == BookingStatus(status_lower):
+        return booking
+    if version is not None and version != booking.version:
+        raise HTTPException(status_code=409, detail=STALE_DETAIL)
+
+    # UPDATE ... WHERE version = :v; losing a race raises 409
     booking.status = BookingStatus(status_lower)
+    provider_id = booking.service.provider_id if booking.service else None
+    await flush_booking(db)
+
+    # Cancelling frees the slot; other transitions keep it taken
+    if booking.status == BookingStatus.CANCELLED:
+        await update_next_available_for_booking(
+            db, booking.service_id, booking.start_time, booking.end_time, freed=True)
+        await slot_freed(db, booking.service_id, booking.start_time, booking.end_time)
     await db.commit()
     await db.refresh(booking)
+    if provider_id is not None:
+        await invalidate_tags(f"availability:{provider_id}")
 
     return booking
 
 
+@router.post("/bulk-status", response_model=BookingStatusBulkResult)
+async def bulk_update_booking_status(
+    request: BookingStatusBulkUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Apply one status to many bookings in a single transaction.
+
+    The same rules as PATCH /{booking_id}/status apply to every booking;
+    each one gets its own result, and only the allowed ones are written,
+    with a single UPDATE that compares and bumps each row's version.
+    Rows changed concurrently since they were read come back as 409.
+    No allowed transition takes a free slot, so there is nothing to
+    conflict-check beyond that.
+    """
+    new_status = request.status.lower()
+    booking_ids = list(dict.fromkeys(request.booking_ids))
+
+    # One query for everything the rules need
+    result = await db.execute(
+        select(
+            Booking.id,
+            Booking.customer_id,
+            func.coalesce(Booking.provider_id, Service.provider_id).label("provider_id"),
+            Booking.service_id,
+            Booking.status,
+            Booking.version,
+            Booking.start_time,
+            Booking.end_time,
+            Booking.hold_expires_at,
+        )
+        .outerjoin(Service, Service.id == Booking.service_id)
+        .where(Booking.id.in_(booking_ids))
+    )
+    rows = {row.id: row for row in result.all()}
+
+    results = {}
+    allowed = []
+    for booking_id in booking_ids:
+        row = rows.get(booking_id)
+        if row is None:
+            results[booking_id] = BookingStatusResult(
+                booking_id=booking_id, status_code=404, detail="Booking not found")
+            continue
+        error = status_change_error(
+            current_user, row.customer_id, row.provider_id, row.status, new_status,
+            on_hold=row.hold_expires_at is not None)
+        if error:
+            results[booking_id] = BookingStatusResult(
+                booking_id=booking_id, status_code=error[0], detail=error[1])
+        elif row.status.value == new_status:
+            # Already there (e.g. a retried request)
+            results[booking_id] = BookingStatusResult(
+                booking_id=booking_id, status_code=200, status=row.status)
+        else:
+            allowed.append(row)
+
+    updated = []
+    if allowed:
+        result = await db.execute(
+            update(Booking)
+            .where(tuple_(Booking.id, Booking.version).in_(
+                [(row.id, row.version) for row in allowed]))
+            .values(status=BookingStatus(new_status), version=Booking.version + 1)
+            .returning(Booking.id)
+            .execution_options(synchronize_session=False)
+        )
+        written = set(result.scalars().all())
+        updated = [row for row in allowed if row.id in written]
+
+        # Cancelling frees slots; other transitions keep them taken
+        freed = updated if new_status == "cancelled" else []
+        await refresh_next_available(db, {row.service_id for row in freed})
+        for row in freed:
+            await slot_freed(db, row.service_id, row.start_time, row.end_time)
+        await db.commit()
+
+        for provider_id in {row.provider_id for row in freed if row.provider_id}:
+            await invalidate_tags(f"availability:{provider_id}")
+        for row in allowed:
+            if row.id in written:
+                results[row.id] = BookingStatusResult(
+                    booking_id=row.id, status_code=200, status=BookingStatus(new_status))
+            else:
+                results[row.id] = BookingStatusResult(
+                    booking_id=row.id, status_code=409, detail=STALE_DETAIL)
+
+    return BookingStatusBulkResult(
+        updated=len(updated),
+        results=[results[booking_id] for booking_id in booking_ids],
+    )
+
+
 @router.get("/{booking_id}", response_model=BookingSchema)
 async def get_booking(
     booking_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Get a specific booking by ID.
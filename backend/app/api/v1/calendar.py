@@ -0,0 +1,100 @@
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Optional
+from datetime import timezone
+from ...database import get_db
+from ...models.user import User
+from ...core.calendar import (
+    feed_validators,
+    feed_window,
+    hash_feed_token,
+    is_provider_feed,
+    new_feed_token,
+    not_modified,
+    stream_feed,
+)
+from ...core.config import settings
+from ...core.principal import invalidate_user
+from ..deps import get_current_user
+
+router = APIRouter()
+
+
+@router.post("/token")
+async def create_calendar_token(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Issue a secret .ics feed URL for the current user.
+
+    Only a hash of the secret is kept, so the URL is shown once; issuing
+    a new one revokes the previous URL.
+    """
+    token, token_hash = new_feed_token()
+    current_user.calendar_token_hash = token_hash
+    await db.commit()
+    await invalidate_user(current_user.id)
+    return {
+        "token": token,
+        "feed_url": f"{settings.API_V1_STR}/calendar/{token}.ics",
+    }
+
+
+@router.delete("/token", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_calendar_token(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    current_user.calendar_token_hash = None
+    await db.commit()
+    await invalidate_user(current_user.id)
+
+
+@router.get("/{token}.ics")
+async def get_calendar_feed(
+    token: str,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    The user's bookings over a rolling window as an iCalendar feed.
+
+    Unchanged feeds are answered with 304 from the validators alone; see
+    app.core.calendar.
+    """
+    result = await db.execute(
+        select(User).where(User.calendar_token_hash == hash_feed_token(token))
+    )
+    user = result.scalar_one_or_none()
+    if not user or not user.is_active:
+        raise HTTPException(status_code=404, detail="Calendar feed not found")
+
+    window = feed_window()
+    etag, last_modified = await feed_validators(db, user, window)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+
+    since = None
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            since = None
+        if since is not None and since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+    if not_modified(if_none_match, since, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return StreamingResponse(
+        stream_feed(user.id, is_provider_feed(user), window),
+        media_type="text/calendar; charset=utf-8",
+        headers=headers,
+    )
@@ -5,9 +5,10 @@ from typing import List
 from ...database import get_db
 from ...models.favorite import Favorite
 from ...models.service import Service
-from ...models.user import User
 from ...schemas.service import Service as ServiceSchema
-from .auth import get_current_user
+from ...core.popularity import record_event, FAVORITE_WEIGHT
+from ...core.principal import Principal
+from ..deps import get_current_principal
 
 router = APIRouter()
 
@@ -15,7 +16,7 @@ router = APIRouter()
 @router.get("/", response_model=List[ServiceSchema])
 async def list_favorites(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Get all favorites for the current user"""
     query = (
@@ -31,7 +32,7 @@ async def list_favorites(
 async def add_favorite(
     service_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Add a service to favorites"""
     # Check if service exists
@@ -54,6 +55,7 @@ async def add_favorite(
     # Add to favorites
     favorite = Favorite(user_id=current_user.id, service_id=service_id)
     db.add(favorite)
+    await record_event(db, service_id, FAVORITE_WEIGHT)
     await db.commit()
     return {"message": "Added to favorites", "service_id": service_id}
 
@@ -62,7 +64,7 @@ async def add_favorite(
 async def remove_favorite(
     service_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Remove a service from favorites"""
     result = await db.execute(
@@ -82,7 +84,7 @@ async def remove_favorite(
 async def check_favorite(
     service_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Check if a service is in favorites"""
     result = await db.execute(
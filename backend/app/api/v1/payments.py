@@ -1,3 +1,4 @@
+import logging
 import stripe
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -7,26 +8,42 @@ from ...database import get_db
 from ...core.config import settings
 from ...models.service import Service
 from ...models.booking import Booking, BookingStatus
-from ...models.user import User
-from .auth import get_current_user
-from datetime import datetime, timedelta
+from ...core.popularity import record_event, BOOKING_WEIGHT
+from ...core.cache import invalidate_tags
+from ...core.bookings import (
+    STALE_DETAIL,
+    ensure_slot_free,
+    flush_booking,
+    hold_expiry,
+    invalidate_service_availability,
+)
+from ...core.availability import update_next_available_for_booking
+from ...core.waitlist import release_hold, slot_freed
+from ...core.principal import Principal
+from ..deps import get_current_principal, limit_checkout
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 # Initialize Stripe
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
+# Stripe rejects checkout sessions that expire in under 30 minutes
+STRIPE_MIN_SESSION = timedelta(minutes=31)
+
 
 class CheckoutRequest(BaseModel):
     service_id: int
     start_time: str  # ISO format datetime
 
 
-@router.post("/create-checkout")
+@router.post("/create-checkout", dependencies=[Depends(limit_checkout)])
 async def create_checkout_session(
     request: CheckoutRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Create a Stripe checkout session for a paid service"""
     # Get the service
@@ -37,19 +54,28 @@ async def create_checkout_session(
     if not service:
         raise HTTPException(status_code=404, detail="Service not found")
 
+    start_time = datetime.fromisoformat(request.start_time)
+    end_time = start_time + timedelta(minutes=service.duration_minutes)
+    await ensure_slot_free(db, service.id, start_time, end_time)
+
     # If free, create booking directly
     if service.price == 0:
         booking = Booking(
             customer_id=current_user.id,
             service_id=service.id,
-            start_time=datetime.fromisoformat(request.start_time),
-            end_time=datetime.fromisoformat(request.start_time) + timedelta(minutes=service.duration_minutes),
+            provider_id=service.provider_id,
+            start_time=start_time,
+            end_time=end_time,
             status=BookingStatus.CONFIRMED,
             notes="Free service booking"
         )
         db.add(booking)
+        await flush_booking(db)
+        await update_next_available_for_booking(db, service.id, start_time, end_time, freed=False)
+        await record_event(db, service.id, BOOKING_WEIGHT)
         await db.commit()
         await db.refresh(booking)
+        await invalidate_tags(f"availability:{service.provider_id}")
         return {
             "type": "free",
             "booking_id": booking.id,
@@ -63,6 +89,23 @@ async def create_checkout_session(
             detail="Stripe not configured. Please set STRIPE_SECRET_KEY."
         )
 
+    # Hold the slot while the customer pays; the webhook confirms it
+    hold = Booking(
+        customer_id=current_user.id,
+        service_id=service.id,
+        provider_id=service.provider_id,
+        start_time=start_time,
+        end_time=end_time,
+        status=BookingStatus.PENDING,
+        hold_expires_at=hold_expiry(),
+        notes="Held for checkout"
+    )
+    db.add(hold)
+    await flush_booking(db)
+    await update_next_available_for_booking(db, service.id, start_time, end_time, freed=False)
+    await db.commit()
+    await invalidate_tags(f"availability:{service.provider_id}")
+
     try:
         checkout_session = stripe.checkout.Session.create(
             payment_method_types=['card'],
@@ -80,21 +123,75 @@ async def create_checkout_session(
             mode='payment',
             success_url=f"{settings.STRIPE_SUCCESS_URL}?session_id={{CHECKOUT_SESSION_ID}}&service_id={service.id}",
             cancel_url=settings.STRIPE_CANCEL_URL,
+            # Stop taking payment around when the hold lapses
+            expires_at=int(max(
+                hold.hold_expires_at,
+                datetime.now(timezone.utc) + STRIPE_MIN_SESSION,
+            ).timestamp()),
             metadata={
                 'user_id': str(current_user.id),
                 'service_id': str(service.id),
                 'start_time': request.start_time,
+                'booking_id': str(hold.id),
             }
         )
         return {
             "type": "paid",
             "checkout_url": checkout_session.url,
-            "session_id": checkout_session.id
+            "session_id": checkout_session.id,
+            "booking_id": hold.id,
+            "hold_expires_at": hold.hold_expires_at,
         }
     except stripe.error.StripeError as e:
+        await _release_hold(db, hold.id)
+        await invalidate_tags(f"availability:{service.provider_id}")
         raise HTTPException(status_code=400, detail=str(e))
 
 
+async def _release_hold(db: AsyncSession, booking_id: int) -> None:
+    """Cancel a checkout hold that will not be paid."""
+    slot = await release_hold(db, booking_id)
+    if slot is not None:
+        await slot_freed(db, *slot)
+    await db.commit()
+
+
+async def _confirm_hold(db: AsyncSession, booking: Booking, session_id: str) -> bool:
+    """
+    Turn a paid hold into a confirmed booking.
+
+    A hold that lapsed before the payment arrived is revived if the slot
+    is still free. Returns False when someone else has taken it since.
+    """
+    if booking.status == BookingStatus.CONFIRMED:
+        return True  # Stripe redelivered the event
+    # Paying for a lapsed hold is the one way back from cancelled; it is
+    # a system transition, outside the user-facing TRANSITIONS table
+    revived = booking.status == BookingStatus.CANCELLED
+    if revived:
+        try:
+            await ensure_slot_free(
+                db, booking.service_id, booking.start_time, booking.end_time,
+                exclude_booking_id=booking.id)
+        except HTTPException:
+            return False
+    booking.status = BookingStatus.CONFIRMED
+    booking.hold_expires_at = None
+    booking.notes = f"Stripe payment: {session_id}"
+    try:
+        await flush_booking(db)
+    except HTTPException as e:
+        if e.detail == STALE_DETAIL:
+            raise  # Concurrent write; let Stripe redeliver the event
+        return False
+    if revived:
+        await update_next_available_for_booking(
+            db, booking.service_id, booking.start_time, booking.end_time, freed=False)
+    await record_event(db, booking.service_id, BOOKING_WEIGHT)
+    await db.commit()
+    return True
+
+
 @router.post("/webhook")
 async def stripe_webhook(
     request: Request,
@@ -136,15 +233,54 @@ async def stripe_webhook(
         service = result.scalar_one_or_none()
 
         if service:
-            booking = Booking(
-                customer_id=user_id,
-                service_id=service_id,
-                start_time=start_time,
-                end_time=start_time + timedelta(minutes=service.duration_minutes),
-                status=BookingStatus.CONFIRMED,
-                notes=f"Stripe payment: {session.get('id')}"
-            )
-            db.add(booking)
-            await db.commit()
+            booking = None
+            if metadata.get('booking_id'):
+                result = await db.execute(
+                    select(Booking).where(Booking.id == int(metadata['booking_id']))
+                )
+                booking = result.scalar_one_or_none()
+
+            if booking is not None:
+                confirmed = await _confirm_hold(db, booking, session.get('id'))
+            else:
+                # Sessions created before holds existed carry no booking id
+                booking = Booking(
+                    customer_id=user_id,
+                    service_id=service_id,
+                    provider_id=service.provider_id,
+                    start_time=start_time,
+                    end_time=start_time + timedelta(minutes=service.duration_minutes),
+                    status=BookingStatus.CONFIRMED,
+                    notes=f"Stripe payment: {session.get('id')}"
+                )
+                db.add(booking)
+                try:
+                    await flush_booking(db)
+                    confirmed = True
+                except HTTPException:
+                    confirmed = False
+                if confirmed:
+                    await update_next_available_for_booking(
+                        db, service_id, booking.start_time, booking.end_time, freed=False)
+                    await record_event(db, service_id, BOOKING_WEIGHT)
+                    await db.commit()
+
+            if not confirmed:
+                # Someone else took the slot after the hold lapsed.
+                # Acknowledge the event so Stripe stops retrying; the payment
+                # has to be refunded or rebooked by hand.
+                logger.error(
+                    f"Paid slot no longer available for session {session.get('id')}: "
+                    f"service {service_id} at {start_time.isoformat()}"
+                )
+                return {"status": "slot_unavailable"}
+            await invalidate_tags(f"availability:{service.provider_id}")
+
+    # Free the slot as soon as an unpaid session expires
+    elif event['type'] == 'checkout.session.expired':
+        metadata = event['data']['object'].get('metadata', {})
+        if metadata.get('booking_id'):
+            await _release_hold(db, int(metadata['booking_id']))
+            await invalidate_service_availability(db, [int(metadata['service_id'])])
 
     return {"status": "success"}
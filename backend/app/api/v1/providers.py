@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 import logging
 from ...database import get_db
@@ -12,12 +12,28 @@ from ...schemas.provider import (
     ProviderProfileCreate,
     ProviderProfileUpdate,
 )
+from ...core.cache import cached, invalidate_tags
+from ...core.geo import apply_geo_filter, geo_fields, parse_bbox
+from ...core.availability import parse_schedule, refresh_provider_next_available
+from ...core.principal import invalidate_user
 from ..deps import get_current_user
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+async def invalidate_provider_caches(profile_id: int, user_id: int) -> None:
+    """Drop cached public views of a provider after its profile changes."""
+    await invalidate_tags(
+        "providers",
+        f"provider_profile:{profile_id}",
+        f"provider_user:{user_id}",
+        f"availability:{user_id}",
+    )
+    # The profile is mirrored onto the user row
+    await invalidate_user(user_id)
+
+
 @router.post("/profile", response_model=ProviderProfile, status_code=status.HTTP_201_CREATED)
 async def create_provider_profile(
     profile_data: ProviderProfileCreate,
@@ -58,6 +74,7 @@ async def create_provider_profile(
         business_name=profile_data.business_name,
         bio=profile_data.bio,
         location=profile_data.location,
+        **geo_fields(profile_data.location),
     )
 
     db.add(provider_profile)
@@ -71,6 +88,7 @@ async def create_provider_profile(
 
     await db.commit()
     await db.refresh(provider_profile)
+    await invalidate_provider_caches(provider_profile.id, current_user.id)
 
     logger.info(
         f"Provider profile created successfully for user {current_user.email}")
@@ -104,8 +122,19 @@ async def update_provider_profile(
 
     # Update fields
     update_data = profile_data.model_dump(exclude_unset=True)
+    if update_data.get("availability") is not None:
+        try:
+            parse_schedule(update_data["availability"])
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid availability: {str(e)}",
+            )
     for field, value in update_data.items():
         setattr(provider_profile, field, value)
+    if "location" in update_data:
+        for field, value in geo_fields(update_data["location"]).items():
+            setattr(provider_profile, field, value)
 
     provider_profile.updated_at = datetime.utcnow()
 
@@ -117,8 +146,13 @@ async def update_provider_profile(
     if "location" in update_data:
         current_user.address = update_data["location"]
 
+    if "availability" in update_data:
+        await db.flush()
+        await refresh_provider_next_available(db, current_user.id)
+
     await db.commit()
     await db.refresh(provider_profile)
+    await invalidate_provider_caches(provider_profile.id, current_user.id)
 
     logger.info(f"Provider profile updated for user {current_user.email}")
     return provider_profile
@@ -152,33 +186,66 @@ async def get_my_provider_profile(
 
 
 @router.get("/", response_model=List[dict])  # Simplified response model
+@cached(ttl=120, tags=("providers",))
 async def list_providers(
     location: Optional[str] = None,
     service_id: Optional[int] = None,
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0, le=500),
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lng: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lng: Optional[float] = Query(None, ge=-180, le=180),
+    sort: Literal["id", "distance"] = "id",
     db: AsyncSession = Depends(get_db)
 ):
-    query = select(ProviderProfile).join(
-        User).where(User.role == UserRole.PROVIDER)
+    query = select(ProviderProfileModel).join(
+        User, ProviderProfileModel.user_id == User.id).where(User.role == UserRole.PROVIDER)
     if location:
-        query = query.where(ProviderProfile.location.ilike(f"%{location}%"))
+        query = query.where(ProviderProfileModel.location.ilike(f"%{location}%"))
 
     # Real logic would join with services to filter by service_id
 
+    bbox = parse_bbox(min_lat, min_lng, max_lat, max_lng)
+    query, distance = apply_geo_filter(
+        query, ProviderProfileModel, lat, lng, radius_km, bbox)
+    if distance is not None:
+        query = query.add_columns(distance.label("distance_km"))
+        if sort == "distance":
+            query = query.order_by(distance, ProviderProfileModel.id)
+    elif sort == "distance":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Sorting by distance requires lat and lng",
+        )
+    if sort == "id":
+        query = query.order_by(ProviderProfileModel.id)
+
     result = await db.execute(query)
-    return [
-        {
+    providers = []
+    for row in result.all():
+        p = row[0]
+        provider = {
             "id": p.id,
             "business_name": p.business_name,
             "bio": p.bio,
             "location": p.location,
-            "user_id": p.user_id
-        } for p in result.scalars().all()
-    ]
+            "user_id": p.user_id,
+            "latitude": p.latitude,
+            "longitude": p.longitude,
+        }
+        if distance is not None:
+            provider["distance_km"] = round(float(row.distance_km), 3)
+        providers.append(provider)
+    return providers
 
 
-@router.get("/{provider_id}")
+@router.get("/{provider_id}", response_model=ProviderProfile)
+@cached(ttl=300, tags=("provider_profile:{provider_id}",), model=ProviderProfile)
 async def get_provider(provider_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(ProviderProfile).where(ProviderProfile.id == provider_id))
+    result = await db.execute(
+        select(ProviderProfileModel).where(ProviderProfileModel.id == provider_id))
     provider = result.scalar_one_or_none()
     if not provider:
         raise HTTPException(status_code=404, detail="Provider not found")
@@ -186,8 +253,10 @@ async def get_provider(provider_id: int, db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/by-user/{user_id}")
+@cached(ttl=300, tags=("provider_user:{user_id}",))
 async def get_provider_by_user_id(user_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(ProviderProfile).where(ProviderProfile.user_id == user_id).join(User))
+    result = await db.execute(
+        select(ProviderProfileModel).where(ProviderProfileModel.user_id == user_id))
     profile = result.scalar_one_or_none()
 
     # If no profile exists, return a basic one from User info
@@ -202,4 +271,4 @@ async def get_provider_by_user_id(user_id: int, db: AsyncSession = Depends(get_d
             "bio": "Expert Service Provider",
             "location": "Global"
         }
-    return profile
+    return ProviderProfile.model_validate(profile)
@@ -4,11 +4,26 @@ from sqlalchemy import select
 from typing import List
 from ...database import get_db
 from ...models.review import Review
-from ...schemas.user import User
+from ...models.service import Service
+from ...models.user import UserRole
+from ...core.ratings import apply_review_delta
+from ...core.popularity import record_event, REVIEW_WEIGHT
+from ...core.cache import cached, invalidate_tags
+from ...core.principal import Principal
+from ..deps import get_current_principal
+from .services import invalidate_service_caches
 
 router = APIRouter()
 
+async def invalidate_review_caches(db: AsyncSession, service_id: int) -> None:
+    """Reviews change the listing and the service's rating aggregates."""
+    provider_id = await db.scalar(
+        select(Service.provider_id).where(Service.id == service_id))
+    await invalidate_tags(f"reviews:{service_id}")
+    await invalidate_service_caches(service_id, provider_id)
+
 @router.get("/{service_id}", response_model=List[dict])
+@cached(ttl=120, tags=("reviews:{service_id}",))
 async def list_reviews(service_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(Review).where(Review.service_id == service_id))
     return [
@@ -30,7 +45,12 @@ async def create_review(
 ):
     if not (1.0 <= rating <= 5.0):
         raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
-        
+
+    # Update the service aggregates in the same transaction as the insert
+    if not await apply_review_delta(db, service_id, rating, 1):
+        raise HTTPException(status_code=404, detail="Service not found")
+    await record_event(db, service_id, REVIEW_WEIGHT * rating / 5.0)
+
     db_review = Review(
         service_id=service_id,
         customer_id=1, # Placeholder
@@ -40,4 +60,26 @@ async def create_review(
     db.add(db_review)
     await db.commit()
     await db.refresh(db_review)
+    await invalidate_review_caches(db, service_id)
     return db_review
+
+@router.delete("/{review_id}")
+async def delete_review(
+    review_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    result = await db.execute(select(Review).where(Review.id == review_id))
+    review = result.scalar_one_or_none()
+    if not review:
+        raise HTTPException(status_code=404, detail="Review not found")
+
+    if review.customer_id != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=403, detail="Not authorized to delete this review")
+
+    await apply_review_delta(db, review.service_id, review.rating, -1)
+    await db.delete(review)
+    await db.commit()
+    await invalidate_review_caches(db, review.service_id)
+    return {"message": "Review deleted successfully"}
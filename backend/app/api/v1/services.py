@@ -1,84 +1,129 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
-from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload, joinedload
+from typing import List, Literal, Optional, Union
+from datetime import datetime, timedelta, timezone
 from ...database import get_db
-from ...models.service import Service, Category
-from ...models.review import Review
+from ...models.service import Service
 from ...schemas.service import (
     Service as ServiceSchema,
     ServiceCreate,
     Category as CategorySchema,
+    ServicePage,
 )
-from ...models.user import User
-from .auth import get_current_user
+from ...core.search import apply_service_search
+from ...core.popularity import get_top_services
+from ...core.categories import (
+    get_category_listing,
+    invalidate_categories,
+    notify_categories_changed,
+)
+from ...core.pagination import apply_keyset, keyset_page, sort_order
+from ...core.cache import cached, invalidate_tags
+from ...core.geo import apply_geo_filter, geo_fields, parse_bbox
+from ...core.facets import compute_service_facets
+from ...core.availability import refresh_next_available
+from ...core.principal import Principal
+from ..deps import get_current_principal
 
 router = APIRouter()
 
 
+async def invalidate_service_caches(service_id: int, provider_id: int) -> None:
+    """Drop cached responses that include a service after it changes."""
+    await invalidate_tags(
+        "services",
+        f"service:{service_id}",
+        f"provider_services:{provider_id}",
+    )
+
+
 @router.get("/categories", response_model=List[CategorySchema])
-async def list_categories(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Category))
-    categories = result.scalars().all()
-    
-    # Calculate service count for each category
-    categories_with_count = []
-    for category in categories:
-        service_count_result = await db.execute(
-            select(func.count(Service.id)).where(Service.category_id == category.id)
-        )
-        count = service_count_result.scalar()
-        category_dict = CategorySchema.model_validate(category).model_dump()
-        category_dict['service_count'] = count
-        categories_with_count.append(CategorySchema(**category_dict))
-    
-    return categories_with_count
+async def list_categories(request: Request, db: AsyncSession = Depends(get_db)):
+    # One grouped query, serialized once and served from memory until a
+    # write changes category membership
+    body, etag = await get_category_listing(db)
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.get("/recommended", response_model=List[ServiceSchema])
 async def get_recommended_services(
     limit: int = Query(6, ge=1, le=20),
+    sample: bool = Query(
+        True, description="Randomly sample from the most popular services"),
     db: AsyncSession = Depends(get_db)
 ):
     """Get recommended/popular services for the home page"""
-    # For now, return random services. Later implement based on
-    # popularity, ratings, etc.
-    query = select(Service).options(selectinload(
-        Service.provider)).order_by(func.random()).limit(limit)
-    result = await db.execute(query)
-    services = result.scalars().all()
-    
-    # Calculate rating and review count for each service
-    services_with_stats = []
-    for service in services:
-        review_stats = await db.execute(
-            select(
-                func.avg(Review.rating).label('avg_rating'),
-                func.count(Review.id).label('review_count')
-            ).where(Review.service_id == service.id)
-        )
-        stats = review_stats.first()
-        service_dict = ServiceSchema.model_validate(service).model_dump()
-        service_dict['rating'] = round(float(stats.avg_rating), 1) if stats.avg_rating else 0.0
-        service_dict['review_count'] = stats.review_count
-        services_with_stats.append(ServiceSchema(**service_dict))
-    
-    return services_with_stats
+    # Served from the precomputed popularity ranking (bookings, reviews and
+    # favorites with time decay), cached in-process between refreshes
+    return await get_top_services(db, limit, sample=sample)
+
+
+# Stable sort keys for list_services; each is paired with Service.id as a
+# tiebreaker so keyset cursors never skip or repeat rows
+SERVICE_SORT_KEYS = {
+    "id": Service.id,
+    "price": Service.price,
+    "rating": Service.rating,
+    "next_available": Service.next_available_sort,
+}
+
 
+def _service_result(row) -> ServiceSchema:
+    """Build a listing item from a row with optional search/distance columns."""
+    extra = row._mapping
+    update = {}
+    if "search_rank" in extra:
+        update["search_rank"] = round(float(extra["search_rank"]), 4)
+        update["highlight"] = extra["highlight"]
+    if "distance_km" in extra:
+        update["distance_km"] = round(float(extra["distance_km"]), 3)
+    return ServiceSchema.model_validate(row[0]).model_copy(update=update)
 
-@router.get("/", response_model=List[ServiceSchema])
+
+ServiceListing = Union[List[ServiceSchema], ServicePage]
+
+
+@router.get("/", response_model=ServiceListing)
+@cached(ttl=30, tags=("services",), model=ServiceListing)
 async def list_services(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(
+        None,
+        description="Opaque cursor from a previous page. Pass an empty value "
+                    "to start; the response is then a page with next_cursor.",
+    ),
+    sort: Literal["id", "price", "rating", "distance", "next_available"] = "id",
+    order: Literal["asc", "desc"] = "asc",
     category_id: Optional[int] = None,
     provider_id: Optional[int] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     search: Optional[str] = None,
+    available_today: bool = Query(
+        False, description="Only services with an open slot before midnight UTC"),
+    available_before: Optional[datetime] = Query(
+        None, description="Only services with an open slot before this time"),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0, le=500),
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lng: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lng: Optional[float] = Query(None, ge=-180, le=180),
+    facets: bool = Query(
+        False,
+        description="Include category, price, rating and location counts for "
+                    "the filtered set; the response is then a page object.",
+    ),
     db: AsyncSession = Depends(get_db)
 ):
-    query = select(Service).options(selectinload(Service.provider))
+    query = select(Service)
 
     if category_id:
         query = query.where(Service.category_id == category_id)
@@ -88,34 +133,68 @@ async def list_services(
         query = query.where(Service.price >= min_price)
     if max_price:
         query = query.where(Service.price <= max_price)
-    if search:
-        query = query.where(Service.name.ilike(f"%{search}%"))
+    if available_today:
+        tomorrow = datetime.now(timezone.utc).date() + timedelta(days=1)
+        query = query.where(Service.next_available_at < datetime(
+            tomorrow.year, tomorrow.month, tomorrow.day, tzinfo=timezone.utc))
+    if available_before:
+        query = query.where(Service.next_available_at < available_before)
+
+    bbox = parse_bbox(min_lat, min_lng, max_lat, max_lng)
+    query, distance = apply_geo_filter(query, Service, lat, lng, radius_km, bbox)
+    if distance is None and sort == "distance":
+        raise HTTPException(
+            status_code=400, detail="Sorting by distance requires lat and lng")
+
+    search_term = search.strip() if search else ""
+    if search_term:
+        query, rank, highlight = apply_service_search(query, search_term)
+
+    # Facets are counted over the filtered set, before paging
+    service_facets = await compute_service_facets(db, query) if facets else None
+
+    # Ratings are read from the denormalized columns on the service row and
+    # the provider is joined in, so each page is a single query
+    query = query.options(joinedload(Service.provider))
+    if distance is not None:
+        query = query.add_columns(distance.label("distance_km"))
+    if search_term:
+        # Search results are always ordered by relevance
+        query = query.add_columns(rank.label("search_rank"), highlight.label("highlight"))
+        sort_name, key, descending = "relevance", rank, True
+    elif sort == "distance":
+        sort_name, key, descending = sort, distance, order == "desc"
+    else:
+        sort_name, key, descending = sort, SERVICE_SORT_KEYS[sort], order == "desc"
+
+    if cursor is not None:
+        query = apply_keyset(query, key, Service.id, sort_name, cursor, limit, descending)
+        result = await db.execute(query)
+        rows, next_cursor = keyset_page(result.all(), limit, sort_name, descending)
+        return ServicePage(
+            items=[_service_result(row) for row in rows],
+            next_cursor=next_cursor,
+            facets=service_facets,
+        )
 
+    query = query.order_by(*sort_order(key, Service.id, descending))
     result = await db.execute(query.offset(skip).limit(limit))
-    services = result.scalars().all()
-    
-    # Calculate rating and review count for each service
-    services_with_stats = []
-    for service in services:
-        review_stats = await db.execute(
-            select(
-                func.avg(Review.rating).label('avg_rating'),
-                func.count(Review.id).label('review_count')
-            ).where(Review.service_id == service.id)
+    if search_term or distance is not None:
+        items = [_service_result(row) for row in result.all()]
+    else:
+        items = result.scalars().all()
+    if facets:
+        return ServicePage(
+            items=[ServiceSchema.model_validate(item) for item in items],
+            facets=service_facets,
         )
-        stats = review_stats.first()
-        service_dict = ServiceSchema.model_validate(service).model_dump()
-        service_dict['rating'] = round(float(stats.avg_rating), 1) if stats.avg_rating else 0.0
-        service_dict['review_count'] = stats.review_count
-        services_with_stats.append(ServiceSchema(**service_dict))
-    
-    return services_with_stats
+    return items
 
 
 @router.get("/provider/my-services", response_model=List[ServiceSchema])
 async def get_provider_services(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Get services for the current provider"""
     if current_user.role != "provider":
@@ -130,6 +209,7 @@ async def get_provider_services(
 
 
 @router.get("/{service_id}", response_model=ServiceSchema)
+@cached(ttl=300, tags=("service:{service_id}",), model=ServiceSchema)
 async def get_service(service_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(
         select(Service)
@@ -143,6 +223,7 @@ async def get_service(service_id: int, db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/by-provider/{provider_id}", response_model=List[ServiceSchema])
+@cached(ttl=300, tags=("provider_services:{provider_id}",), model=List[ServiceSchema])
 async def get_services_by_provider(
     provider_id: int,
     db: AsyncSession = Depends(get_db)
@@ -158,7 +239,7 @@ async def get_services_by_provider(
 async def create_provider_service(
     service_data: ServiceCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Create a new service for the current provider"""
     if current_user.role != "provider":
@@ -167,13 +248,20 @@ async def create_provider_service(
             detail="Only providers can create services"
         )
 
+    data = service_data.model_dump()
+    data.update(geo_fields(data["location"], data["latitude"], data["longitude"]))
     db_service = Service(
-        **service_data.model_dump(),
+        **data,
         provider_id=current_user.id
     )
     db.add(db_service)
+    await db.flush()
+    await refresh_next_available(db, [db_service.id])
+    await notify_categories_changed(db)
     await db.commit()
+    invalidate_categories()
     await db.refresh(db_service)
+    await invalidate_service_caches(db_service.id, current_user.id)
     return db_service
 
 
@@ -182,7 +270,7 @@ async def update_provider_service(
     service_id: int,
     service_data: ServiceCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Update an existing service for the current provider"""
     result = await db.execute(
@@ -195,11 +283,24 @@ async def update_provider_service(
         raise HTTPException(
             status_code=404, detail="Service not found or access denied")
 
-    for key, value in service_data.model_dump().items():
+    category_changed = db_service.category_id != service_data.category_id
+    duration_changed = db_service.duration_minutes != service_data.duration_minutes
+    data = service_data.model_dump()
+    data.update(geo_fields(data["location"], data["latitude"], data["longitude"]))
+    for key, value in data.items():
         setattr(db_service, key, value)
+    db_service.updated_at = datetime.now(timezone.utc)
 
+    if duration_changed:
+        await db.flush()
+        await refresh_next_available(db, [service_id])
+    if category_changed:
+        await notify_categories_changed(db)
     await db.commit()
+    if category_changed:
+        invalidate_categories()
     await db.refresh(db_service)
+    await invalidate_service_caches(service_id, current_user.id)
     return db_service
 
 
@@ -207,7 +308,7 @@ async def update_provider_service(
 async def delete_provider_service(
     service_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Delete a service for the current provider"""
     result = await db.execute(
@@ -221,5 +322,8 @@ async def delete_provider_service(
             status_code=404, detail="Service not found or access denied")
 
     await db.delete(db_service)
+    await notify_categories_changed(db)
     await db.commit()
+    invalidate_categories()
+    await invalidate_service_caches(service_id, current_user.id)
     return {"message": "Service deleted successfully"}
@@ -0,0 +1,163 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta, timezone
+from typing import List
+from ...database import get_db
+from ...models.booking import Booking, BookingStatus
+from ...models.service import Service
+from ...models.waitlist import WaitlistEntry, WaitlistStatus
+from ...schemas.waitlist import WaitlistEntry as WaitlistEntrySchema, WaitlistEntryCreate
+from ...core.bookings import flush_booking, invalidate_service_availability
+from ...core.waitlist import release_hold, slot_freed
+from ...core.principal import Principal
+from ..deps import get_current_principal
+
+router = APIRouter()
+
+MAX_WINDOW_DAYS = 31
+DUPLICATE_DETAIL = "You are already on the waitlist for this window"
+
+
+async def _get_own_entry(db: AsyncSession, entry_id: int, user: Principal) -> WaitlistEntry:
+    result = await db.execute(
+        select(WaitlistEntry).where(WaitlistEntry.id == entry_id).with_for_update()
+    )
+    entry = result.scalar_one_or_none()
+    if not entry or entry.customer_id != user.id:
+        raise HTTPException(status_code=404, detail="Waitlist entry not found")
+    return entry
+
+
+@router.post("/", response_model=WaitlistEntrySchema, status_code=status.HTTP_201_CREATED)
+async def join_waitlist(
+    entry_in: WaitlistEntryCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Wait for any slot of a service inside a time window.
+
+    When a matching slot is freed it is held for the earliest waiter,
+    who then has a few minutes to accept it.
+    """
+    if entry_in.window_end <= datetime.now(timezone.utc):
+        raise HTTPException(status_code=400, detail="Window is already over")
+    if entry_in.window_end - entry_in.window_start > timedelta(days=MAX_WINDOW_DAYS):
+        raise HTTPException(
+            status_code=400, detail=f"Window is limited to {MAX_WINDOW_DAYS} days")
+
+    result = await db.execute(select(Service.id).where(Service.id == entry_in.service_id))
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Service not found")
+
+    existing = await db.execute(
+        select(WaitlistEntry.id).where(
+            WaitlistEntry.customer_id == current_user.id,
+            WaitlistEntry.service_id == entry_in.service_id,
+            WaitlistEntry.window_start == entry_in.window_start,
+            WaitlistEntry.window_end == entry_in.window_end,
+            WaitlistEntry.status.in_([WaitlistStatus.WAITING, WaitlistStatus.OFFERED]),
+        )
+    )
+    if existing.first() is not None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=DUPLICATE_DETAIL)
+
+    entry = WaitlistEntry(
+        service_id=entry_in.service_id,
+        customer_id=current_user.id,
+        window_start=entry_in.window_start,
+        window_end=entry_in.window_end,
+    )
+    db.add(entry)
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        # A concurrent join for the same window won the unique index
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=DUPLICATE_DETAIL) from e
+    await db.refresh(entry)
+    return entry
+
+
+@router.get("/me", response_model=List[WaitlistEntrySchema])
+async def get_my_waitlist(
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    result = await db.execute(
+        select(WaitlistEntry)
+        .where(
+            WaitlistEntry.customer_id == current_user.id,
+            WaitlistEntry.status.in_([WaitlistStatus.WAITING, WaitlistStatus.OFFERED]),
+        )
+        .order_by(WaitlistEntry.created_at.desc())
+    )
+    return result.scalars().all()
+
+
+@router.post("/{entry_id}/accept", response_model=WaitlistEntrySchema)
+async def accept_offer(
+    entry_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Turn an offered slot into a pending booking."""
+    entry = await _get_own_entry(db, entry_id, current_user)
+    if entry.status != WaitlistStatus.OFFERED:
+        raise HTTPException(status_code=400, detail="No open offer for this entry")
+    if entry.offer_expires_at <= datetime.now(timezone.utc) or entry.booking_id is None:
+        raise HTTPException(status_code=409, detail="Offer has expired")
+
+    booking = await db.get(Booking, entry.booking_id)
+    if (booking is None or booking.status != BookingStatus.PENDING
+            or booking.hold_expires_at is None):
+        raise HTTPException(status_code=409, detail="Offer has expired")
+    booking.hold_expires_at = None
+    booking.notes = "Booked from waitlist"
+    entry.status = WaitlistStatus.ACCEPTED
+    await flush_booking(db)
+    await db.commit()
+    await db.refresh(entry)
+    return entry
+
+
+@router.post("/{entry_id}/decline", response_model=WaitlistEntrySchema)
+async def decline_offer(
+    entry_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Give an offered slot back; it goes to the next waiter."""
+    entry = await _get_own_entry(db, entry_id, current_user)
+    if entry.status != WaitlistStatus.OFFERED:
+        raise HTTPException(status_code=400, detail="No open offer for this entry")
+    return await _close_entry(db, entry)
+
+
+@router.delete("/{entry_id}", response_model=WaitlistEntrySchema)
+async def leave_waitlist(
+    entry_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Stop waiting, releasing any slot currently offered."""
+    entry = await _get_own_entry(db, entry_id, current_user)
+    if entry.status not in (WaitlistStatus.WAITING, WaitlistStatus.OFFERED):
+        raise HTTPException(status_code=400, detail="Entry is no longer active")
+    return await _close_entry(db, entry)
+
+
+async def _close_entry(db: AsyncSession, entry: WaitlistEntry) -> WaitlistEntry:
+    slot = None
+    if entry.status == WaitlistStatus.OFFERED:
+        slot = await release_hold(db, entry.booking_id)
+    entry.status = WaitlistStatus.CANCELLED
+    if slot is not None:
+        await slot_freed(db, *slot)
+    await db.commit()
+    await db.refresh(entry)
+    if slot is not None:
+        await invalidate_service_availability(db, [slot[0]])
+    return entry
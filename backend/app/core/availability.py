@@ -0,0 +1,462 @@
+"""
+Availability engine: free slots from provider working hours and bookings.
+
+A provider's `availability` JSON holds a weekly schedule plus optional
+breaks, date exceptions and a timezone, e.g.
+
+    {
+        "timezone": "America/New_York",
+        "mon": "09:00-17:00",
+        "tue": ["09:00-12:00", "13:00-18:00"],
+        "wed": {"start": "09:00", "end": "17:00", "breaks": ["12:00-12:30"]},
+        "sat": "closed",
+        "breaks": ["12:00-13:00"],
+        "exceptions": {"2026-12-24": "09:00-13:00", "2026-12-25": "closed"}
+    }
+
+Day keys may be abbreviated ("mon") or full ("monday"). Top-level
+`breaks` apply to every day, either as a list or per day. An exception
+replaces the weekly hours of its date. Ranges ending at or before their
+start run past midnight. Without a schedule every day is 09:00-17:00.
+
+Everything is computed on sorted interval lists: working hours minus
+breaks per day, then one merge-style sweep against the service's sorted
+bookings for the whole range, then fixed-size slots cut from what is left.
+"""
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.booking import Booking
+from ..models.provider import ProviderProfile
+from ..models.service import Service
+from .bookings import live_booking, slot_range
+from .recurrence import load_series_busy
+
+logger = logging.getLogger(__name__)
+
+# How far ahead next_available_at looks; beyond that a service shows as unavailable
+NEXT_AVAILABLE_HORIZON_DAYS = 30
+ROLLOVER_BATCH_SIZE = 500
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+DEFAULT_AVAILABILITY = {day: "09:00-17:00" for day in WEEKDAYS}
+MAX_RANGE_DAYS = 92
+CLOSED = ("closed", "off", "none")
+
+Interval = Tuple[datetime, datetime]
+MinuteRange = Tuple[int, int]
+
+
+class Schedule(NamedTuple):
+    tz: ZoneInfo
+    weekly: Dict[int, List[MinuteRange]]  # weekday -> minutes after local midnight
+    exceptions: Dict[date, List[MinuteRange]]
+
+
+def _minutes(value: str) -> int:
+    hours, _, minutes = value.strip().partition(":")
+    total = int(hours) * 60 + int(minutes or 0)
+    if not 0 <= total <= 24 * 60:
+        raise ValueError(f"Invalid time of day: {value!r}")
+    return total
+
+
+def _parse_range(value: str) -> MinuteRange:
+    start, sep, end = value.partition("-")
+    if not sep:
+        raise ValueError(f"Invalid time range: {value!r}")
+    lo, hi = _minutes(start), _minutes(end)
+    if hi <= lo:
+        hi += 24 * 60  # overnight
+    return lo, hi
+
+
+def _parse_ranges(value) -> List[MinuteRange]:
+    """Normalize one day's hours (string, list, or {start, end, breaks})."""
+    if value is None or value is False:
+        return []
+    if isinstance(value, str):
+        if value.strip().lower() in CLOSED or not value.strip():
+            return []
+        return merge([_parse_range(part) for part in value.split(",")])
+    if isinstance(value, dict):
+        if "start" not in value or "end" not in value:
+            raise ValueError(f"Hours need a start and an end: {value!r}")
+        ranges = [_parse_range(f"{value['start']}-{value['end']}")]
+        return subtract(ranges, _parse_ranges(value.get("breaks")))
+    if isinstance(value, (list, tuple)):
+        ranges: List[MinuteRange] = []
+        for item in value:
+            ranges.extend(_parse_ranges(item))
+        return merge(ranges)
+    raise ValueError(f"Invalid hours: {value!r}")
+
+
+def _weekday(key: str) -> Optional[int]:
+    prefix = key.strip().lower()[:3]
+    return WEEKDAYS.index(prefix) if prefix in WEEKDAYS else None
+
+
+def parse_schedule(raw: Optional[dict]) -> Schedule:
+    """Parse a provider's availability JSON. Raises ValueError if malformed."""
+    raw = raw or DEFAULT_AVAILABILITY
+    if not isinstance(raw, dict):
+        raise ValueError("Availability must be an object")
+
+    tz_name = raw.get("timezone") or raw.get("tz") or "UTC"
+    try:
+        tz = ZoneInfo(tz_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {tz_name!r}")
+
+    days = raw.get("weekly") or raw
+    weekly: Dict[int, List[MinuteRange]] = {}
+    for key, value in days.items():
+        weekday = _weekday(key)
+        if weekday is not None:
+            weekly[weekday] = _parse_ranges(value)
+
+    breaks = raw.get("breaks")
+    if breaks:
+        if isinstance(breaks, dict):
+            per_day = {_weekday(k): _parse_ranges(v) for k, v in breaks.items()}
+        else:
+            every_day = _parse_ranges(breaks)
+            per_day = {weekday: every_day for weekday in range(7)}
+        for weekday, holes in per_day.items():
+            if weekday in weekly:
+                weekly[weekday] = subtract(weekly[weekday], holes)
+
+    exceptions = {
+        date.fromisoformat(day): _parse_ranges(value)
+        for day, value in (raw.get("exceptions") or {}).items()
+    }
+    return Schedule(tz=tz, weekly=weekly, exceptions=exceptions)
+
+
+def merge(intervals: Iterable[tuple]) -> List[tuple]:
+    """Sort and coalesce overlapping or touching intervals."""
+    merged: List[list] = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(i) for i in merged]
+
+
+def subtract(intervals: Sequence[tuple], holes: Sequence[tuple]) -> List[tuple]:
+    """
+    Remove `holes` from `intervals` in one sweep.
+
+    Both inputs must be sorted and non-overlapping (as returned by merge).
+    """
+    result = []
+    j = 0
+    for start, end in intervals:
+        # Holes that end before this interval can't touch later ones either
+        while j < len(holes) and holes[j][1] <= start:
+            j += 1
+        k = j
+        cursor = start
+        while k < len(holes) and holes[k][0] < end:
+            if holes[k][0] > cursor:
+                result.append((cursor, holes[k][0]))
+            cursor = max(cursor, holes[k][1])
+            k += 1
+        if cursor < end:
+            result.append((cursor, end))
+    return result
+
+
+def working_intervals(schedule: Schedule, start_date: date, end_date: date) -> List[Interval]:
+    """Working hours from start_date through end_date as sorted UTC intervals."""
+    intervals: List[Interval] = []
+    # Start a day early so overnight hours spilling into the range count
+    day = start_date - timedelta(days=1)
+    while day <= end_date:
+        ranges = schedule.exceptions.get(day)
+        if ranges is None:
+            ranges = schedule.weekly.get(day.weekday(), [])
+        midnight = datetime(day.year, day.month, day.day, tzinfo=schedule.tz)
+        for lo, hi in ranges:
+            # Wall-clock arithmetic, so 09:00 stays 09:00 across DST changes
+            intervals.append((
+                (midnight + timedelta(minutes=lo)).astimezone(timezone.utc),
+                (midnight + timedelta(minutes=hi)).astimezone(timezone.utc),
+            ))
+        day += timedelta(days=1)
+
+    window_start = datetime(
+        start_date.year, start_date.month, start_date.day, tzinfo=schedule.tz
+    ).astimezone(timezone.utc)
+    window_end = (datetime(
+        end_date.year, end_date.month, end_date.day, tzinfo=schedule.tz
+    ) + timedelta(days=1)).astimezone(timezone.utc)
+    clipped = [(max(s, window_start), min(e, window_end)) for s, e in intervals]
+    return merge(clipped)
+
+
+def slot_starts(
+    free: Sequence[Interval],
+    duration: timedelta,
+    step: Optional[timedelta] = None,
+    not_before: Optional[datetime] = None,
+) -> List[datetime]:
+    """Start times of `duration`-long slots inside the free intervals."""
+    step = step or duration
+    starts: List[datetime] = []
+    for start, end in free:
+        t = start
+        if not_before is not None and t < not_before:
+            # Jump to the first step boundary at or after not_before
+            skipped = -(-(not_before - t) // step)
+            t += skipped * step
+        while t + duration <= end:
+            starts.append(t)
+            t += step
+    return starts
+
+
+def slot_bitmap(
+    free: Sequence[Interval],
+    origin: datetime,
+    count: int,
+    step: timedelta,
+    duration: timedelta,
+    not_before: Optional[datetime] = None,
+) -> int:
+    """
+    Free slots on a fixed grid as an int bitmap.
+
+    Bit `count - 1 - i` is set when [origin + i*step, + duration) lies in
+    a free interval, so the most significant bit is the first slot.
+    """
+    bits = 0
+    for start, end in free:
+        if not_before is not None and start < not_before:
+            start = not_before
+        # First and last grid index whose slot fits in [start, end)
+        first = max(0, -(-(start - origin) // step))
+        last = min(count - 1, (end - duration - origin) // step)
+        if first <= last:
+            width = last - first + 1
+            bits |= ((1 << width) - 1) << (count - 1 - last)
+    return bits
+
+
+async def load_schedules(
+    db: AsyncSession,
+    provider_ids: Iterable[int],
+    strict: bool = True,
+) -> Dict[int, Schedule]:
+    """
+    Schedules of several providers (by user id) in one query.
+
+    Providers without a profile get the default hours. An unreadable
+    schedule raises ValueError, or with strict=False is logged and
+    treated as never open.
+    """
+    provider_ids = list(set(provider_ids))
+    stored: Dict[int, Optional[dict]] = {provider_id: None for provider_id in provider_ids}
+    if provider_ids:
+        result = await db.execute(
+            select(ProviderProfile.user_id, ProviderProfile.availability)
+            .where(ProviderProfile.user_id.in_(provider_ids))
+        )
+        stored.update(result.all())
+
+    schedules: Dict[int, Schedule] = {}
+    for provider_id, raw in stored.items():
+        try:
+            schedules[provider_id] = parse_schedule(raw)
+        except ValueError as e:
+            if strict:
+                raise
+            logger.warning(f"Unreadable availability for provider {provider_id}: {str(e)}")
+            schedules[provider_id] = Schedule(tz=ZoneInfo("UTC"), weekly={}, exceptions={})
+    return schedules
+
+
+async def load_schedule(db: AsyncSession, provider_id: int) -> Schedule:
+    """Schedule of a provider (by user id); default hours if none is stored."""
+    return (await load_schedules(db, [provider_id]))[provider_id]
+
+
+async def load_busy(
+    db: AsyncSession,
+    service_ids: Sequence[int],
+    window: Interval,
+) -> Dict[int, List[Interval]]:
+    """
+    Merged intervals of live bookings, holds and recurring series
+    occurrences per service within a window.
+    """
+    busy: Dict[int, List[Interval]] = {service_id: [] for service_id in service_ids}
+    if not service_ids:
+        return busy
+    # Overlap on the exclusion constraint's GiST index, already sorted
+    result = await db.execute(
+        select(Booking.service_id, Booking.start_time, Booking.end_time)
+        .where(
+            Booking.service_id.in_(service_ids),
+            live_booking(),
+            Booking.during.op("&&")(slot_range(*window)),
+        )
+        .order_by(Booking.service_id, Booking.start_time)
+    )
+    for service_id, start, end in result.all():
+        busy[service_id].append((start, end))
+    for service_id, intervals in (await load_series_busy(db, service_ids, window)).items():
+        busy[service_id].extend(intervals)
+    return {service_id: merge(intervals) for service_id, intervals in busy.items()}
+
+
+def free_slots(
+    working: Sequence[Interval],
+    busy: Sequence[Interval],
+    duration_minutes: int,
+    step_minutes: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> List[datetime]:
+    """Bookable start times for one service."""
+    return slot_starts(
+        subtract(working, busy),
+        timedelta(minutes=duration_minutes),
+        timedelta(minutes=step_minutes) if step_minutes else None,
+        now or datetime.now(timezone.utc),
+    )
+
+
+def first_slot(
+    working: Sequence[Interval],
+    busy: Sequence[Interval],
+    duration_minutes: int,
+    now: datetime,
+) -> Optional[datetime]:
+    """Earliest bookable start, without building the full slot list."""
+    duration = timedelta(minutes=duration_minutes)
+    for interval in subtract(working, busy):
+        starts = slot_starts([interval], duration, None, now)
+        if starts:
+            return starts[0]
+    return None
+
+
+async def refresh_next_available(
+    db: AsyncSession,
+    service_ids: Iterable[int],
+    now: Optional[datetime] = None,
+) -> Dict[int, Optional[datetime]]:
+    """
+    Recompute services.next_available_at for the given services.
+
+    Three reads (services, schedules, bookings) and one batched UPDATE,
+    in the caller's transaction. Returns the new values by service id.
+    """
+    service_ids = list(set(service_ids))
+    if not service_ids:
+        return {}
+    now = now or datetime.now(timezone.utc)
+    result = await db.execute(
+        select(Service.id, Service.provider_id, Service.duration_minutes)
+        .where(Service.id.in_(service_ids))
+    )
+    services = result.all()
+    schedules = await load_schedules(
+        db, {s.provider_id for s in services if s.provider_id is not None}, strict=False)
+
+    # A day of slack on each side covers every provider timezone
+    start_date = (now - timedelta(days=1)).date()
+    end_date = (now + timedelta(days=NEXT_AVAILABLE_HORIZON_DAYS)).date()
+    working = {
+        provider_id: working_intervals(schedule, start_date, end_date)
+        for provider_id, schedule in schedules.items()
+    }
+    busy = await load_busy(
+        db, [s.id for s in services],
+        (now, now + timedelta(days=NEXT_AVAILABLE_HORIZON_DAYS + 2)),
+    )
+
+    values = {
+        s.id: first_slot(working.get(s.provider_id, []), busy[s.id], s.duration_minutes, now)
+        for s in services
+    }
+    await db.execute(
+        update(Service),
+        [{"id": service_id, "next_available_at": at} for service_id, at in values.items()],
+    )
+    return values
+
+
+async def refresh_provider_next_available(db: AsyncSession, provider_id: int) -> None:
+    """Recompute next_available_at for every service of a provider."""
+    result = await db.execute(select(Service.id).where(Service.provider_id == provider_id))
+    await refresh_next_available(db, result.scalars().all())
+
+
+async def update_next_available_for_booking(
+    db: AsyncSession,
+    service_id: int,
+    start_time: datetime,
+    end_time: datetime,
+    freed: bool,
+) -> None:
+    """
+    Keep next_available_at current after a booking takes or frees a slot.
+
+    Most changes can't move the earliest slot: taking a slot only matters
+    if it overlaps the current earliest one, and freeing one only if it
+    lies before it. Only those cases pay for a recompute.
+    """
+    result = await db.execute(
+        select(Service.next_available_at, Service.duration_minutes)
+        .where(Service.id == service_id)
+    )
+    row = result.one_or_none()
+    if row is None:
+        return
+    current, duration_minutes = row
+    if freed:
+        stale = current is None or start_time < current
+    else:
+        stale = current is not None and (
+            start_time < current + timedelta(minutes=duration_minutes)
+            and end_time > current
+        )
+    if stale:
+        await refresh_next_available(db, [service_id])
+
+
+async def roll_next_available(db: AsyncSession, include_unavailable: bool = False) -> int:
+    """
+    Advance next_available_at for services whose earliest slot has passed.
+
+    With include_unavailable, services with no slot inside the horizon
+    are rechecked too, as the horizon moves forward. Returns the number
+    of services recomputed.
+    """
+    stale = Service.next_available_at < datetime.now(timezone.utc)
+    if include_unavailable:
+        stale = or_(stale, Service.next_available_at.is_(None))
+
+    total = 0
+    last_id = 0
+    while True:
+        result = await db.execute(
+            select(Service.id)
+            .where(stale, Service.id > last_id)
+            .order_by(Service.id)
+            .limit(ROLLOVER_BATCH_SIZE)
+        )
+        batch = result.scalars().all()
+        if not batch:
+            return total
+        await refresh_next_available(db, batch)
+        total += len(batch)
+        last_id = batch[-1]
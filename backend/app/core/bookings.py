@@ -0,0 +1,201 @@
+"""
+Slot conflict handling for bookings.
+
+The bookings_no_overlap exclusion constraint is the source of truth: two
+non-cancelled bookings of one service can never overlap, whichever code
+path or process inserts them. `ensure_slot_free` is only a fast pre-check
+that answers most conflicts without attempting a write; `flush_booking`
+turns the constraint violation raised by a lost race into the same 409.
+
+Checkout holds are pending bookings with `hold_expires_at` set, so the
+constraint covers them too. An expired hold stops counting at once for
+availability and pre-checks; it is cancelled (freeing the constraint)
+lazily by the next booking attempt on its slot, or by the sweeper in
+app.core.jobs.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.booking import Booking, BookingStatus
+from ..models.service import Service
+from .cache import invalidate_tags
+from .config import settings
+from .recurrence import load_series_busy, lock_service_slots
+
+VALID_STATUSES = ["pending", "confirmed", "completed", "cancelled"]
+
+# Status changes a user may make; cancelled and completed are final
+TRANSITIONS = {
+    BookingStatus.PENDING: {BookingStatus.CONFIRMED, BookingStatus.CANCELLED},
+    BookingStatus.CONFIRMED: {BookingStatus.COMPLETED, BookingStatus.CANCELLED},
+}
+
+OVERLAP_CONSTRAINT = "bookings_no_overlap"
+EXCLUSION_VIOLATION = "23P01"
+CONFLICT_DETAIL = "Booking conflict: slot already taken"
+STALE_DETAIL = "Booking was modified by someone else; reload and retry"
+
+
+def slot_range(start_time: datetime, end_time: datetime):
+    """SQL tstzrange matching Booking.during for a candidate slot."""
+    return func.tstzrange(start_time, end_time, "[)")
+
+
+def live_booking():
+    """Bookings that occupy their slot: not cancelled, not a lapsed hold."""
+    return and_(
+        Booking.status != BookingStatus.CANCELLED,
+        or_(Booking.hold_expires_at.is_(None), Booking.hold_expires_at > func.now()),
+    )
+
+
+def hold_expiry() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(minutes=settings.SLOT_HOLD_MINUTES)
+
+
+def status_change_error(
+    user,
+    customer_id: Optional[int],
+    provider_id: Optional[int],
+    current_status: BookingStatus,
+    new_status: str,
+    on_hold: bool = False,
+) -> Optional[Tuple[int, str]]:
+    """
+    Check whether `user` may move a booking to `new_status`.
+
+    Returns (status code, detail) for the first rule that fails, or None.
+    Providers and admins may make any change in TRANSITIONS; customers
+    may only cancel their own pending bookings. Asking for the current
+    status is allowed, so callers can treat retries as no-ops.
+
+    A booking `on_hold` (hold_expires_at set: a checkout hold or a
+    waitlist offer) cannot be confirmed here. Payment or accepting the
+    offer confirms it and clears the expiry, without which a lapsed hold
+    would stop counting as taken while still holding its slot.
+    """
+    is_customer = customer_id == user.id
+    is_provider = provider_id is not None and provider_id == user.id
+    is_admin = user.role == "admin"
+
+    if not (is_customer or is_provider or is_admin):
+        return 403, "Not authorized to update this booking"
+
+    if new_status not in VALID_STATUSES:
+        return 400, f"Invalid status. Must be one of: {VALID_STATUSES}"
+    target = BookingStatus(new_status)
+    if target != current_status and target not in TRANSITIONS.get(current_status, ()):
+        return 400, f"Cannot change a {current_status.value} booking to {new_status}"
+    if on_hold and target == BookingStatus.CONFIRMED:
+        return 409, "Booking is held for checkout; it is confirmed once paid"
+
+    # Customers can only cancel their pending bookings
+    if is_customer and not is_admin:
+        if new_status != "cancelled":
+            return 403, "Customers can only cancel bookings"
+        if current_status != BookingStatus.PENDING:
+            return 400, "Can only cancel pending bookings"
+    return None
+
+
+def is_overlap_violation(error: IntegrityError) -> bool:
+    orig = error.orig
+    code = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+    return code == EXCLUSION_VIOLATION or OVERLAP_CONSTRAINT in str(orig)
+
+
+async def ensure_slot_free(
+    db: AsyncSession,
+    service_id: int,
+    start_time: datetime,
+    end_time: datetime,
+    exclude_booking_id: Optional[int] = None,
+) -> None:
+    """
+    Raise 409 if a live booking or a recurring series occurrence of the
+    service overlaps the slot.
+
+    Expired holds on the slot are cancelled first, so the insert that
+    follows is not rejected by the constraint on their account. The
+    service's series lock is held shared until commit, so no series can
+    be created over the slot in the meantime.
+    """
+    await lock_service_slots(db, service_id)
+    await release_expired_holds(db, service_id, start_time, end_time)
+    query = select(Booking.id).where(
+        Booking.service_id == service_id,
+        live_booking(),
+        Booking.during.op("&&")(slot_range(start_time, end_time)),
+    )
+    if exclude_booking_id is not None:
+        query = query.where(Booking.id != exclude_booking_id)
+    if (await db.execute(query.limit(1))).first() is not None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=CONFLICT_DETAIL)
+    series_busy = await load_series_busy(db, [service_id], (start_time, end_time))
+    if series_busy[service_id]:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=CONFLICT_DETAIL)
+
+
+async def flush_booking(db: AsyncSession) -> None:
+    """
+    Flush pending booking writes, mapping an overlap violation or a lost
+    compare-and-set on Booking.version to 409.
+
+    The transaction is rolled back on any integrity error, so callers
+    should flush before doing other work in the same transaction.
+    """
+    try:
+        await db.flush()
+    except StaleDataError as e:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=STALE_DETAIL) from e
+    except IntegrityError as e:
+        await db.rollback()
+        if is_overlap_violation(e):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT, detail=CONFLICT_DETAIL
+            ) from e
+        raise
+
+
+async def release_expired_holds(
+    db: AsyncSession,
+    service_id: Optional[int] = None,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+) -> List[Tuple[int, datetime, datetime]]:
+    """
+    Cancel lapsed checkout holds, optionally only those on one slot.
+
+    Returns the (service_id, start_time, end_time) slots released.
+    """
+    stmt = update(Booking).where(
+        Booking.status == BookingStatus.PENDING,
+        Booking.hold_expires_at.is_not(None),
+        Booking.hold_expires_at <= func.now(),
+    )
+    if service_id is not None:
+        stmt = stmt.where(
+            Booking.service_id == service_id,
+            Booking.during.op("&&")(slot_range(start_time, end_time)),
+        )
+    result = await db.execute(
+        stmt.values(status=BookingStatus.CANCELLED, version=Booking.version + 1)
+        .returning(Booking.service_id, Booking.start_time, Booking.end_time)
+        .execution_options(synchronize_session=False)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+async def invalidate_service_availability(db: AsyncSession, service_ids: List[int]) -> None:
+    if not service_ids:
+        return
+    result = await db.execute(
+        select(Service.provider_id).where(Service.id.in_(service_ids)).distinct()
+    )
+    await invalidate_tags(*(f"availability:{p}" for p in result.scalars() if p is not None))
+
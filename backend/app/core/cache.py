@@ -0,0 +1,271 @@
+"""
+Response cache for anonymous GET endpoints.
+
+Usage, below the router decorator:
+
+    @router.get("/{service_id}", response_model=ServiceSchema)
+    @cached(ttl=60, tags=("service:{service_id}",), model=ServiceSchema)
+    async def get_service(service_id: int, db: AsyncSession = Depends(get_db)):
+        ...
+
+The key is derived from the endpoint and its resolved path/query
+parameters. Tags are formatted with the same parameters; write endpoints
+call `invalidate_tags(...)` after committing. Entries live in Redis when
+REDIS_URL is set and in process memory otherwise (or while Redis is
+unreachable). Concurrent misses for one key are coalesced in-process and
+guarded by a short Redis lock across processes, so an expiring hot key
+is recomputed once rather than by every request.
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "cache:"
+TAG_PREFIX = "cache-tag:"
+LOCK_PREFIX = "cache-lock:"
+
+# How long a recomputation may hold the lock, and how long other
+# processes wait for it before computing the value themselves
+LOCK_TTL_SECONDS = 5.0
+LOCK_WAIT_SECONDS = 2.0
+LOCK_POLL_SECONDS = 0.05
+
+# Tag sets outlive the entries they point to; stale members are harmless
+TAG_TTL_SECONDS = 24 * 3600
+
+
+class MemoryCacheBackend:
+    """In-process stand-in for Redis, used in tests and as a fallback."""
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._locks: Dict[str, float] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str]) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+    async def invalidate(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            for key in self._tags.pop(tag, ()):
+                self._entries.pop(key, None)
+
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        now = time.monotonic()
+        if self._locks.get(key, 0.0) > now:
+            return None
+        self._locks[key] = now + ttl
+        return key
+
+    async def release_lock(self, key: str, token: str) -> None:
+        self._locks.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._tags.clear()
+        self._locks.clear()
+
+
+class RedisCacheBackend:
+    # Delete the lock only if we still own it
+    _RELEASE_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) else return 0 end"
+    )
+
+    def __init__(self, url: str):
+        self._redis = aioredis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._redis.get(KEY_PREFIX + key)
+
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str]) -> None:
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.set(KEY_PREFIX + key, value, px=int(ttl * 1000))
+            for tag in tags:
+                pipe.sadd(TAG_PREFIX + tag, key)
+                pipe.expire(TAG_PREFIX + tag, TAG_TTL_SECONDS)
+            await pipe.execute()
+
+    async def invalidate(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            keys = await self._redis.smembers(TAG_PREFIX + tag)
+            to_delete = [KEY_PREFIX + k.decode() for k in keys] + [TAG_PREFIX + tag]
+            await self._redis.delete(*to_delete)
+
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        acquired = await self._redis.set(
+            LOCK_PREFIX + key, token, nx=True, px=int(ttl * 1000))
+        return token if acquired else None
+
+    async def release_lock(self, key: str, token: str) -> None:
+        await self._redis.eval(self._RELEASE_SCRIPT, 1, LOCK_PREFIX + key, token)
+
+    async def clear(self) -> None:
+        async for key in self._redis.scan_iter(match="cache*"):
+            await self._redis.delete(key)
+
+
+class ResponseCache:
+    """Cache facade that degrades to process memory if Redis fails."""
+
+    def __init__(self, redis_url: str = ""):
+        self.memory = MemoryCacheBackend()
+        self.backend = RedisCacheBackend(redis_url) if redis_url else self.memory
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def _call(self, method: str, *args):
+        try:
+            return await getattr(self.backend, method)(*args)
+        except (RedisError, OSError) as e:
+            logger.warning(f"Cache backend error on {method}, using memory: {str(e)}")
+            return await getattr(self.memory, method)(*args)
+
+    async def invalidate(self, *tags: str) -> None:
+        await self._call("invalidate", tags)
+        if self.backend is not self.memory:
+            await self.memory.invalidate(tags)
+
+    async def clear(self) -> None:
+        await self._call("clear")
+        await self.memory.clear()
+
+    async def get_or_compute(
+        self,
+        key: str,
+        ttl: float,
+        tags: Iterable[str],
+        compute: Callable[[], Any],
+    ) -> Tuple[bytes, bool]:
+        """Return (value, hit). Misses are computed once per key at a time."""
+        value = await self._call("get", key)
+        if value is not None:
+            return value, True
+
+        # Coalesce concurrent misses within this process
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight), False
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._compute_locked(key, ttl, tags, compute)
+            future.set_result(value)
+            return value, False
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody may be waiting; don't warn about an unretrieved exception
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _compute_locked(self, key, ttl, tags, compute) -> bytes:
+        # Across processes, let the lock holder compute while others wait
+        token = await self._call("acquire_lock", key, LOCK_TTL_SECONDS)
+        if token is None:
+            deadline = time.monotonic() + LOCK_WAIT_SECONDS
+            while time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+                value = await self._call("get", key)
+                if value is not None:
+                    return value
+
+        try:
+            value = await compute()
+            await self._call("set", key, value, ttl, list(tags))
+            return value
+        finally:
+            if token is not None:
+                await self._call("release_lock", key, token)
+
+
+response_cache = ResponseCache(settings.REDIS_URL)
+
+
+async def invalidate_tags(*tags: str) -> None:
+    await response_cache.invalidate(*tags)
+
+
+def _cache_key(func: Callable, params: Dict[str, Any]) -> str:
+    raw = json.dumps(params, sort_keys=True, default=str)
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return f"{func.__module__}.{func.__name__}:{digest}"
+
+
+def cached(
+    ttl: float,
+    tags: Iterable[str] = (),
+    model: Any = None,
+):
+    """
+    Cache the JSON response of an anonymous GET endpoint.
+
+    `tags` are format strings over the endpoint's parameters. `model` is
+    the response model used to serialize ORM results; without it the
+    result must be JSON-encodable as is.
+    """
+    adapter = TypeAdapter(model) if model is not None else None
+
+    def decorator(func: Callable):
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            params = {
+                name: value for name, value in kwargs.items()
+                if not isinstance(value, (AsyncSession, Request))
+            }
+            key = _cache_key(func, params)
+            resolved_tags = [tag.format(**params) for tag in tags]
+
+            async def compute() -> bytes:
+                result = await func(**kwargs)
+                if adapter is not None:
+                    return adapter.dump_json(
+                        adapter.validate_python(result, from_attributes=True))
+                return json.dumps(jsonable_encoder(result)).encode()
+
+            body, hit = await response_cache.get_or_compute(
+                key, ttl, resolved_tags, compute)
+            return Response(
+                content=body,
+                media_type="application/json",
+                headers={"X-Cache": "HIT" if hit else "MISS"},
+            )
+
+        return wrapper
+
+    return decorator
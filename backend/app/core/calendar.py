@@ -0,0 +1,299 @@
+"""
+iCalendar (.ics) feeds of a user's bookings for external calendars.
+
+Each user can mint a secret feed URL; only a SHA-256 of the secret is
+stored. A feed covers a rolling window of FEED_PAST_DAYS back and
+FEED_FUTURE_DAYS ahead, anchored at UTC midnight so it only moves once
+a day. Providers get the bookings of their services, everyone else
+their own bookings; recurring series are expanded into one event per
+occurrence within the window.
+
+Calendar clients poll feeds often and rarely find changes, so the
+validators (ETag and Last-Modified) come from a single aggregate query
+over the window: the latest updated_at and row counts of bookings and
+series, and the latest updated_at of the services (and, for providers,
+customers) they name, whose text the events show. A matching
+If-None-Match or If-Modified-Since is answered with 304 before anything
+is serialized. Otherwise the body is streamed through a server-side
+cursor.
+"""
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Callable, Optional, Tuple
+from sqlalchemy import func, select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import SessionLocal
+from ..models.booking import Booking, BookingStatus
+from ..models.booking_series import BookingSeries
+from ..models.service import Service
+from ..models.user import User, UserRole
+from .config import settings
+from .recurrence import materialized_occurrences, recurrence_for, series_range
+
+FEED_PAST_DAYS = 30
+FEED_FUTURE_DAYS = 180
+FEED_BATCH_SIZE = 500
+# Bump when the event format changes so clients refetch
+FEED_FORMAT_VERSION = 1
+
+UID_DOMAIN = "booking-platform"
+PRODID = f"-//{settings.PROJECT_NAME}//Bookings//EN"
+
+ICS_STATUS = {
+    BookingStatus.PENDING: "TENTATIVE",
+    BookingStatus.CONFIRMED: "CONFIRMED",
+    BookingStatus.COMPLETED: "CONFIRMED",
+    BookingStatus.CANCELLED: "CANCELLED",
+}
+
+Window = Tuple[datetime, datetime]
+
+
+def new_feed_token() -> Tuple[str, str]:
+    """A fresh feed secret and the hash to store for it."""
+    token = secrets.token_urlsafe(32)
+    return token, hash_feed_token(token)
+
+
+def hash_feed_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def feed_window(now: Optional[datetime] = None) -> Window:
+    now = now or datetime.now(timezone.utc)
+    midnight = now.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight - timedelta(days=FEED_PAST_DAYS), midnight + timedelta(days=FEED_FUTURE_DAYS + 1)
+
+
+def is_provider_feed(user: User) -> bool:
+    return user.role == UserRole.PROVIDER
+
+
+def _owned(model, user_id: int, provider: bool):
+    return (model.provider_id if provider else model.customer_id) == user_id
+
+
+async def feed_validators(db: AsyncSession, user: User, window: Window) -> Tuple[str, datetime]:
+    """ETag and Last-Modified of a user's feed, from one aggregate query."""
+    provider = is_provider_feed(user)
+    in_bookings = (
+        _owned(Booking, user.id, provider),
+        Booking.start_time >= window[0],
+        Booking.start_time < window[1],
+    )
+    in_series = (
+        _owned(BookingSeries, user.id, provider),
+        BookingSeries.span.op("&&")(series_range(*window)),
+    )
+    bookings = (
+        select(
+            func.max(func.coalesce(Booking.updated_at, Booking.created_at)).label("latest"),
+            func.count(Booking.id).label("count"),
+        )
+        .where(*in_bookings)
+        .subquery()
+    )
+    series = (
+        select(
+            func.max(func.coalesce(BookingSeries.updated_at, BookingSeries.created_at)).label("latest"),
+            func.count(BookingSeries.id).label("count"),
+        )
+        .where(*in_series)
+        .subquery()
+    )
+    # Service names and locations (and customer names in provider feeds)
+    # appear in the events, so their edits change the feed too
+    services = (
+        select(func.max(Service.updated_at))
+        .where(Service.id.in_(union(
+            select(Booking.service_id).where(*in_bookings),
+            select(BookingSeries.service_id).where(*in_series),
+        )))
+        .scalar_subquery()
+    )
+    columns = [bookings.c.latest, bookings.c.count, series.c.latest, series.c.count, services]
+    if provider:
+        columns.append(
+            select(func.max(User.updated_at))
+            .where(User.id.in_(union(
+                select(Booking.customer_id).where(*in_bookings),
+                select(BookingSeries.customer_id).where(*in_series),
+            )))
+            .scalar_subquery()
+        )
+    row = (await db.execute(select(*columns))).one()
+
+    # The window moves at midnight, which changes the feed without any write
+    anchor = window[0] + timedelta(days=FEED_PAST_DAYS)
+    latest = [row[0], row[2], *row[4:]]
+    last_modified = max(t for t in (*latest, anchor) if t is not None)
+    raw = f"{FEED_FORMAT_VERSION}:{user.id}:{provider}:{window[0].isoformat()}:" + ":".join(
+        str(v) for v in row)
+    etag = '"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
+    return etag, last_modified.replace(microsecond=0)
+
+
+def not_modified(
+    if_none_match: Optional[str],
+    if_modified_since: Optional[datetime],
+    etag: str,
+    last_modified: datetime,
+) -> bool:
+    """RFC 9110 conditional GET: If-None-Match wins over If-Modified-Since."""
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+
+def _escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """Fold a content line at 75 octets, per RFC 5545."""
+    data = line.encode()
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        # Don't split a UTF-8 sequence
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(data[start:end].decode())
+        start, limit = end, 74
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _stamp(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def vevent(
+    uid: str,
+    start: datetime,
+    end: datetime,
+    status: BookingStatus,
+    stamp: datetime,
+    summary: str,
+    sequence: int = 0,
+    location: Optional[str] = None,
+    description: Optional[str] = None,
+) -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}@{UID_DOMAIN}",
+        f"DTSTAMP:{_stamp(stamp)}",
+        f"DTSTART:{_stamp(start)}",
+        f"DTEND:{_stamp(end)}",
+        f"SEQUENCE:{sequence}",
+        f"STATUS:{ICS_STATUS[status]}",
+        f"SUMMARY:{_escape(summary)}",
+    ]
+    if location:
+        lines.append(f"LOCATION:{_escape(location)}")
+    if description:
+        lines.append(f"DESCRIPTION:{_escape(description)}")
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) for line in lines)
+
+
+def _summary(service_name: str, customer_name: Optional[str], provider: bool) -> str:
+    if provider and customer_name:
+        return f"{service_name} - {customer_name}"
+    return service_name
+
+
+def _calendar_header(name: str) -> str:
+    return "".join(_fold(line) for line in (
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(name)}",
+    ))
+
+
+async def stream_feed(
+    user_id: int,
+    provider: bool,
+    window: Window,
+    session_factory: Callable = SessionLocal,
+) -> AsyncIterator[bytes]:
+    """Yield a user's feed as iCalendar text, one chunk per fetched batch."""
+    yield _calendar_header(f"{settings.PROJECT_NAME} bookings").encode()
+    async with session_factory() as session:
+        query = (
+            select(
+                Booking.id,
+                Booking.start_time,
+                Booking.end_time,
+                Booking.status,
+                Booking.version,
+                Booking.notes,
+                func.coalesce(Booking.updated_at, Booking.created_at).label("stamp"),
+                Service.name.label("service_name"),
+                Service.location,
+                User.full_name.label("customer_name"),
+            )
+            .join(Service, Service.id == Booking.service_id)
+            .join(User, User.id == Booking.customer_id)
+            .where(
+                _owned(Booking, user_id, provider),
+                Booking.start_time >= window[0],
+                Booking.start_time < window[1],
+            )
+            .order_by(Booking.start_time, Booking.id)
+        )
+        result = await session.stream(query.execution_options(yield_per=FEED_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield "".join(
+                vevent(
+                    f"booking-{row.id}", row.start_time, row.end_time, row.status,
+                    row.stamp, _summary(row.service_name, row.customer_name, provider),
+                    sequence=row.version, location=row.location, description=row.notes,
+                )
+                for row in rows
+            ).encode()
+
+        async for chunk in _series_events(session, user_id, provider, window):
+            yield chunk
+    yield b"END:VCALENDAR\r\n"
+
+
+async def _series_events(
+    session: AsyncSession, user_id: int, provider: bool, window: Window,
+) -> AsyncIterator[bytes]:
+    result = await session.execute(
+        select(BookingSeries, Service.name, Service.location, User.full_name)
+        .join(Service, Service.id == BookingSeries.service_id)
+        .join(User, User.id == BookingSeries.customer_id)
+        .where(
+            _owned(BookingSeries, user_id, provider),
+            BookingSeries.span.op("&&")(series_range(*window)),
+        )
+        .order_by(BookingSeries.id)
+    )
+    rows = result.all()
+    if not rows:
+        return
+    # Occurrences with their own booking row were emitted with the bookings
+    replaced = await materialized_occurrences(session, [r[0].id for r in rows], window)
+    for series, service_name, location, customer_name in rows:
+        duration = timedelta(minutes=series.duration_minutes)
+        yield "".join(
+            vevent(
+                f"series-{series.id}-{_stamp(start)}", start, start + duration, series.status,
+                series.updated_at or series.created_at,
+                _summary(service_name, customer_name, provider),
+                location=location, description=series.notes,
+            )
+            for _, start in recurrence_for(series).between(*window)
+            if (series.id, start) not in replaced
+        ).encode()
@@ -0,0 +1,81 @@
+"""
+In-memory cache of the category listing served by /services/categories.
+
+The listing is built with one grouped query, serialized once and kept as
+bytes with an ETag. API writes that change category membership invalidate
+it directly; out-of-process writers (seed_categories.py) send a Postgres
+NOTIFY on CATEGORY_CHANNEL, which the listener started in app.main turns
+into an invalidation. The TTL bounds staleness if a notification is lost.
+"""
+import hashlib
+import logging
+import time
+from typing import List, Optional, Tuple
+import asyncpg
+from pydantic import TypeAdapter
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..models.service import Service, Category
+from ..schemas.service import Category as CategorySchema
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_CHANNEL = "categories_changed"
+CACHE_TTL_SECONDS = 300
+
+_category_list = TypeAdapter(List[CategorySchema])
+_cache: dict = {"expires_at": 0.0, "body": b"", "etag": ""}
+
+
+def invalidate_categories() -> None:
+    _cache["expires_at"] = 0.0
+
+
+async def notify_categories_changed(db: AsyncSession) -> None:
+    """Tell every API process to drop its cached listing on commit."""
+    await db.execute(text(f"NOTIFY {CATEGORY_CHANNEL}"))
+
+
+async def get_category_listing(db: AsyncSession) -> Tuple[bytes, str]:
+    """Return the serialized category listing and its ETag."""
+    now = time.monotonic()
+    if _cache["expires_at"] > now:
+        return _cache["body"], _cache["etag"]
+
+    result = await db.execute(
+        select(Category, func.count(Service.id).label("service_count"))
+        .outerjoin(Service, Service.category_id == Category.id)
+        .group_by(Category.id)
+        .order_by(Category.id)
+    )
+    categories = [
+        CategorySchema.model_validate(category).model_copy(
+            update={"service_count": service_count}
+        )
+        for category, service_count in result.all()
+    ]
+    body = _category_list.dump_json(categories)
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+    _cache.update(body=body, etag=etag, expires_at=now + CACHE_TTL_SECONDS)
+    return body, etag
+
+
+async def listen_for_category_changes() -> Optional[asyncpg.Connection]:
+    """
+    Open a dedicated connection that LISTENs for category changes.
+
+    Returns the connection (to be closed on shutdown), or None if it could
+    not be established, in which case the TTL alone bounds staleness.
+    """
+    dsn = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+    try:
+        connection = await asyncpg.connect(dsn)
+        await connection.add_listener(
+            CATEGORY_CHANNEL, lambda *args: invalidate_categories()
+        )
+    except Exception as e:
+        logger.warning(f"Category change listener unavailable: {str(e)}")
+        return None
+    return connection
@@ -11,10 +11,34 @@ class Settings(BaseSettings):
     DATABASE_SYNC_URL: str = ""
     ALLOWED_ORIGINS: list[str] = []
 
+    # Redis (response cache); in-process fallback when unset
+    REDIS_URL: str = ""
+
     # Security
     SECRET_KEY: str = "supersecretkey"  # Change in production
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Refresh tokens rotate on every use; a family lives at most this long idle
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    # Revoked access tokens reach other processes' in-memory filter within
+    # REVOCATION_SYNC_SECONDS; the filter is sized for this many live entries
+    REVOCATION_SYNC_SECONDS: int = 5
+    REVOCATION_FILTER_CAPACITY: int = 100_000
+
+    # bcrypt cost; hashes with another cost are upgraded on the next login
+    PASSWORD_HASH_ROUNDS: int = 12
+    # Threads doing bcrypt work, and how many more calls may wait for one
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+
+    # Token-bucket limits on auth, booking and checkout endpoints (app.core.ratelimit);
+    # turn off for load tests that hammer one account from one address
+    RATE_LIMIT_ENABLED: bool = True
+
+    # Google sign-in: ID tokens must be issued for this OAuth client id.
+    # GOOGLE_JWKS_URL may be a file:// path to a local key set for tests
+    GOOGLE_CLIENT_ID: str = ""
+    GOOGLE_JWKS_URL: str = "https://www.googleapis.com/oauth2/v3/certs"
 
     # Stripe
     STRIPE_SECRET_KEY: str = ""  # Set via environment variable
@@ -22,6 +46,19 @@ class Settings(BaseSettings):
     STRIPE_SUCCESS_URL: str = "http://localhost:5173/booking/success"
     STRIPE_CANCEL_URL: str = "http://localhost:5173/booking/cancel"
 
+    # Checkout slot holds; Stripe sessions last at least 30 minutes
+    SLOT_HOLD_MINUTES: int = 30
+    SLOT_HOLD_SWEEP_SECONDS: int = 60
+
+    # How long a waitlisted customer has to accept an offered slot
+    WAITLIST_OFFER_MINUTES: int = 15
+    # How often each process checks for freed slots to offer; slots freed
+    # in the same process are offered right after they commit
+    WAITLIST_POLL_SECONDS: int = 5
+
+    # How often services.next_available_at is moved past slots that started
+    NEXT_AVAILABLE_ROLLOVER_SECONDS: int = 300
+
 
 class Config:
     case_sensitive = True
@@ -0,0 +1,96 @@
+"""
+Streaming booking exports for finance.
+
+Rows are read as plain column tuples (no ORM objects) through a
+server-side cursor, `AsyncSession.stream` with `yield_per`, and encoded
+one batch at a time. Memory therefore stays bounded by EXPORT_BATCH_SIZE
+rows however large the export is.
+
+The stream opens its own session: a StreamingResponse body keeps running
+after request-scoped dependencies such as `get_db` have been closed.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, Callable, Sequence
+from sqlalchemy import Select, select
+from ..database import SessionLocal
+from ..models.booking import Booking
+from ..models.service import Service
+from ..models.user import User
+
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def booking_export_query() -> Select:
+    """Bookings with their service and customer columns, in id order."""
+    return (
+        select(
+            Booking.id.label("booking_id"),
+            Booking.status,
+            Booking.start_time,
+            Booking.end_time,
+            Booking.created_at,
+            Booking.updated_at,
+            Booking.notes,
+            Booking.series_id,
+            Booking.service_id,
+            Service.name.label("service_name"),
+            Service.price.label("service_price"),
+            Service.duration_minutes.label("service_duration_minutes"),
+            Booking.provider_id,
+            Booking.customer_id,
+            User.email.label("customer_email"),
+            User.full_name.label("customer_name"),
+        )
+        .join(Service, Service.id == Booking.service_id)
+        .join(User, User.id == Booking.customer_id)
+        .order_by(Booking.id)
+    )
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def encode_ndjson(columns: Sequence[str], rows: Sequence[tuple]) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(columns, map(_plain, row))), separators=(",", ":")) + "\n"
+        for row in rows
+    ).encode()
+
+
+def encode_csv(columns: Sequence[str], rows: Sequence[tuple]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if v is None else _plain(v) for v in row])
+    return buffer.getvalue().encode()
+
+
+async def stream_export(
+    query: Select,
+    fmt: str,
+    session_factory: Callable = SessionLocal,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """Yield the encoded rows of `query`, one chunk per fetched batch."""
+    columns = [c.name for c in query.selected_columns]
+    encode = encode_csv if fmt == "csv" else encode_ndjson
+    if fmt == "csv":
+        yield encode_csv(columns, [columns])
+    async with session_factory() as session:
+        result = await session.stream(query.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            yield encode(columns, rows)
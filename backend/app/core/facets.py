@@ -0,0 +1,115 @@
+from sqlalchemy import Select, case, func, select, true, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.service import Service, Category
+from ..schemas.service import (
+    ServiceFacets,
+    CategoryFacet,
+    PriceFacet,
+    RatingFacet,
+    LocationFacet,
+)
+
+PRICE_BUCKETS = 10
+LOCATION_FACETS = 10
+
+# GROUPING(category_id, price_bucket, rating_bucket, location) for each set
+_CATEGORY_SET = 0b0111
+_PRICE_SET = 0b1011
+_RATING_SET = 0b1101
+_LOCATION_SET = 0b1110
+
+
+async def compute_service_facets(db: AsyncSession, filtered: Select) -> ServiceFacets:
+    """
+    Facet counts for a filtered service query, in a single statement.
+
+    `filtered` is a select of Service with the listing's WHERE clauses and
+    no ordering or paging. The rows are scanned once: a CTE buckets each
+    row by price (equal-width over the filtered price range) and rating,
+    then GROUPING SETS counts per category, price bucket, rating bucket
+    and location in the same aggregate pass.
+    """
+    rows = filtered.with_only_columns(
+        Service.category_id,
+        Service.price,
+        Service.rating.label("rating"),
+        Service.location,
+    ).cte("facet_rows")
+    bounds = select(
+        func.min(rows.c.price).label("lo"),
+        func.max(rows.c.price).label("hi"),
+    ).cte("facet_bounds")
+
+    price_bucket = case(
+        (bounds.c.hi > bounds.c.lo,
+         func.least(
+             func.width_bucket(rows.c.price, bounds.c.lo, bounds.c.hi, PRICE_BUCKETS),
+             PRICE_BUCKETS,
+         )),
+        else_=1,
+    )
+    # 0 = unrated, otherwise the whole-star floor (4 includes 5.0)
+    rating_bucket = func.least(func.floor(rows.c.rating), 4)
+
+    bucketed = select(
+        rows.c.category_id,
+        price_bucket.label("price_bucket"),
+        rating_bucket.label("rating_bucket"),
+        rows.c.location,
+        bounds.c.lo,
+        bounds.c.hi,
+    ).select_from(rows.join(bounds, true())).cte("facet_buckets")
+
+    b = bucketed.c
+    grouped = (
+        select(
+            func.grouping(b.category_id, b.price_bucket, b.rating_bucket, b.location)
+            .label("grouping_set"),
+            b.category_id,
+            b.price_bucket,
+            b.rating_bucket,
+            b.location,
+            func.count().label("count"),
+            func.min(b.lo).label("lo"),
+            func.max(b.hi).label("hi"),
+        )
+        .group_by(func.grouping_sets(
+            tuple_(b.category_id),
+            tuple_(b.price_bucket),
+            tuple_(b.rating_bucket),
+            tuple_(b.location),
+        ))
+        .subquery()
+    )
+    query = select(grouped, Category.name.label("category_name")).outerjoin(
+        Category, Category.id == grouped.c.category_id
+    )
+
+    facets = ServiceFacets()
+    for row in (await db.execute(query)).all():
+        if row.grouping_set == _CATEGORY_SET:
+            facets.total += row.count
+            facets.categories.append(CategoryFacet(
+                category_id=row.category_id, name=row.category_name, count=row.count))
+        elif row.grouping_set == _PRICE_SET:
+            width = (row.hi - row.lo) / PRICE_BUCKETS if row.hi > row.lo else 0.0
+            low = row.lo + (row.price_bucket - 1) * width
+            facets.price.append(PriceFacet(
+                min=round(low, 2),
+                max=round(row.hi if row.price_bucket == PRICE_BUCKETS or not width
+                          else low + width, 2),
+                count=row.count,
+            ))
+        elif row.grouping_set == _RATING_SET:
+            facets.rating.append(RatingFacet(
+                min_rating=int(row.rating_bucket), count=row.count))
+        elif row.grouping_set == _LOCATION_SET:
+            facets.locations.append(LocationFacet(
+                location=row.location, count=row.count))
+
+    facets.categories.sort(key=lambda f: -f.count)
+    facets.price.sort(key=lambda f: f.min)
+    facets.rating.sort(key=lambda f: -f.min_rating)
+    facets.locations.sort(key=lambda f: -f.count)
+    del facets.locations[LOCATION_FACETS:]
+    return facets
@@ -0,0 +1,296 @@
+"""
+Geocoding and spatial filtering for services and provider profiles.
+
+Coordinates are stored alongside a geohash. Nearby rows share geohash
+prefixes, so a radius or bounding-box query becomes a handful of
+`geohash LIKE 'prefix%'` range scans on a btree index, followed by an
+exact bounding-box and great-circle distance check on the few candidate
+rows. Coordinates come from a local gazetteer file (no network calls).
+"""
+import csv
+import math
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import and_, false, func, or_
+
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_PRECISION = 9  # ~5m cells; stored on every geocoded row
+MAX_COVER_CELLS = 16
+
+GAZETTEER_PATH = Path(__file__).resolve().parents[2] / "data" / "gazetteer.csv"
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Height and width in degrees of a geohash cell at a precision."""
+    total_bits = 5 * precision
+    lat_bits = total_bits // 2
+    lon_bits = total_bits - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def covering_cells(
+    min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+    max_cells: int = MAX_COVER_CELLS,
+) -> List[str]:
+    """
+    Geohash prefixes that together cover a bounding box.
+
+    Picks the finest precision that needs at most `max_cells` cells, so
+    the candidate set stays close to the box while the number of index
+    range scans stays small.
+    """
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+    min_lon, max_lon = max(min_lon, -180.0), min(max_lon, 180.0)
+
+    precision = 1
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        lat_step, lon_step = cell_size(candidate)
+        rows = math.floor(max_lat / lat_step) - math.floor(min_lat / lat_step) + 1
+        cols = math.floor(max_lon / lon_step) - math.floor(min_lon / lon_step) + 1
+        if rows * cols <= max_cells:
+            precision = candidate
+            break
+
+    lat_step, lon_step = cell_size(precision)
+    cells: Set[str] = set()
+    lat = min_lat
+    while True:
+        lon = min_lon
+        while True:
+            cells.add(geohash_encode(min(lat, 89.999999), min(lon, 179.999999), precision))
+            if lon >= max_lon:
+                break
+            lon = min(lon + lon_step, max_lon)
+        if lat >= max_lat:
+            break
+        lat = min(lat + lat_step, max_lat)
+    return sorted(cells)
+
+
+def lon_spans(min_lon: float, max_lon: float) -> List[Tuple[float, float]]:
+    """
+    Split a longitude span that may run past ±180 into spans inside it,
+    so a box across the antimeridian becomes one box on each side.
+    """
+    if max_lon - min_lon >= 360.0:
+        return [(-180.0, 180.0)]
+    shift = math.floor((min_lon + 180.0) / 360.0) * 360.0
+    min_lon, max_lon = min_lon - shift, max_lon - shift
+    if max_lon <= 180.0:
+        return [(min_lon, max_lon)]
+    return [(min_lon, 180.0), (-180.0, max_lon - 360.0)]
+
+
+def _intersect_spans(a: List[Tuple[float, float]], b: List[Tuple[float, float]]):
+    spans = []
+    for a_min, a_max in a:
+        for b_min, b_max in b:
+            lo, hi = max(a_min, b_min), min(a_max, b_max)
+            if lo <= hi:
+                spans.append((lo, hi))
+    return spans
+
+
+def radius_bbox(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """
+    Bounding box (min_lat, min_lon, max_lat, max_lon) around a circle.
+    Longitudes may run past ±180 near the antimeridian; see `lon_spans`.
+    """
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(lat))
+    dlon = 180.0 if cos_lat < 1e-6 else min(180.0, dlat / cos_lat)
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = (math.sin(dlat / 2) ** 2
+         + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+def distance_km_expr(model, lat: float, lon: float):
+    """SQL great-circle distance in km from a point to a model's coordinates."""
+    dlat = func.radians(model.latitude - lat)
+    dlon = func.radians(model.longitude - lon)
+    a = (
+        func.power(func.sin(dlat / 2), 2)
+        + math.cos(math.radians(lat))
+        * func.cos(func.radians(model.latitude))
+        * func.power(func.sin(dlon / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * func.asin(func.sqrt(func.least(1.0, a)))
+
+
+def apply_geo_filter(
+    query,
+    model,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    radius_km: Optional[float] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+):
+    """
+    Restrict a query on a geocoded model to a radius and/or bounding box.
+
+    Returns the filtered query and the distance expression from (lat, lng),
+    or None when no center point was given.
+    """
+    if (lat is None) != (lng is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="lat and lng must be provided together",
+        )
+    if radius_km is not None and lat is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="radius_km requires lat and lng",
+        )
+
+    boxes = []
+    if bbox is not None:
+        boxes.append(bbox)
+    if radius_km is not None:
+        boxes.append(radius_bbox(lat, lng, radius_km))
+
+    if boxes:
+        # Intersect the requested areas, then cover the result with cells.
+        # Longitudes are intersected as spans inside ±180, as a box may
+        # cross the antimeridian (a bbox with min_lng > max_lng does too)
+        min_lat = max(b[0] for b in boxes)
+        max_lat = min(b[2] for b in boxes)
+        spans = None
+        for _, box_min_lon, _, box_max_lon in boxes:
+            if box_min_lon > box_max_lon:
+                box_max_lon += 360.0
+            box_spans = lon_spans(box_min_lon, box_max_lon)
+            spans = box_spans if spans is None else _intersect_spans(spans, box_spans)
+        if min_lat > max_lat or not spans:
+            return query.where(false()), None
+
+        query = query.where(
+            or_(*[
+                and_(
+                    or_(*[
+                        model.geohash.startswith(cell)
+                        for cell in covering_cells(min_lat, min_lon, max_lat, max_lon)
+                    ]),
+                    model.longitude.between(min_lon, max_lon),
+                )
+                for min_lon, max_lon in spans
+            ]),
+            model.latitude.between(min_lat, max_lat),
+        )
+
+    distance = None
+    if lat is not None:
+        distance = distance_km_expr(model, lat, lng)
+        if radius_km is not None:
+            query = query.where(distance <= radius_km)
+        else:
+            query = query.where(model.latitude.is_not(None))
+    return query, distance
+
+
+def parse_bbox(
+    min_lat: Optional[float], min_lng: Optional[float],
+    max_lat: Optional[float], max_lng: Optional[float],
+) -> Optional[Tuple[float, float, float, float]]:
+    values = (min_lat, min_lng, max_lat, max_lng)
+    if all(v is None for v in values):
+        return None
+    if any(v is None for v in values):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Bounding box needs min_lat, min_lng, max_lat and max_lng",
+        )
+    return values
+
+
+def _normalize(place: str) -> str:
+    return " ".join(place.lower().replace(".", "").split())
+
+
+@lru_cache(maxsize=1)
+def load_gazetteer(path: Path = GAZETTEER_PATH) -> Dict[str, Tuple[float, float]]:
+    """
+    Load the gazetteer as {normalized place name: (lat, lon)}.
+
+    Each row is indexed as "name", "name, region" and "name, country".
+    """
+    places: Dict[str, Tuple[float, float]] = {}
+    if not path.exists():
+        return places
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            point = (float(row["latitude"]), float(row["longitude"]))
+            name = _normalize(row["name"])
+            places.setdefault(name, point)
+            for qualifier in (row.get("region"), row.get("country")):
+                if qualifier:
+                    places.setdefault(f"{name}, {_normalize(qualifier)}", point)
+    return places
+
+
+def geocode(location: Optional[str]) -> Optional[Tuple[float, float]]:
+    """Look up a free-form location string in the gazetteer."""
+    if not location:
+        return None
+    places = load_gazetteer()
+    key = _normalize(location)
+    if key in places:
+        return places[key]
+    # "Austin, TX 78701" -> "austin, tx" -> "austin"
+    parts = [p.strip() for p in key.split(",") if p.strip()]
+    for n in range(len(parts), 0, -1):
+        candidate = ", ".join(parts[:n])
+        if candidate in places:
+            return places[candidate]
+    if len(parts) > 1:
+        qualified = f"{parts[0]}, {parts[1].split()[0]}"
+        if qualified in places:
+            return places[qualified]
+    return None
+
+
+def geo_fields(
+    location: Optional[str],
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+) -> dict:
+    """Column values for a row: explicit coordinates win over the gazetteer."""
+    if latitude is None or longitude is None:
+        point = geocode(location)
+        if point is None:
+            return {"latitude": None, "longitude": None, "geohash": None}
+        latitude, longitude = point
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "geohash": geohash_encode(latitude, longitude),
+    }
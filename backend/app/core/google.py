@@ -0,0 +1,147 @@
+"""
+Google sign-in without a network call per login.
+
+Google ID tokens are JWTs signed with keys Google publishes as a JWKS.
+The key set is cached in process and refreshed in the background when
+its Cache-Control max-age runs out (`refresh_jwks_forever`, started
+from app.main), so verifying a token is a local signature and claims
+check. A token signed with a key we have not seen triggers one refetch,
+at most every JWKS_MIN_REFETCH_SECONDS, to pick up rotations early.
+
+Opaque OAuth access tokens are still accepted; those can only be
+checked by asking Google's userinfo endpoint, through the shared client
+in app.core.http.
+
+For tests and local development GOOGLE_JWKS_URL may point at a file://
+key set; google_jwks_standin.py writes one and signs tokens with it.
+"""
+import asyncio
+import json
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+from jose import JWTError, jwt
+from .config import settings
+from .http import request_with_retries
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+USERINFO_URL = "https://www.googleapis.com/oauth2/v1/userinfo"
+
+JWKS_DEFAULT_TTL_SECONDS = 3600
+JWKS_MIN_REFETCH_SECONDS = 30
+# Refresh this long before the cached set expires, and retry this soon after a failure
+JWKS_REFRESH_MARGIN_SECONDS = 300
+JWKS_RETRY_SECONDS = 60
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class JWKSCache:
+    """Signing keys by key id, refetched when stale or on an unknown kid."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.keys: Dict[str, dict] = {}
+        self.fetched_at = 0.0
+        self.expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _fetch(self) -> Tuple[dict, float]:
+        if self.url.startswith("file://"):
+            path = Path(urlparse(self.url).path)
+            return json.loads(path.read_text()), JWKS_DEFAULT_TTL_SECONDS
+        response = await request_with_retries("GET", self.url)
+        response.raise_for_status()
+        ttl = JWKS_DEFAULT_TTL_SECONDS
+        match = _MAX_AGE.search(response.headers.get("cache-control", ""))
+        if match:
+            ttl = int(match.group(1)) - int(response.headers.get("age", "0") or 0)
+        return response.json(), max(ttl, JWKS_MIN_REFETCH_SECONDS)
+
+    async def refresh(self, requested_at: Optional[float] = None) -> None:
+        """Refetch the key set; concurrent callers share one fetch."""
+        requested_at = requested_at or time.monotonic()
+        async with self._lock:
+            if self.fetched_at >= requested_at:
+                return  # Someone else refreshed while we waited
+            body, ttl = await self._fetch()
+            self.keys = {key["kid"]: key for key in body.get("keys", []) if "kid" in key}
+            self.fetched_at = time.monotonic()
+            self.expires_at = self.fetched_at + ttl
+            logger.info(f"Loaded {len(self.keys)} Google signing keys, valid for {ttl:.0f}s")
+
+    async def get(self, kid: Optional[str]) -> Optional[dict]:
+        key = self.keys.get(kid)
+        if key is not None:
+            return key
+        # Unknown key: maybe rotated since the last fetch
+        if time.monotonic() - self.fetched_at >= JWKS_MIN_REFETCH_SECONDS or not self.keys:
+            await self.refresh()
+        return self.keys.get(kid)
+
+
+google_jwks = JWKSCache(settings.GOOGLE_JWKS_URL)
+
+
+async def refresh_jwks_forever() -> None:
+    """Keep the Google key set fresh so logins never wait for a fetch."""
+    while True:
+        try:
+            await google_jwks.refresh()
+            delay = google_jwks.expires_at - time.monotonic() - JWKS_REFRESH_MARGIN_SECONDS
+        except Exception as e:
+            logger.warning(f"Refreshing Google signing keys failed: {str(e)}")
+            delay = JWKS_RETRY_SECONDS
+        await asyncio.sleep(max(delay, JWKS_MIN_REFETCH_SECONDS))
+
+
+def looks_like_jwt(token: str) -> bool:
+    return token.count(".") == 2
+
+
+async def verify_id_token(token: str) -> dict:
+    """Claims of a Google ID token verified locally; raises ValueError."""
+    if not settings.GOOGLE_CLIENT_ID:
+        raise ValueError("Google sign-in is not configured")
+    try:
+        header = jwt.get_unverified_header(token)
+    except JWTError as e:
+        raise ValueError(f"Malformed ID token: {str(e)}")
+    key = await google_jwks.get(header.get("kid"))
+    if key is None:
+        raise ValueError("ID token signed with an unknown key")
+    try:
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=["RS256"],
+            audience=settings.GOOGLE_CLIENT_ID,
+            issuer=GOOGLE_ISSUERS,
+            options={"verify_at_hash": False},
+        )
+    except JWTError as e:
+        raise ValueError(f"Invalid ID token: {str(e)}")
+    if not claims.get("email") or not claims.get("email_verified"):
+        raise ValueError("Google account email is not verified")
+    return claims
+
+
+async def fetch_userinfo(access_token: str) -> dict:
+    """Profile for an opaque OAuth access token, asked of Google."""
+    response = await request_with_retries(
+        "GET", USERINFO_URL, headers={"Authorization": f"Bearer {access_token}"})
+    if response.status_code != 200:
+        raise ValueError(f"Google rejected the access token ({response.status_code})")
+    return response.json()
+
+
+async def verify_google_token(token: str) -> dict:
+    """Email, name and picture for an ID token or an access token."""
+    if looks_like_jwt(token):
+        return await verify_id_token(token)
+    return await fetch_userinfo(token)
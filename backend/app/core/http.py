@@ -0,0 +1,57 @@
+"""
+Shared outbound HTTP client.
+
+One pooled httpx.AsyncClient per process keeps connections (and their
+TLS sessions) alive between calls. Every call has a timeout, and
+`request_with_retries` retries timeouts, transport errors and
+retryable status codes with exponential backoff. Closed from app.main
+on shutdown.
+"""
+import asyncio
+import logging
+from typing import Optional
+import httpx
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT = httpx.Timeout(5.0, connect=2.0)
+LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=10)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRIES = 2
+BACKOFF_SECONDS = 0.2
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=TIMEOUT, limits=LIMITS)
+    return _client
+
+
+async def request_with_retries(
+    method: str,
+    url: str,
+    retries: int = RETRIES,
+    **kwargs,
+) -> httpx.Response:
+    """Send a request on the shared client, retrying transient failures."""
+    client = get_http_client()
+    for attempt in range(retries):
+        try:
+            response = await client.request(method, url, **kwargs)
+            if response.status_code not in RETRY_STATUSES:
+                return response
+            logger.info(f"{method} {url} returned {response.status_code}, retrying")
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            logger.info(f"{method} {url} failed ({e.__class__.__name__}), retrying")
+        await asyncio.sleep(BACKOFF_SECONDS * 2 ** attempt)
+    return await client.request(method, url, **kwargs)
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
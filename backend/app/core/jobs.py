@@ -0,0 +1,120 @@
+"""
+Periodic background jobs run inside each API process.
+
+Started from app.main on startup and cancelled on shutdown. Each job is
+idempotent and safe to run concurrently in several processes; a failed
+run is logged and retried on the next tick.
+"""
+import asyncio
+import logging
+import time
+from ..database import SessionLocal
+from .availability import refresh_next_available, roll_next_available
+from .bookings import invalidate_service_availability, release_expired_holds
+from .config import settings
+from .waitlist import (
+    claim_freed_slot,
+    expire_lapsed_entries,
+    expire_offers,
+    offer_freed_slot,
+    offer_wakeup,
+    postpone_freed_slot,
+    slot_freed,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def sweep_expired_holds() -> None:
+    """
+    Release lapsed checkout holds and waitlist offers every
+    SLOT_HOLD_SWEEP_SECONDS, and pass the freed slots to the waitlist.
+    Waitlist entries whose window has ended are retired on the way.
+    """
+    while True:
+        try:
+            async with SessionLocal() as db:
+                retired = await expire_lapsed_entries(db)
+                freed = await expire_offers(db)
+                freed += await release_expired_holds(db)
+                service_ids = list({service_id for service_id, _, _ in freed})
+                # A released hold may reopen a service's earliest slot
+                await refresh_next_available(db, service_ids)
+                for slot in freed:
+                    await slot_freed(db, *slot)
+                await db.commit()
+                await invalidate_service_availability(db, service_ids)
+            if freed:
+                logger.info(f"Released {len(freed)} expired holds")
+            if retired:
+                logger.info(f"Expired {retired} waitlist entries past their window")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Hold sweep failed: {str(e)}")
+        await asyncio.sleep(settings.SLOT_HOLD_SWEEP_SECONDS)
+
+
+async def roll_next_available_forever() -> None:
+    """
+    Move next_available_at past slots that have started.
+
+    Runs every NEXT_AVAILABLE_ROLLOVER_SECONDS; once an hour it also
+    rechecks services with nothing free, as the look-ahead window slides.
+    """
+    last_full_run = 0.0
+    while True:
+        try:
+            full = time.monotonic() - last_full_run >= 3600
+            async with SessionLocal() as db:
+                rolled = await roll_next_available(db, include_unavailable=full)
+                await db.commit()
+            if full:
+                last_full_run = time.monotonic()
+            if rolled:
+                logger.info(f"Rolled next_available_at forward for {rolled} services")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"next_available_at rollover failed: {str(e)}")
+        await asyncio.sleep(settings.NEXT_AVAILABLE_ROLLOVER_SECONDS)
+
+
+async def run_waitlist_worker() -> None:
+    """
+    Offer recorded freed slots to the next waiters (see app.core.waitlist),
+    one transaction per slot, until none is due; then wait for a local
+    commit to record one, or WAITLIST_POLL_SECONDS.
+    """
+    while True:
+        offer_wakeup.clear()
+        claimed = None
+        try:
+            async with SessionLocal() as db:
+                claimed = await claim_freed_slot(db)
+                if claimed is not None:
+                    _, (service_id, start_time, _) = claimed
+                    entry = await offer_freed_slot(db, *claimed)
+                    await db.commit()
+                    if entry is not None:
+                        await invalidate_service_availability(db, [service_id])
+                        logger.info(
+                            f"Offered service {service_id} at {start_time.isoformat()} "
+                            f"to waitlist entry {entry.id}"
+                        )
+                    continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Waitlist offer failed: {str(e)}")
+            if claimed is not None:
+                try:
+                    async with SessionLocal() as db:
+                        await postpone_freed_slot(db, claimed[0])
+                        await db.commit()
+                except Exception as e:
+                    logger.warning(f"Postponing freed slot {claimed[0]} failed: {str(e)}")
+        try:
+            await asyncio.wait_for(offer_wakeup.wait(), settings.WAITLIST_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
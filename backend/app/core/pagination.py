@@ -0,0 +1,102 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import Select, literal, tuple_
+
+# Name of the extra column carrying the sort key of each row
+CURSOR_KEY = "cursor_key"
+
+
+def encode_cursor(sort: str, descending: bool, value: Any, last_id: int) -> str:
+    """Encode the position after a row as an opaque, URL-safe cursor."""
+    payload = {"s": sort, "d": descending, "id": last_id}
+    if isinstance(value, datetime):
+        payload["t"] = value.isoformat()
+    else:
+        payload["v"] = value
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, descending: bool) -> Tuple[Any, int]:
+    """Decode a cursor, checking it was issued for the same sort order."""
+    invalid = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+    )
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        value = (
+            datetime.fromisoformat(payload["t"]) if "t" in payload else payload["v"]
+        )
+        last_id = int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise invalid
+
+    if payload.get("s") != sort or bool(payload.get("d")) != descending:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor does not match the requested sort order",
+        )
+    return value, last_id
+
+
+def sort_order(key, id_column, descending: bool = False) -> list:
+    """ORDER BY clauses for a (key, id) sort, shared by offset and cursor mode."""
+    if key is id_column:
+        return [id_column.desc() if descending else id_column.asc()]
+    if descending:
+        return [key.desc(), id_column.desc()]
+    return [key.asc(), id_column.asc()]
+
+
+def apply_keyset(
+    query: Select,
+    key,
+    id_column,
+    sort: str,
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = False,
+) -> Select:
+    """
+    Page a query by (key, id) instead of OFFSET.
+
+    Adds the sort key as an extra result column, seeks past the row the
+    cursor points at with a row-value comparison (served directly by a
+    composite (key, id) index) and fetches one extra row so the caller
+    can tell whether another page exists. Pair with `keyset_page`.
+    """
+    query = query.add_columns(key.label(CURSOR_KEY))
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort, descending)
+        if key is id_column:
+            position = id_column < last_id if descending else id_column > last_id
+        else:
+            current = tuple_(key, id_column)
+            seek = tuple_(literal(value), literal(last_id))
+            position = current < seek if descending else current > seek
+        query = query.where(position)
+
+    return query.order_by(*sort_order(key, id_column, descending)).limit(limit + 1)
+
+
+def keyset_page(
+    rows: Sequence, limit: int, sort: str, descending: bool = False
+) -> Tuple[list, Optional[str]]:
+    """
+    Split the rows of an `apply_keyset` query into the page and next cursor.
+
+    Each row is a result tuple whose first element is the ORM entity and
+    whose last element is the sort key. The returned rows keep that shape.
+    """
+    rows = list(rows)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, descending, last[-1], last[0].id)
+    return rows, next_cursor
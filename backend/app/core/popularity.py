@@ -0,0 +1,161 @@
+"""
+Time-decayed popularity ranking for services.
+
+Scores use forward decay: an event at time t contributes
+weight * 2 ** ((t - EPOCH) / HALF_LIFE) instead of decaying every stored
+score as time passes. All scores shrink by the same factor over time, so
+ordering by the stored value equals ordering by the decayed value and a
+new event is a single upsert on one row.
+"""
+import random
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+from sqlalchemy import select, delete, literal, union_all, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from ..models.popularity import ServicePopularity
+from ..models.service import Service
+from ..models.booking import Booking
+from ..models.review import Review
+from ..models.favorite import Favorite
+from ..schemas.service import Service as ServiceSchema
+
+# Landmark for forward decay. Scores grow by 2x per half-life after this
+# point, which stays well inside float range for decades.
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+HALF_LIFE_SECONDS = 14 * 24 * 3600
+
+# Base weight of each kind of event
+BOOKING_WEIGHT = 3.0
+FAVORITE_WEIGHT = 2.0
+REVIEW_WEIGHT = 1.0  # scaled by rating / 5
+
+# How many of the top services are cached and sampled from
+TOP_TIER_SIZE = 50
+CACHE_TTL_SECONDS = 60
+
+_top_tier_cache: dict = {"expires_at": 0.0, "services": []}
+
+
+def decayed_weight(weight: float, at: Optional[datetime] = None) -> float:
+    at = at or datetime.now(timezone.utc)
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    return weight * 2 ** ((at - EPOCH).total_seconds() / HALF_LIFE_SECONDS)
+
+
+async def record_event(
+    db: AsyncSession,
+    service_id: int,
+    weight: float,
+    at: Optional[datetime] = None,
+) -> None:
+    """
+    Add one event to a service's popularity score.
+
+    Executes in the caller's transaction so the score commits together
+    with the booking, review or favorite that caused it.
+    """
+    increment = decayed_weight(weight, at)
+    stmt = insert(ServicePopularity).values(service_id=service_id, score=increment)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ServicePopularity.service_id],
+        set_={
+            "score": ServicePopularity.score + stmt.excluded.score,
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt)
+
+
+async def rebuild_popularity(db: AsyncSession) -> int:
+    """
+    Recompute every popularity score from bookings, reviews and favorites.
+
+    Used to backfill the table and to repair drift. Returns the number of
+    services with a score.
+    """
+    def decayed(weight, created_at):
+        age = func.extract("epoch", created_at - literal(EPOCH))
+        return weight * func.power(2.0, age / HALF_LIFE_SECONDS)
+
+    events = union_all(
+        select(
+            Booking.service_id.label("service_id"),
+            decayed(BOOKING_WEIGHT, Booking.created_at).label("score"),
+        ),
+        select(
+            Review.service_id,
+            decayed(REVIEW_WEIGHT * Review.rating / 5.0, Review.created_at),
+        ),
+        select(
+            Favorite.service_id,
+            decayed(FAVORITE_WEIGHT, Favorite.created_at),
+        ),
+    ).subquery()
+
+    totals = (
+        select(events.c.service_id, func.sum(events.c.score))
+        .where(events.c.service_id.is_not(None), events.c.score.is_not(None))
+        .group_by(events.c.service_id)
+    )
+
+    await db.execute(delete(ServicePopularity))
+    result = await db.execute(
+        insert(ServicePopularity).from_select(["service_id", "score"], totals)
+    )
+    invalidate_top_tier()
+    return result.rowcount
+
+
+def invalidate_top_tier() -> None:
+    _top_tier_cache["expires_at"] = 0.0
+
+
+async def _load_top_tier(db: AsyncSession) -> List[ServiceSchema]:
+    # Index scan on service_popularity.score, then primary-key lookups
+    result = await db.execute(
+        select(Service)
+        .join(ServicePopularity, ServicePopularity.service_id == Service.id)
+        .options(joinedload(Service.provider))
+        .order_by(ServicePopularity.score.desc(), Service.id)
+        .limit(TOP_TIER_SIZE)
+    )
+    services = list(result.scalars().all())
+
+    # Young catalogs may not have enough scored services yet
+    if len(services) < TOP_TIER_SIZE:
+        seen = [s.id for s in services]
+        filler = select(Service).options(joinedload(Service.provider))
+        if seen:
+            filler = filler.where(Service.id.not_in(seen))
+        result = await db.execute(
+            filler.order_by(Service.id.desc()).limit(TOP_TIER_SIZE - len(services))
+        )
+        services.extend(result.scalars().all())
+
+    return [ServiceSchema.model_validate(s) for s in services]
+
+
+async def get_top_services(
+    db: AsyncSession, limit: int, sample: bool = False
+) -> List[ServiceSchema]:
+    """
+    Return the `limit` most popular services.
+
+    The top tier is cached in-process for CACHE_TTL_SECONDS, so warm
+    requests do not touch the database. With `sample`, a random subset of
+    the top tier is returned (in rank order) to vary the home page.
+    """
+    now = time.monotonic()
+    if _top_tier_cache["expires_at"] <= now:
+        _top_tier_cache["services"] = await _load_top_tier(db)
+        _top_tier_cache["expires_at"] = now + CACHE_TTL_SECONDS
+
+    tier = _top_tier_cache["services"]
+    if not sample or len(tier) <= limit:
+        return tier[:limit]
+    picked = sorted(random.sample(range(len(tier)), limit))
+    return [tier[i] for i in picked]
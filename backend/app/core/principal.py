@@ -0,0 +1,114 @@
+"""
+Who is making a request, resolved once per request from the bearer token.
+
+`Principal` carries the user id and role straight from the token claims
+(login puts both there), so handlers that only need those never touch
+the database. Handlers that need the full user get a User row served
+from a short-lived cache keyed by id, kept in the response cache's
+backend (Redis, or process memory); a hit is attached to the request's
+session without a SELECT. Writes to a user must call `invalidate_user`
+after committing.
+
+Only the non-secret columns in CACHED_USER_FIELDS are cached. The cache
+may live in Redis, which more things can read than the database, so
+password and feed-token hashes stay out of it. They are unloaded on a
+cached user; code that needs them selects them (setting them is fine).
+"""
+import enum
+import json
+from datetime import datetime
+from typing import NamedTuple, Optional
+from sqlalchemy import DateTime, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from ..models.user import User, UserRole
+from .cache import invalidate_tags, response_cache
+
+USER_CACHE_TTL_SECONDS = 30
+
+CACHED_USER_FIELDS = (
+    "id", "email", "full_name", "role", "phone", "avatar_url", "address", "bio",
+    "is_profile_complete", "is_active", "created_at", "updated_at",
+)
+
+
+class Principal(NamedTuple):
+    id: int
+    role: UserRole
+    email: Optional[str] = None
+
+
+def parse_role(value) -> Optional[UserRole]:
+    """Role claim as a UserRole; tokens may carry the value or the name."""
+    if value is None:
+        return None
+    try:
+        return UserRole(value)
+    except ValueError:
+        try:
+            return UserRole[str(value).upper()]
+        except KeyError:
+            return None
+
+
+def principal_from_claims(claims: dict) -> Optional[Principal]:
+    """The principal named by a token, or None if it lacks id or role."""
+    user_id = claims.get("user_id")
+    role = parse_role(claims.get("role"))
+    if user_id is None or role is None:
+        return None
+    return Principal(id=int(user_id), role=role, email=claims.get("sub"))
+
+
+def _user_tag(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def _dump_user(user: Optional[User]) -> bytes:
+    if user is None:
+        return b"null"
+    data = {}
+    for field in CACHED_USER_FIELDS:
+        value = getattr(user, field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, enum.Enum):
+            value = value.value
+        data[field] = value
+    return json.dumps(data).encode()
+
+
+def _load_user(raw: bytes) -> Optional[User]:
+    cached = json.loads(raw)
+    if cached is None:
+        return None
+    data = {}
+    for field in CACHED_USER_FIELDS:
+        value = cached.get(field)
+        if value is not None and isinstance(User.__table__.columns[field].type, DateTime):
+            value = datetime.fromisoformat(value)
+        elif value is not None and field == "role":
+            value = UserRole(value)
+        data[field] = value
+    user = User(**data)
+    # Turn it into a detached row so merge(load=False) can adopt it as is
+    make_transient_to_detached(user)
+    return user
+
+
+async def cached_user(db: AsyncSession, user_id: int) -> Optional[User]:
+    """The user with this id, attached to `db`; a cache hit costs no query."""
+    async def compute() -> bytes:
+        result = await db.execute(select(User).where(User.id == user_id))
+        return _dump_user(result.scalar_one_or_none())
+
+    raw, _ = await response_cache.get_or_compute(
+        f"principal:user:{user_id}", USER_CACHE_TTL_SECONDS, [_user_tag(user_id)], compute)
+    user = _load_user(raw)
+    if user is None:
+        return None
+    return await db.merge(user, load=False)
+
+
+async def invalidate_user(user_id: int) -> None:
+    await invalidate_tags(_user_tag(user_id))
@@ -0,0 +1,205 @@
+"""
+Token-bucket rate limiting for expensive and abusable endpoints.
+
+Each bucket holds up to `capacity` tokens and refills continuously at
+capacity / period. A request takes one token from every bucket it is
+checked against (say, per client IP and per account) or from none: if
+any bucket is short, it is rejected with 429 and a Retry-After saying
+when the emptiest bucket will have a token again. A bucket is two
+numbers, its level and when it was last updated, so a check costs the
+same whatever the traffic. A bucket can also be checked without taking
+a token and charged later, for limits that only count failed attempts.
+
+Buckets live in Redis when REDIS_URL is set, updated by one Lua script
+per check using Redis' clock, so every API process shares them. Without
+Redis, or while it is unreachable, they live in process memory and each
+process limits on its own.
+
+The client IP is request.client.host; behind a proxy run uvicorn with
+--proxy-headers and --forwarded-allow-ips so that it is the real client.
+"""
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Sequence, Tuple
+from fastapi import HTTPException, Request, status
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ratelimit:"
+
+
+class RateLimit(NamedTuple):
+    capacity: int
+    period_seconds: float
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period_seconds
+
+
+# Every auth request costs bcrypt work or a Google round trip
+AUTH_PER_IP = RateLimit(30, 60)
+# Failed password logins against one account, from any address. Only
+# failures take tokens, so the owner's own sign-ins never run it dry
+LOGIN_PER_ACCOUNT = RateLimit(10, 300)
+# Token refreshes are cheap and come from every signed-in client behind
+# an address, so they get their own, larger bucket
+REFRESH_PER_IP = RateLimit(60, 60)
+BOOKING_PER_IP = RateLimit(60, 60)
+BOOKING_PER_ACCOUNT = RateLimit(20, 60)
+CHECKOUT_PER_IP = RateLimit(30, 60)
+CHECKOUT_PER_ACCOUNT = RateLimit(10, 60)
+
+Bucket = Tuple[str, RateLimit]
+
+
+def _refill(tokens: float, updated_at: float, now: float, limit: RateLimit) -> float:
+    return min(limit.capacity, tokens + max(0.0, now - updated_at) * limit.rate)
+
+
+class MemoryRateLimitBackend:
+    """In-process buckets, used without Redis and as a fallback."""
+
+    def __init__(self, max_buckets: int = 100_000):
+        self.max_buckets = max_buckets
+        # key -> (tokens, updated_at); least recently used first
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, buckets: Sequence[Bucket], consume: bool = True) -> float:
+        now = time.monotonic()
+        levels = []
+        for key, limit in buckets:
+            tokens, updated_at = self._buckets.get(key, (limit.capacity, now))
+            levels.append(_refill(tokens, updated_at, now, limit))
+        wait = max(
+            ((1 - level) / limit.rate for level, (_, limit) in zip(levels, buckets) if level < 1),
+            default=0.0,
+        )
+        for level, (key, _) in zip(levels, buckets):
+            self._buckets[key] = (level - 1 if consume and wait == 0.0 else level, now)
+            self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+        return wait
+
+    async def clear(self) -> None:
+        self._buckets.clear()
+
+
+class RedisRateLimitBackend:
+    # KEYS: bucket keys; ARGV: capacity and rate for each key in turn, then
+    # 1 to take tokens or 0 to only check. Takes a token from every bucket
+    # or none; returns the wait in seconds.
+    _TAKE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local consume = ARGV[2 * #KEYS + 1] == '1'
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if tokens < 1 then
+        wait = math.max(wait, (1 - tokens) / rate)
+    end
+end
+for i, key in ipairs(KEYS) do
+    local tokens = levels[i]
+    if consume and wait == 0 then
+        tokens = tokens - 1
+    end
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000))
+end
+return tostring(wait)
+"""
+
+    def __init__(self, url: str):
+        self._redis = aioredis.from_url(url)
+        self._take = self._redis.register_script(self._TAKE_SCRIPT)
+
+    async def take(self, buckets: Sequence[Bucket], consume: bool = True) -> float:
+        args: List[float] = []
+        for _, limit in buckets:
+            args += [limit.capacity, limit.rate]
+        args.append(1 if consume else 0)
+        wait = await self._take(keys=[KEY_PREFIX + key for key, _ in buckets], args=args)
+        return float(wait)
+
+    async def clear(self) -> None:
+        async for key in self._redis.scan_iter(match=KEY_PREFIX + "*"):
+            await self._redis.delete(key)
+
+
+class RateLimiter:
+    """Bucket facade that degrades to process memory if Redis fails."""
+
+    def __init__(self, redis_url: str = ""):
+        self.memory = MemoryRateLimitBackend()
+        self.backend = RedisRateLimitBackend(redis_url) if redis_url else self.memory
+
+    async def take(self, buckets: Sequence[Bucket], consume: bool = True) -> float:
+        """
+        Take one token from each bucket (or, with consume=False, only
+        look); 0.0, or seconds until allowed.
+        """
+        try:
+            return await self.backend.take(buckets, consume)
+        except (RedisError, OSError) as e:
+            logger.warning(f"Rate limit backend error, using memory: {str(e)}")
+            return await self.memory.take(buckets, consume)
+
+    async def enforce(self, scope: str, buckets: Sequence[Bucket], consume: bool = True) -> None:
+        """
+        Raise 429 with Retry-After unless every bucket has a token; takes
+        one from each unless consume=False.
+        """
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        wait = await self.take([(f"{scope}:{key}", limit) for key, limit in buckets], consume)
+        if wait > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests. Please try again later.",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+
+    async def charge(self, scope: str, buckets: Sequence[Bucket]) -> None:
+        """Take a token from each bucket after the fact, e.g. for a failed attempt."""
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        await self.take([(f"{scope}:{key}", limit) for key, limit in buckets])
+
+
+rate_limiter = RateLimiter(settings.REDIS_URL)
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def account_key(identifier: str) -> str:
+    """Bucket key for an account name, hashed so emails are not stored."""
+    digest = hashlib.sha256(identifier.lower().strip().encode()).hexdigest()
+    return f"account:{digest[:32]}"
+
+
+def ip_key(request: Request) -> str:
+    return f"ip:{client_ip(request)}"
+
+
+def user_key(user_id: int) -> str:
+    return f"user:{user_id}"
@@ -0,0 +1,59 @@
+from typing import Iterable, Optional
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.service import Service
+from ..models.review import Review
+
+
+async def apply_review_delta(
+    db: AsyncSession, service_id: int, rating: float, count_delta: int
+) -> bool:
+    """
+    Adjust the stored rating totals of a service by one review.
+
+    Runs as a single atomic UPDATE in the caller's transaction, so the
+    aggregate commits (or rolls back) together with the review row.
+    Returns False if the service does not exist.
+    """
+    result = await db.execute(
+        update(Service)
+        .where(Service.id == service_id)
+        .values(
+            rating_sum=Service.rating_sum + rating * count_delta,
+            review_count=Service.review_count + count_delta,
+        )
+    )
+    return result.rowcount > 0
+
+
+async def recompute_service_ratings(
+    db: AsyncSession, service_ids: Optional[Iterable[int]] = None
+) -> int:
+    """
+    Rebuild rating_sum/review_count from the reviews table.
+
+    Used to backfill the columns and to repair drift. Services without
+    reviews are reset to zero. Returns the number of services updated.
+    """
+    query = (
+        update(Service)
+        .values(
+            rating_sum=func.coalesce(
+                select(func.sum(Review.rating))
+                .where(Review.service_id == Service.id)
+                .scalar_subquery(),
+                0.0,
+            ),
+            review_count=(
+                select(func.count(Review.id))
+                .where(Review.service_id == Service.id)
+                .scalar_subquery()
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if service_ids is not None:
+        query = query.where(Service.id.in_(list(service_ids)))
+
+    result = await db.execute(query)
+    return result.rowcount
@@ -0,0 +1,318 @@
+"""
+Recurring bookings: RRULE-style rules expanded lazily over a window.
+
+A series is one BookingSeries row holding its first start, a duration
+and a rule such as
+
+    FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH;COUNT=20
+    FREQ=DAILY;UNTIL=20261231T235959Z
+
+Supported parts are FREQ (DAILY or WEEKLY), INTERVAL, BYDAY (weekly
+only), COUNT and UNTIL; a rule needs COUNT or UNTIL. Occurrences keep
+the first start's wall-clock time in the series' timezone, so they do
+not drift across DST changes.
+
+Occurrences are never stored in bulk. Expanding a window jumps straight
+to the first period that can reach it, so the cost is proportional to
+the occurrences inside the window rather than the age of the series. An
+occurrence only gets a Booking row (series_id, occurrence_start) once it
+deviates from its series, e.g. when it alone is cancelled; that row then
+replaces the virtual occurrence everywhere.
+
+Each series also stores the hours of the UTC week its occurrences touch
+(week_hours, GIN-indexed). Conflict checks only load series that share
+an hour of the week with the slot, so a Monday 10:00 booking never
+expands the Tuesday or evening series of a busy service.
+
+Series are not covered by the bookings_no_overlap constraint. Writers
+serialize on a per-service advisory lock instead: booking inserts take
+it shared (they still race each other only through the constraint),
+series creation takes it exclusively.
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.booking import Booking, BookingStatus
+from ..models.booking_series import BookingSeries
+
+FREQUENCIES = {"DAILY": 1, "WEEKLY": 7}
+DAY_CODES = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+MAX_OCCURRENCES = 520
+MAX_SERIES_DAYS = 2 * 366
+
+HOURS_PER_WEEK = 7 * 24
+
+# First key of the two-int advisory lock guarding a service's slots
+SERIES_LOCK_NAMESPACE = 0x5E41E5
+
+Interval = Tuple[datetime, datetime]
+
+
+class Rule(NamedTuple):
+    freq: str
+    interval: int
+    byday: Tuple[int, ...]
+    count: Optional[int]
+    until: Optional[datetime]
+
+
+def _parse_until(value: str) -> datetime:
+    for fmt in ("%Y%m%dT%H%M%SZ", "%Y%m%dT%H%M%S", "%Y%m%d"):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if fmt == "%Y%m%d":
+            parsed = parsed.replace(hour=23, minute=59, second=59)
+        return parsed.replace(tzinfo=timezone.utc)
+    raise ValueError(f"Invalid UNTIL: {value!r}")
+
+
+def parse_rrule(text: str) -> Rule:
+    """Parse a rule string; raises ValueError on anything unsupported."""
+    parts: Dict[str, str] = {}
+    body = text.strip()
+    if body.upper().startswith("RRULE:"):
+        body = body[6:]
+    for part in body.split(";"):
+        if not part.strip():
+            continue
+        key, sep, value = part.partition("=")
+        if not sep or not value.strip():
+            raise ValueError(f"Invalid rule part: {part!r}")
+        parts[key.strip().upper()] = value.strip().upper()
+
+    unknown = set(parts) - {"FREQ", "INTERVAL", "BYDAY", "COUNT", "UNTIL"}
+    if unknown:
+        raise ValueError(f"Unsupported rule parts: {', '.join(sorted(unknown))}")
+    freq = parts.get("FREQ")
+    if freq not in FREQUENCIES:
+        raise ValueError(f"FREQ must be one of: {', '.join(FREQUENCIES)}")
+
+    try:
+        interval = int(parts.get("INTERVAL", "1"))
+        count = int(parts["COUNT"]) if "COUNT" in parts else None
+    except ValueError:
+        raise ValueError("INTERVAL and COUNT must be integers")
+    if interval < 1 or (count is not None and count < 1):
+        raise ValueError("INTERVAL and COUNT must be positive")
+    # Past these a series is rejected anyway; bounding them here keeps
+    # the date arithmetic below in range
+    if count is not None and count > MAX_OCCURRENCES:
+        raise ValueError(f"COUNT may be at most {MAX_OCCURRENCES}")
+    if FREQUENCIES[freq] * interval > MAX_SERIES_DAYS:
+        raise ValueError(
+            f"INTERVAL may be at most {MAX_SERIES_DAYS // FREQUENCIES[freq]} with FREQ={freq}")
+
+    byday: Tuple[int, ...] = ()
+    if "BYDAY" in parts:
+        if freq != "WEEKLY":
+            raise ValueError("BYDAY is only supported with FREQ=WEEKLY")
+        try:
+            byday = tuple(sorted({DAY_CODES.index(d.strip()) for d in parts["BYDAY"].split(",")}))
+        except ValueError:
+            raise ValueError(f"BYDAY days must be among: {', '.join(DAY_CODES)}")
+
+    until = _parse_until(parts["UNTIL"]) if "UNTIL" in parts else None
+    if count is None and until is None:
+        raise ValueError("A rule needs COUNT or UNTIL")
+    return Rule(freq, interval, byday, count, until)
+
+
+class Recurrence:
+    """
+    The occurrences of a rule anchored at a first start.
+
+    Occurrence dates are `anchor + p * period + offset` for period p and
+    each weekday offset; in period 0 the offsets before the first start
+    are skipped. That makes the n-th occurrence, and the first period
+    reaching a date, simple arithmetic.
+    """
+
+    def __init__(self, rule: Rule, start: datetime, duration: timedelta, tz: ZoneInfo):
+        self.rule = rule
+        self.duration = duration
+        self.tz = tz
+        local = start.astimezone(tz)
+        self.first_date = local.date()
+        self.time = local.time().replace(tzinfo=None)
+        self.period = FREQUENCIES[rule.freq] * rule.interval
+        if rule.freq == "WEEKLY":
+            self.anchor = self.first_date - timedelta(days=self.first_date.weekday())
+            self.offsets = rule.byday or (self.first_date.weekday(),)
+        else:
+            self.anchor = self.first_date
+            self.offsets = (0,)
+        first_offset = (self.first_date - self.anchor).days
+        # Offsets of period 0 that fall before the first start
+        self.skipped = sum(1 for o in self.offsets if o < first_offset)
+
+    def _start(self, day: date) -> datetime:
+        return datetime.combine(day, self.time, tzinfo=self.tz).astimezone(timezone.utc)
+
+    def _index(self, period: int, position: int) -> int:
+        return period * len(self.offsets) + position - self.skipped
+
+    def _nth(self, n: int) -> datetime:
+        n += self.skipped
+        period, position = divmod(n, len(self.offsets))
+        return self._start(self.anchor + timedelta(days=period * self.period + self.offsets[position]))
+
+    def between(self, window_start: datetime, window_end: datetime) -> Iterator[Tuple[int, datetime]]:
+        """(index, start) of occurrences overlapping [window_start, window_end), in order."""
+        # A day of slack on either side absorbs UTC offsets
+        low = (window_start - self.duration).astimezone(self.tz).date() - timedelta(days=1)
+        high = window_end.astimezone(self.tz).date() + timedelta(days=1)
+        period = max(0, (low - self.anchor).days // self.period)
+        while True:
+            for position, offset in enumerate(self.offsets):
+                day = self.anchor + timedelta(days=period * self.period + offset)
+                index = self._index(period, position)
+                if index < 0:
+                    continue
+                if day > high or (self.rule.count is not None and index >= self.rule.count):
+                    return
+                start = self._start(day)
+                if self.rule.until is not None and start > self.rule.until:
+                    return
+                if start < window_end and start + self.duration > window_start:
+                    yield index, start
+            period += 1
+
+    def last_end(self) -> datetime:
+        """End of the final occurrence."""
+        last = self._nth(self.rule.count - 1) if self.rule.count is not None else None
+        if self.rule.until is not None:
+            # The last period starting on or before UNTIL holds the last occurrence
+            lookback = timedelta(days=self.period + 2)
+            starts = [s for _, s in self.between(self.rule.until - lookback, self.rule.until)]
+            starts = [s for s in starts if s <= self.rule.until]
+            if not starts:
+                raise ValueError("UNTIL is before the first occurrence")
+            last = min(last, starts[-1]) if last is not None else starts[-1]
+        return last + self.duration
+
+
+def series_timezone(name: Optional[str]) -> ZoneInfo:
+    try:
+        return ZoneInfo(name or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {name}")
+
+
+def recurrence_for(series: BookingSeries) -> Recurrence:
+    return Recurrence(
+        parse_rrule(series.rrule),
+        series.start_time,
+        timedelta(minutes=series.duration_minutes),
+        series_timezone(series.timezone),
+    )
+
+
+def week_hours(intervals: Sequence[Interval]) -> List[int]:
+    """
+    Hours of the UTC week (0 is Monday 00:00) that any of the intervals
+    touch, sorted.
+    """
+    hours = set()
+    for start, end in intervals:
+        start = start.astimezone(timezone.utc)
+        first = start.weekday() * 24 + start.hour
+        spanned = end - start.replace(minute=0, second=0, microsecond=0)
+        count = min(HOURS_PER_WEEK, -(-spanned // timedelta(hours=1)))
+        hours.update((first + i) % HOURS_PER_WEEK for i in range(count))
+        if len(hours) == HOURS_PER_WEEK:
+            break
+    return sorted(hours)
+
+
+def series_range(start_time: datetime, end_time: datetime):
+    """SQL tstzrange matching BookingSeries.span for a window."""
+    return func.tstzrange(start_time, end_time, "[)")
+
+
+async def lock_service_slots(db: AsyncSession, service_id: int, exclusive: bool = False) -> None:
+    """Take the transaction-scoped lock that orders bookings against series."""
+    lock = func.pg_advisory_xact_lock if exclusive else func.pg_advisory_xact_lock_shared
+    await db.execute(select(lock(SERIES_LOCK_NAMESPACE, service_id)))
+
+
+async def materialized_occurrences(
+    db: AsyncSession,
+    series_ids: Sequence[int],
+    window: Interval,
+    slack: timedelta = timedelta(days=1),
+) -> Dict[Tuple[int, datetime], Booking]:
+    """Booking rows standing in for series occurrences that start in the window."""
+    if not series_ids:
+        return {}
+    result = await db.execute(
+        select(Booking).where(
+            Booking.series_id.in_(series_ids),
+            Booking.occurrence_start >= window[0] - slack,
+            Booking.occurrence_start < window[1],
+        )
+    )
+    return {(b.series_id, b.occurrence_start): b for b in result.scalars().all()}
+
+
+async def load_series_busy(
+    db: AsyncSession,
+    service_ids: Sequence[int],
+    window: Interval,
+    exclude_series_id: Optional[int] = None,
+) -> Dict[int, List[Interval]]:
+    """
+    Virtual occurrences of active series per service within a window.
+
+    Two indexed queries whatever the number of series: the series whose
+    span overlaps the window and, for windows under a week, that touch
+    one of its hours of the week; then the rows that replace some of
+    their occurrences. Lists are sorted but not merged.
+    """
+    busy: Dict[int, List[Interval]] = {service_id: [] for service_id in service_ids}
+    if not service_ids:
+        return busy
+    query = select(BookingSeries).where(
+        BookingSeries.service_id.in_(service_ids),
+        BookingSeries.status != BookingStatus.CANCELLED,
+        BookingSeries.span.op("&&")(series_range(*window)),
+    )
+    hours = week_hours([window])
+    if len(hours) < HOURS_PER_WEEK:
+        query = query.where(BookingSeries.week_hours.overlap(hours))
+    if exclude_series_id is not None:
+        query = query.where(BookingSeries.id != exclude_series_id)
+    series_list = (await db.execute(query)).scalars().all()
+    if not series_list:
+        return busy
+
+    slack = timedelta(minutes=max(s.duration_minutes for s in series_list))
+    replaced = await materialized_occurrences(db, [s.id for s in series_list], window, slack)
+    for series in series_list:
+        for _, start in recurrence_for(series).between(*window):
+            if (series.id, start) not in replaced:
+                busy[series.service_id].append(
+                    (start, start + timedelta(minutes=series.duration_minutes)))
+    for intervals in busy.values():
+        intervals.sort()
+    return busy
+
+
+def first_overlap(
+    candidates: Sequence[Interval], busy: Sequence[Interval]
+) -> Optional[Interval]:
+    """First candidate overlapping any busy interval; both lists sorted by start."""
+    j = 0
+    latest_end = None
+    for start, end in candidates:
+        # Busy intervals starting before `end` may overlap this candidate
+        while j < len(busy) and busy[j][0] < end:
+            if latest_end is None or busy[j][1] > latest_end:
+                latest_end = busy[j][1]
+            j += 1
+        if latest_end is not None and latest_end > start:
+            return start, end
+    return None
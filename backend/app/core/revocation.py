@@ -0,0 +1,213 @@
+"""
+Revoked access tokens, checked without a query per request.
+
+Revocations are rows in revoked_tokens: "jti:<id>" for one access token
+(logout), "user:<id>" for every token of a user issued before the row's
+revoked_at (deactivation, logout everywhere). Each process mirrors the
+live keys in a Bloom filter, so `get_current_principal` normally answers
+"not revoked" from memory in microseconds. Only a filter hit, a real
+revocation or a rare false positive, is confirmed against the table.
+
+Keys revoked in this process enter the filter at once. Other processes
+pick them up on their next incremental sync, every
+REVOCATION_SYNC_SECONDS (`sync_revocations_forever`, started from
+app.main); an hourly rebuild drops expired keys, which a Bloom filter
+cannot remove one by one. Until the first load completes every check
+goes to the table.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import SessionLocal
+from ..models.token import RefreshToken, RevokedToken
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+FALSE_POSITIVE_RATE = 0.001
+REBUILD_SECONDS = 3600
+# Incremental syncs re-read this far behind the previous sync, so rows
+# stamped before it but committed after it are not missed
+SYNC_OVERLAP_SECONDS = 60
+# Expired refresh tokens are kept this long for reuse detection and audit
+REFRESH_TOKEN_RETENTION_DAYS = 7
+
+
+def jti_key(jti: str) -> str:
+    return f"jti:{jti}"
+
+
+def user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+class BloomFilter:
+    """Set membership with no false negatives, in a fixed bit array."""
+
+    def __init__(self, capacity: int, error_rate: float = FALSE_POSITIVE_RATE):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+
+class RevocationList:
+    """This process's filter over revoked_tokens."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.filter = BloomFilter(capacity)
+        self.ready = False
+        self.synced_until: Optional[datetime] = None
+        self.rebuilt_at = 0.0
+        # Keys added locally while a rebuild is reading the table
+        self._added_during_rebuild: Optional[list] = None
+
+    def add(self, key: str) -> None:
+        self.filter.add(key)
+        if self._added_during_rebuild is not None:
+            self._added_during_rebuild.append(key)
+
+    def might_be_revoked(self, jti: Optional[str], user_id: int) -> bool:
+        if not self.ready:
+            return True
+        return (jti is not None and jti_key(jti) in self.filter) or user_key(user_id) in self.filter
+
+    async def rebuild(self, db: AsyncSession) -> int:
+        """Reload every live key into a fresh filter; returns the count."""
+        self._added_during_rebuild = []
+        try:
+            started = (await db.execute(select(func.now()))).scalar_one()
+            result = await db.execute(
+                select(RevokedToken.key, RevokedToken.revoked_at)
+                .where(RevokedToken.expires_at > func.now()))
+            rows = result.all()
+            fresh = BloomFilter(max(self.capacity, 2 * len(rows)))
+            for row in rows:
+                fresh.add(row.key)
+            for key in self._added_during_rebuild:
+                fresh.add(key)
+        finally:
+            self._added_during_rebuild = None
+        self.filter = fresh
+        self.synced_until = started
+        self.rebuilt_at = time.monotonic()
+        self.ready = True
+        return len(rows)
+
+    async def sync(self, db: AsyncSession) -> int:
+        """Add keys revoked since the last sync, by any process."""
+        if self.synced_until is None:
+            return await self.rebuild(db)
+        since = self.synced_until - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+        started = (await db.execute(select(func.now()))).scalar_one()
+        result = await db.execute(
+            select(RevokedToken.key, RevokedToken.revoked_at)
+            .where(RevokedToken.revoked_at > since, RevokedToken.expires_at > func.now()))
+        rows = result.all()
+        for row in rows:
+            self.filter.add(row.key)
+        self.synced_until = started
+        if self.filter.count > self.filter.capacity:
+            # False positives climb past the target rate; rebuild on the next tick
+            self.rebuilt_at = 0.0
+        return len(rows)
+
+
+revocations = RevocationList(settings.REVOCATION_FILTER_CAPACITY)
+
+
+async def _revoke(db: AsyncSession, key: str, expires_at: datetime) -> None:
+    stmt = insert(RevokedToken).values(key=key, expires_at=expires_at)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RevokedToken.key],
+        set_={"revoked_at": func.now(), "expires_at": stmt.excluded.expires_at},
+    )
+    await db.execute(stmt)
+    revocations.add(key)
+
+
+async def revoke_access_token(db: AsyncSession, claims: dict) -> None:
+    """Revoke one access token until it expires; part of the caller's transaction."""
+    jti = claims.get("jti")
+    if jti is None:
+        return
+    expires_at = datetime.fromtimestamp(claims["exp"], timezone.utc)
+    await _revoke(db, jti_key(jti), expires_at)
+
+
+async def revoke_user_access_tokens(db: AsyncSession, user_id: int) -> None:
+    """Revoke every access token of a user issued up to now."""
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    await _revoke(db, user_key(user_id), expires_at)
+
+
+async def is_revoked(db: AsyncSession, claims: dict, user_id: int) -> bool:
+    """
+    Authoritative check for a token the filter flagged.
+
+    iat has whole-second precision, so a user cutoff is compared in whole
+    seconds too: tokens issued in the cutoff's own second stay valid.
+    Otherwise signing in right after "log out everywhere" would return
+    a token that is rejected until it expires.
+    """
+    keys = [user_key(user_id)]
+    if claims.get("jti") is not None:
+        keys.append(jti_key(claims["jti"]))
+    result = await db.execute(
+        select(RevokedToken.key, RevokedToken.revoked_at)
+        .where(RevokedToken.key.in_(keys), RevokedToken.expires_at > func.now()))
+    issued_at = claims.get("iat", 0)
+    for row in result.all():
+        if row.key.startswith("jti:") or issued_at < math.floor(row.revoked_at.timestamp()):
+            return True
+    return False
+
+
+async def purge_expired(db: AsyncSession) -> None:
+    await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= func.now()))
+    await db.execute(delete(RefreshToken).where(
+        RefreshToken.expires_at <= func.now() - timedelta(days=REFRESH_TOKEN_RETENTION_DAYS)))
+
+
+async def sync_revocations_forever() -> None:
+    """Keep this process's revocation filter in step with the table."""
+    while True:
+        try:
+            async with SessionLocal() as db:
+                if time.monotonic() - revocations.rebuilt_at >= REBUILD_SECONDS:
+                    await purge_expired(db)
+                    await db.commit()
+                    loaded = await revocations.rebuild(db)
+                    logger.info(f"Loaded {loaded} revoked token keys")
+                else:
+                    await revocations.sync(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Revocation sync failed: {str(e)}")
+        await asyncio.sleep(settings.REVOCATION_SYNC_SECONDS)
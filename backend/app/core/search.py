@@ -0,0 +1,46 @@
+from sqlalchemy import func, literal, or_, Select
+from ..models.service import Service
+
+# Text search configuration used by the services_search_vector trigger
+SEARCH_CONFIG = "english"
+
+HEADLINE_OPTIONS = (
+    "StartSel=<mark>, StopSel=</mark>, MaxWords=20, MinWords=8, "
+    "MaxFragments=2, FragmentDelimiter= … "
+)
+
+
+def apply_service_search(query: Select, term: str):
+    """
+    Restrict a Service query to rows matching a search term.
+
+    A row matches if its weighted full-text vector (name > category >
+    description > location, maintained by a trigger) matches the parsed
+    query, or if the name is a close trigram match for the raw term.
+    Both predicates are served by GIN indexes.
+
+    Returns the filtered query plus the relevance rank and highlight
+    expressions, so callers can order by rank and select both for the page.
+    """
+    ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, term)
+    term_literal = literal(term)
+
+    rank = (
+        func.ts_rank_cd(Service.search_vector, ts_query)
+        + func.word_similarity(term_literal, Service.name)
+    )
+    highlight = func.ts_headline(
+        SEARCH_CONFIG,
+        func.concat_ws(" — ", Service.name, Service.description),
+        ts_query,
+        HEADLINE_OPTIONS,
+    )
+
+    query = query.where(
+        or_(
+            Service.search_vector.op("@@")(ts_query),
+            term_literal.op("<%")(Service.name),
+        )
+    )
+
+    return query, rank, highlight
@@ -0,0 +1,100 @@
+"""
+Rotating refresh tokens.
+
+Login hands out a short-lived access token (a JWT) and an opaque refresh
+token. Trading a refresh token at /auth/refresh retires it and issues a
+new one in the same family. A retired or revoked token coming back means
+it was copied; the whole family is revoked, logging out both the thief
+and the real client, who signs in again.
+
+Only a sha256 of each refresh token is stored.
+"""
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.token import RefreshToken
+from .config import settings
+from .revocation import revoke_user_access_tokens
+
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _invalid_refresh_token(detail: str = "Invalid refresh token") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def issue_refresh_token(
+    db: AsyncSession, user_id: int, family_id: Optional[str] = None,
+) -> str:
+    """A new refresh token, added to the caller's transaction."""
+    token = secrets.token_urlsafe(48)
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=hash_refresh_token(token),
+        family_id=family_id or uuid.uuid4().hex,
+        expires_at=datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token
+
+
+async def revoke_family(db: AsyncSession, family_id: str) -> None:
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc)))
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> Tuple[int, str]:
+    """
+    Retire a refresh token and issue its successor; returns the user id
+    and the new token. The caller commits. A reused token revokes its
+    family (committed here) and raises 401.
+    """
+    result = await db.execute(
+        select(RefreshToken)
+        .where(RefreshToken.token_hash == hash_refresh_token(token))
+        .with_for_update())
+    current = result.scalar_one_or_none()
+    if current is None:
+        raise _invalid_refresh_token()
+    if current.rotated_at is not None or current.revoked_at is not None:
+        await revoke_family(db, current.family_id)
+        await db.commit()
+        raise _invalid_refresh_token("Refresh token already used; please sign in again")
+    if current.expires_at <= datetime.now(timezone.utc):
+        raise _invalid_refresh_token("Refresh token expired; please sign in again")
+
+    current.rotated_at = datetime.now(timezone.utc)
+    successor = await issue_refresh_token(db, current.user_id, current.family_id)
+    return current.user_id, successor
+
+
+async def revoke_refresh_token(db: AsyncSession, token: str, user_id: int) -> None:
+    """Revoke the family of a refresh token held by this user, if any."""
+    result = await db.execute(
+        select(RefreshToken.family_id)
+        .where(RefreshToken.token_hash == hash_refresh_token(token),
+               RefreshToken.user_id == user_id))
+    family_id = result.scalar_one_or_none()
+    if family_id is not None:
+        await revoke_family(db, family_id)
+
+
+async def revoke_user_tokens(db: AsyncSession, user_id: int) -> None:
+    """Sign a user out everywhere: all refresh tokens and live access tokens."""
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc)))
+    await revoke_user_access_tokens(db, user_id)
@@ -0,0 +1,228 @@
+"""
+Waitlist backfill: freed slots are offered to waiting customers in order.
+
+Whenever a slot is freed (a cancellation, a released or lapsed hold, a
+declined offer) the code freeing it calls `slot_freed` before committing.
+If anyone waits for the slot, that records it in waitlist_freed_slots
+as part of the same transaction. A background worker in every process
+(app.core.jobs) claims recorded slots with SKIP LOCKED, picks the oldest
+waiter of that service whose window covers the slot, using the partial
+GiST index on (service_id, window), and offers it as a checkout-style
+hold that expires after WAITLIST_OFFER_MINUTES; the record is deleted
+in the transaction that makes the offer. Expired offers move on to the
+next waiter, and waiters whose window has ended are retired by the same
+sweep. Waiters are locked with SKIP LOCKED too, so each waiter
+gets at most one offer at a time.
+
+Workers poll every WAITLIST_POLL_SECONDS; the worker of the process
+that freed a slot is woken as soon as the slot commits.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.booking import Booking, BookingStatus
+from ..models.service import Service
+from ..models.waitlist import WaitlistEntry, WaitlistFreedSlot, WaitlistStatus
+from .availability import update_next_available_for_booking
+from .bookings import ensure_slot_free, flush_booking, slot_range
+from .config import settings
+
+Slot = Tuple[int, datetime, datetime]  # service_id, start_time, end_time
+
+# A slot whose offer failed is retried after this long
+FREED_SLOT_RETRY_SECONDS = 60
+
+offer_wakeup = asyncio.Event()
+
+
+def _wake_worker(session) -> None:
+    offer_wakeup.set()
+
+
+async def slot_freed(
+    db: AsyncSession, service_id: int, start_time: datetime, end_time: datetime,
+) -> None:
+    """
+    Record a freed slot for the waitlist worker if anyone waits for it.
+    Call before committing; the record commits with the freeing change.
+    """
+    result = await db.execute(
+        select(WaitlistEntry.id)
+        .where(
+            WaitlistEntry.service_id == service_id,
+            WaitlistEntry.status == WaitlistStatus.WAITING,
+            WaitlistEntry.window.op("@>")(slot_range(start_time, end_time)),
+        )
+        .limit(1)
+    )
+    if result.first() is None:
+        return
+    db.add(WaitlistFreedSlot(service_id=service_id, start_time=start_time, end_time=end_time))
+    event.listen(db.sync_session, "after_commit", _wake_worker, once=True)
+
+
+async def claim_freed_slot(db: AsyncSession) -> Optional[Tuple[int, Slot]]:
+    """The id and slot of the oldest due freed slot, locked until commit."""
+    result = await db.execute(
+        select(
+            WaitlistFreedSlot.id,
+            WaitlistFreedSlot.service_id,
+            WaitlistFreedSlot.start_time,
+            WaitlistFreedSlot.end_time,
+        )
+        .where(WaitlistFreedSlot.not_before <= func.now())
+        .order_by(WaitlistFreedSlot.not_before, WaitlistFreedSlot.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    return row.id, (row.service_id, row.start_time, row.end_time)
+
+
+async def offer_freed_slot(db: AsyncSession, freed_id: int, slot: Slot) -> Optional[WaitlistEntry]:
+    """
+    Offer a claimed freed slot and drop its record; the caller commits.
+
+    Slots that have started are dropped without an offer. If the offer
+    loses a race for the slot the transaction is rolled back, and the
+    record is dropped in a fresh one: the slot is taken either way.
+    """
+    service_id, start_time, end_time = slot
+    entry = None
+    if start_time > datetime.now(timezone.utc):
+        entry = await offer_slot(db, service_id, start_time, end_time)
+    await db.execute(delete(WaitlistFreedSlot).where(WaitlistFreedSlot.id == freed_id))
+    return entry
+
+
+async def postpone_freed_slot(db: AsyncSession, freed_id: int) -> None:
+    await db.execute(
+        update(WaitlistFreedSlot)
+        .where(WaitlistFreedSlot.id == freed_id)
+        .values(not_before=func.now() + timedelta(seconds=FREED_SLOT_RETRY_SECONDS))
+    )
+
+
+async def release_hold(db: AsyncSession, booking_id: Optional[int]) -> Optional[Slot]:
+    """
+    Cancel a held booking (checkout or waitlist offer) that won't go ahead.
+
+    Returns the freed slot, or None if the booking was no longer a hold.
+    """
+    if booking_id is None:
+        return None
+    result = await db.execute(
+        update(Booking)
+        .where(
+            Booking.id == booking_id,
+            Booking.status == BookingStatus.PENDING,
+            Booking.hold_expires_at.is_not(None),
+        )
+        .values(status=BookingStatus.CANCELLED, version=Booking.version + 1)
+        .returning(Booking.service_id, Booking.start_time, Booking.end_time)
+        .execution_options(synchronize_session=False)
+    )
+    released = result.one_or_none()
+    if released is None:
+        return None
+    await update_next_available_for_booking(db, *released, freed=True)
+    return tuple(released)
+
+
+async def expire_offers(db: AsyncSession) -> List[Slot]:
+    """
+    Mark lapsed offers expired and release their holds.
+
+    Returns the slots that became free again, to be offered onwards.
+    """
+    result = await db.execute(
+        update(WaitlistEntry)
+        .where(
+            WaitlistEntry.status == WaitlistStatus.OFFERED,
+            WaitlistEntry.offer_expires_at <= datetime.now(timezone.utc),
+        )
+        .values(status=WaitlistStatus.EXPIRED)
+        .returning(WaitlistEntry.booking_id)
+        .execution_options(synchronize_session=False)
+    )
+    freed = []
+    for booking_id in result.scalars().all():
+        slot = await release_hold(db, booking_id)
+        if slot is not None:
+            freed.append(slot)
+    return freed
+
+
+async def expire_lapsed_entries(db: AsyncSession) -> int:
+    """Mark waiting entries whose window is over expired; returns how many."""
+    result = await db.execute(
+        update(WaitlistEntry)
+        .where(
+            WaitlistEntry.status == WaitlistStatus.WAITING,
+            WaitlistEntry.window_end <= datetime.now(timezone.utc),
+        )
+        .values(status=WaitlistStatus.EXPIRED)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def offer_slot(
+    db: AsyncSession,
+    service_id: int,
+    start_time: datetime,
+    end_time: datetime,
+) -> Optional[WaitlistEntry]:
+    """
+    Offer a freed slot to the first waiter whose window covers it.
+
+    Returns the offered entry, or None if nobody is waiting or the slot
+    has been taken in the meantime. The caller commits.
+    """
+    result = await db.execute(
+        select(WaitlistEntry)
+        .where(
+            WaitlistEntry.service_id == service_id,
+            WaitlistEntry.status == WaitlistStatus.WAITING,
+            WaitlistEntry.window.op("@>")(slot_range(start_time, end_time)),
+        )
+        .order_by(WaitlistEntry.created_at, WaitlistEntry.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    entry = result.scalar_one_or_none()
+    if entry is None:
+        return None
+
+    provider_id = (await db.execute(
+        select(Service.provider_id).where(Service.id == service_id)
+    )).scalar_one_or_none()
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=settings.WAITLIST_OFFER_MINUTES)
+    hold = Booking(
+        customer_id=entry.customer_id,
+        service_id=service_id,
+        provider_id=provider_id,
+        start_time=start_time,
+        end_time=end_time,
+        status=BookingStatus.PENDING,
+        hold_expires_at=expires_at,
+        notes="Waitlist offer",
+    )
+    try:
+        # A recurring series may have claimed the slot since it was freed
+        await ensure_slot_free(db, service_id, start_time, end_time)
+        db.add(hold)
+        await flush_booking(db)
+    except HTTPException:
+        return None  # Someone booked the slot directly first
+
+    entry.status = WaitlistStatus.OFFERED
+    entry.booking_id = hold.id
+    entry.offer_expires_at = expires_at
+    await update_next_available_for_booking(db, service_id, start_time, end_time, freed=False)
+    return entry
@@ -1,7 +1,14 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .core.config import settings
-from .api.v1 import auth, services, availability, bookings, providers, reviews, favorites, payments, admin
+from .api.v1 import auth, services, availability, bookings, providers, reviews, favorites, payments, admin, waitlist, booking_series, calendar
+from .core.categories import listen_for_category_changes
+from .core.security import password_hasher
+from .core.http import close_http_client
+from .core.google import refresh_jwks_forever
+from .core.jobs import sweep_expired_holds, roll_next_available_forever, run_waitlist_worker
+from .core.revocation import sync_revocations_forever
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -21,11 +28,41 @@ app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["aut
 app.include_router(services.router, prefix=f"{settings.API_V1_STR}/services", tags=["services"])
 app.include_router(availability.router, prefix=f"{settings.API_V1_STR}/availability", tags=["availability"])
 app.include_router(bookings.router, prefix=f"{settings.API_V1_STR}/bookings", tags=["bookings"])
+app.include_router(booking_series.router, prefix=f"{settings.API_V1_STR}/booking-series", tags=["bookings"])
 app.include_router(providers.router, prefix=f"{settings.API_V1_STR}/providers", tags=["providers"])
 app.include_router(reviews.router, prefix=f"{settings.API_V1_STR}/reviews", tags=["reviews"])
 app.include_router(favorites.router, prefix=f"{settings.API_V1_STR}/favorites", tags=["favorites"])
 app.include_router(payments.router, prefix=f"{settings.API_V1_STR}/payments", tags=["payments"])
 app.include_router(admin.router, prefix=f"{settings.API_V1_STR}/admin", tags=["admin"])
+app.include_router(waitlist.router, prefix=f"{settings.API_V1_STR}/waitlist", tags=["waitlist"])
+app.include_router(calendar.router, prefix=f"{settings.API_V1_STR}/calendar", tags=["calendar"])
+
+@app.on_event("startup")
+async def start_category_listener():
+    app.state.category_listener = await listen_for_category_changes()
+
+@app.on_event("shutdown")
+async def stop_category_listener():
+    if app.state.category_listener is not None:
+        await app.state.category_listener.close()
+
+@app.on_event("startup")
+async def start_background_jobs():
+    app.state.jobs = [
+        asyncio.create_task(sweep_expired_holds()),
+        asyncio.create_task(roll_next_available_forever()),
+        asyncio.create_task(run_waitlist_worker()),
+        asyncio.create_task(sync_revocations_forever()),
+    ]
+    if settings.GOOGLE_CLIENT_ID:
+        app.state.jobs.append(asyncio.create_task(refresh_jwks_forever()))
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    for job in app.state.jobs:
+        job.cancel()
+    password_hasher.shutdown()
+    await close_http_client()
 
 @app.get("/")
 async def root():
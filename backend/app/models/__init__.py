@@ -2,6 +2,10 @@ from ..database import Base
 from .user import User
 from .service import Service, Category
 from .booking import Booking
+from .booking_series import BookingSeries
 from .provider import ProviderProfile
 from .review import Review
 from .favorite import Favorite
+from .popularity import ServicePopularity
+from .waitlist import WaitlistEntry, WaitlistFreedSlot
+from .token import RefreshToken, RevokedToken
@@ -1,5 +1,6 @@
 import enum
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Column, Computed, Integer, DateTime, ForeignKey, Enum, Text, Index, text
+from sqlalchemy.dialects.postgresql import ExcludeConstraint, TSTZRANGE
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -16,12 +17,55 @@ class Booking(Base):
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("users.id"))
     service_id = Column(Integer, ForeignKey("services.id"))
+    # Copy of services.provider_id so provider dashboards skip the join
+    provider_id = Column(Integer, ForeignKey("users.id"))
     start_time = Column(DateTime(timezone=True), nullable=False)
     end_time = Column(DateTime(timezone=True), nullable=False)
     status = Column(Enum(BookingStatus), default=BookingStatus.PENDING)
     notes = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Bumped on every write; ORM updates compare-and-set on it
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Set on occurrences of a recurring series that have their own row
+    series_id = Column(Integer, ForeignKey("booking_series.id", ondelete="CASCADE"), nullable=True)
+    occurrence_start = Column(DateTime(timezone=True), nullable=True)
+    # Set while a pending booking only holds its slot for checkout
+    hold_expires_at = Column(DateTime(timezone=True), nullable=True)
+    # [start_time, end_time) maintained by the database for overlap checks
+    during = Column(
+        TSTZRANGE,
+        Computed("tstzrange(start_time, end_time, '[)')", persisted=True),
+    )
 
-    customer = relationship("User")
+    __table_args__ = (
+        # Composite keys for keyset pagination by creation time
+        Index("ix_bookings_created_at_id", "created_at", "id"),
+        # Provider dashboards by date, customer history by creation time
+        Index("ix_bookings_provider_id_start_time", "provider_id", "start_time", "id"),
+        Index("ix_bookings_customer_id_created_at", "customer_id", "created_at", "id"),
+        # Lets the hold sweeper find expired holds without a scan
+        Index(
+            "ix_bookings_hold_expires_at", "hold_expires_at",
+            postgresql_where=text("hold_expires_at IS NOT NULL AND status = 'PENDING'"),
+        ),
+        # At most one row per series occurrence
+        Index(
+            "ix_bookings_series_occurrence", "series_id", "occurrence_start",
+            unique=True, postgresql_where=text("series_id IS NOT NULL"),
+        ),
+        # No two live bookings of one service may overlap (needs btree_gist)
+        ExcludeConstraint(
+            ("service_id", "="),
+            ("during", "&&"),
+            name="bookings_no_overlap",
+            using="gist",
+            where=text("status <> 'CANCELLED'"),
+        ),
+    )
+
+    # UPDATEs from the ORM add "AND version = :v" and bump it
+    __mapper_args__ = {"version_id_col": version}
+
+    customer = relationship("User", foreign_keys=[customer_id])
     service = relationship("Service", back_populates="bookings")
@@ -0,0 +1,59 @@
+from sqlalchemy import Column, Computed, Integer, SmallInteger, String, DateTime, ForeignKey, Enum, Text, Index, text
+from sqlalchemy.dialects.postgresql import ARRAY, TSTZRANGE
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from ..database import Base
+from .booking import BookingStatus
+
+
+class BookingSeries(Base):
+    """
+    A recurring booking stored as one row.
+
+    Occurrences are expanded on demand from `rrule` (see
+    app.core.recurrence). An occurrence only gets its own Booking row,
+    linked by series_id and occurrence_start, once it deviates from the
+    series, e.g. when it alone is cancelled.
+    """
+    __tablename__ = "booking_series"
+
+    id = Column(Integer, primary_key=True, index=True)
+    customer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    service_id = Column(Integer, ForeignKey("services.id", ondelete="CASCADE"), nullable=False)
+    provider_id = Column(Integer, ForeignKey("users.id"))
+    # First occurrence; later ones keep its wall-clock time in `timezone`
+    start_time = Column(DateTime(timezone=True), nullable=False)
+    rrule = Column(String, nullable=False)
+    timezone = Column(String, nullable=False, default="UTC")
+    duration_minutes = Column(Integer, nullable=False)
+    # End of the last occurrence
+    series_end = Column(DateTime(timezone=True), nullable=False)
+    span = Column(
+        TSTZRANGE,
+        Computed("tstzrange(start_time, series_end, '[)')", persisted=True),
+    )
+    # Hours of the UTC week (0 = Monday 00:00) its occurrences touch
+    week_hours = Column(ARRAY(SmallInteger), nullable=False)
+    status = Column(Enum(BookingStatus), nullable=False, default=BookingStatus.PENDING)
+    notes = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        # Series of a service that may have occurrences in a window
+        Index(
+            "ix_booking_series_service_span", "service_id", "span",
+            postgresql_using="gist",
+            postgresql_where=text("status <> 'CANCELLED'"),
+        ),
+        # Series that may have an occurrence at a given time of the week
+        Index(
+            "ix_booking_series_week_hours", "week_hours",
+            postgresql_using="gin",
+            postgresql_where=text("status <> 'CANCELLED'"),
+        ),
+        Index("ix_booking_series_customer_id", "customer_id"),
+    )
+
+    customer = relationship("User", foreign_keys=[customer_id])
+    service = relationship("Service")
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class ServicePopularity(Base):
+    __tablename__ = "service_popularity"
+
+    # One row per service; score is a forward-decayed event count, so rows
+    # only change when new events arrive (see app.core.popularity)
+    service_id = Column(Integer, ForeignKey("services.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, nullable=False, default=0.0, index=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    service = relationship("Service")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, JSON, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, JSON, DateTime, Float
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
@@ -13,6 +13,9 @@ class ProviderProfile(Base):
     bio = Column(String)
     availability = Column(JSON)  # Store working hours, breaks, etc.
     location = Column(String)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    geohash = Column(String(12, collation="C"), nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow,
                         onupdate=datetime.utcnow)
@@ -8,7 +8,7 @@ class Review(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("users.id"))
-    service_id = Column(Integer, ForeignKey("services.id"))
+    service_id = Column(Integer, ForeignKey("services.id"), index=True)
     rating = Column(Float, nullable=False) # 1.0 to 5.0
     comment = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,9 +1,15 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Text
-from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Text, Index, DateTime, case, func, literal_column
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from ..database import Base
 from .booking import Booking
 from .review import Review
 
+# Sort value for services with no open slot within the look-ahead horizon
+NEVER_AVAILABLE = datetime(9999, 12, 31, tzinfo=timezone.utc)
+
 class Category(Base):
     __tablename__ = "categories"
     
@@ -28,7 +34,63 @@ class Service(Base):
     image_url = Column(String, nullable=True)
     location = Column(String, nullable=True)
 
+    # Geocoded location; geohash prefixes drive "near me" queries (app.core.geo)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    geohash = Column(String(12, collation="C"), nullable=True, index=True)
+
+    # Denormalized review aggregates, maintained by app.core.ratings
+    rating_sum = Column(Float, nullable=False, default=0.0, server_default="0")
+    review_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Earliest open slot, maintained by app.core.availability; NULL when
+    # nothing is free within NEXT_AVAILABLE_HORIZON_DAYS
+    next_available_at = Column(DateTime(timezone=True), nullable=True, index=True)
+
+    # When the provider last edited the service. Set explicitly rather than
+    # on every write, so the columns above, maintained in the background,
+    # don't move it (calendar feeds use it to detect renamed services)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Weighted full-text document, maintained by the services_search_vector
+    # trigger (see the add_service_search migration); never written by the app
+    search_vector = deferred(Column(TSVECTOR, nullable=True))
+
+    # Composite keys for keyset pagination by price
+    __table_args__ = (
+        Index("ix_services_price_id", "price", "id"),
+    )
+
     category = relationship("Category", back_populates="services")
     provider = relationship("User")
     bookings = relationship("Booking", back_populates="service")
     reviews = relationship("Review", back_populates="service")
+
+    @hybrid_property
+    def rating(self) -> float:
+        if not self.review_count:
+            return 0.0
+        return round(self.rating_sum / self.review_count, 1)
+
+    @rating.expression
+    def rating(cls):
+        return case(
+            (cls.review_count > 0, cls.rating_sum / cls.review_count),
+            else_=0.0,
+        )
+
+    @hybrid_property
+    def next_available_sort(self) -> datetime:
+        return self.next_available_at or NEVER_AVAILABLE
+
+    @next_available_sort.expression
+    def next_available_sort(cls):
+        # Inline constant so the expression matches the index below
+        return func.coalesce(
+            cls.next_available_at,
+            literal_column("'9999-12-31 00:00:00+00'::timestamptz"),
+        )
+
+
+# Keyset pagination by soonest availability, unavailable services last
+Index("ix_services_next_available_sort_id", Service.next_available_sort, Service.id)
@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, text
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # sha256 of the opaque token; the token itself is only ever sent to the client
+    token_hash = Column(String, unique=True, nullable=False)
+    # Every token rotated out of one login shares a family; reuse revokes it whole
+    family_id = Column(String, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    rotated_at = Column(DateTime(timezone=True), nullable=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_refresh_tokens_family_id", "family_id"),
+        Index(
+            "ix_refresh_tokens_user_live", "user_id",
+            postgresql_where=text("revoked_at IS NULL"),
+        ),
+    )
+
+
+class RevokedToken(Base):
+    """
+    A revoked access token ("jti:<id>"), or a cutoff for all of a user's
+    access tokens issued before revoked_at ("user:<id>"). Rows are kept
+    until every token they could match has expired.
+    """
+    __tablename__ = "revoked_tokens"
+
+    key = Column(String, primary_key=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_revoked_tokens_revoked_at", "revoked_at"),
+        Index("ix_revoked_tokens_expires_at", "expires_at"),
+    )
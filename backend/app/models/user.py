@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Integer, String, Enum, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, Enum, Boolean, DateTime, Text, Index
 from sqlalchemy.sql import func
 from ..database import Base
 
@@ -28,7 +28,15 @@ class User(Base):
     # Profile completion tracking
     is_profile_complete = Column(Boolean, default=False)
 
+    # SHA-256 of the secret in the user's calendar feed URL
+    calendar_token_hash = Column(String, unique=True, nullable=True)
+
     # Status and timestamps
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Composite keys for keyset pagination by creation time
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
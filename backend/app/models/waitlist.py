@@ -0,0 +1,90 @@
+import enum
+from sqlalchemy import Column, Computed, Integer, DateTime, ForeignKey, Enum, Index, text
+from sqlalchemy.dialects.postgresql import TSTZRANGE
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class WaitlistStatus(str, enum.Enum):
+    WAITING = "waiting"
+    OFFERED = "offered"
+    ACCEPTED = "accepted"
+    EXPIRED = "expired"
+    CANCELLED = "cancelled"
+
+
+class WaitlistEntry(Base):
+    __tablename__ = "waitlist_entries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    service_id = Column(Integer, ForeignKey("services.id", ondelete="CASCADE"), nullable=False)
+    customer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Any slot inside [window_start, window_end) will do
+    window_start = Column(DateTime(timezone=True), nullable=False)
+    window_end = Column(DateTime(timezone=True), nullable=False)
+    window = Column(
+        TSTZRANGE,
+        Computed("tstzrange(window_start, window_end, '[)')", persisted=True),
+    )
+    status = Column(Enum(WaitlistStatus), nullable=False, default=WaitlistStatus.WAITING)
+    # The held booking offered to this waiter, while status is OFFERED
+    booking_id = Column(Integer, ForeignKey("bookings.id", ondelete="SET NULL"), nullable=True)
+    offer_expires_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        # Waiters whose window covers a freed slot (needs btree_gist)
+        Index(
+            "ix_waitlist_entries_waiting_window", "service_id", "window",
+            postgresql_using="gist",
+            postgresql_where=text("status = 'WAITING'"),
+        ),
+        # FIFO order among a service's waiters
+        Index(
+            "ix_waitlist_entries_waiting_fifo", "service_id", "created_at", "id",
+            postgresql_where=text("status = 'WAITING'"),
+        ),
+        Index(
+            "ix_waitlist_entries_offer_expires_at", "offer_expires_at",
+            postgresql_where=text("status = 'OFFERED'"),
+        ),
+        # Waiters whose window is over, for the sweeper to retire
+        Index(
+            "ix_waitlist_entries_waiting_window_end", "window_end",
+            postgresql_where=text("status = 'WAITING'"),
+        ),
+        # One active entry per customer, service and window
+        Index(
+            "ix_waitlist_entries_active_unique",
+            "customer_id", "service_id", "window_start", "window_end",
+            unique=True,
+            postgresql_where=text("status IN ('WAITING', 'OFFERED')"),
+        ),
+    )
+
+    service = relationship("Service")
+    customer = relationship("User")
+    booking = relationship("Booking")
+
+
+class WaitlistFreedSlot(Base):
+    """
+    A freed slot someone is waiting for, not yet offered. Written in the
+    transaction that frees the slot and deleted in the one that offers
+    it, so no freed slot is lost to a restart or stuck in one process.
+    """
+    __tablename__ = "waitlist_freed_slots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    service_id = Column(Integer, ForeignKey("services.id", ondelete="CASCADE"), nullable=False)
+    start_time = Column(DateTime(timezone=True), nullable=False)
+    end_time = Column(DateTime(timezone=True), nullable=False)
+    # Pushed back after a failed attempt, so one bad slot can't block the rest
+    not_before = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_waitlist_freed_slots_not_before", "not_before", "id"),
+    )
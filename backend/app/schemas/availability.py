@@ -0,0 +1,32 @@
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+from typing import List, Literal, Optional
+
+
+class BatchAvailabilityRequest(BaseModel):
+    service_ids: List[int] = Field(..., min_length=1, max_length=100)
+    start_date: date
+    end_date: Optional[date] = None
+    format: Literal["slots", "bitmap"] = "slots"
+    step_minutes: Optional[int] = Field(None, ge=5, le=240)
+
+
+class ServiceAvailability(BaseModel):
+    service_id: int
+    provider_id: Optional[int] = None
+    duration_minutes: int
+    next_available: Optional[datetime] = None
+    # format=slots
+    available_slots: Optional[List[datetime]] = None
+    # format=bitmap: bit i (most significant first) is set when a slot
+    # starting at origin + i * step_minutes is free; hex encoded
+    origin: Optional[datetime] = None
+    step_minutes: Optional[int] = None
+    bitmap: Optional[str] = None
+
+
+class BatchAvailabilityResponse(BaseModel):
+    start_date: date
+    end_date: date
+    services: List[ServiceAvailability]
+    missing_service_ids: List[int] = []
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from ..models.booking import BookingStatus
 from .service import Service
 
@@ -18,10 +18,30 @@ class BookingCreate(BookingBase):
 class Booking(BookingBase):
     id: int
     customer_id: int
+    provider_id: Optional[int] = None
     end_time: datetime
     status: BookingStatus
+    version: int = 1
     created_at: datetime
+    hold_expires_at: Optional[datetime] = None
     service: Optional[Service] = None
 
     class Config:
         from_attributes = True
+
+
+class BookingStatusBulkUpdate(BaseModel):
+    booking_ids: List[int] = Field(..., min_length=1, max_length=100)
+    status: str
+
+
+class BookingStatusResult(BaseModel):
+    booking_id: int
+    status_code: int
+    detail: Optional[str] = None
+    status: Optional[BookingStatus] = None
+
+
+class BookingStatusBulkResult(BaseModel):
+    updated: int
+    results: List[BookingStatusResult]
@@ -0,0 +1,42 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+from ..models.booking import BookingStatus
+
+
+class BookingSeriesCreate(BaseModel):
+    service_id: int
+    start_time: datetime
+    rrule: str
+    timezone: str = "UTC"
+    notes: Optional[str] = None
+
+
+class BookingSeries(BaseModel):
+    id: int
+    customer_id: int
+    service_id: int
+    provider_id: Optional[int] = None
+    start_time: datetime
+    rrule: str
+    timezone: str
+    duration_minutes: int
+    series_end: datetime
+    status: BookingStatus
+    notes: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class SeriesOccurrence(BaseModel):
+    start_time: datetime
+    end_time: datetime
+    status: BookingStatus
+    # Set once the occurrence has its own booking row
+    booking_id: Optional[int] = None
+
+
+class SeriesOccurrenceCancel(BaseModel):
+    occurrence_start: datetime
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class CursorPage(BaseModel, Generic[T]):
+    """Response envelope for cursor (keyset) pagination"""
+    items: List[T]
+    next_cursor: Optional[str] = None
@@ -27,6 +27,8 @@ class ProviderProfile(ProviderProfileBase):
     id: int
     user_id: int
     availability: Optional[dict] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
@@ -1,6 +1,8 @@
 from pydantic import BaseModel, Field, computed_field
 from typing import Optional, List
+from datetime import datetime
 from .user import User as UserSchema
+from .pagination import CursorPage
 
 
 class CategoryBase(BaseModel):
@@ -30,6 +32,9 @@ class ServiceBase(BaseModel):
     category_id: int
     image_url: Optional[str] = None
     location: Optional[str] = None
+    # Geocoded from `location` via the gazetteer when not provided
+    latitude: Optional[float] = Field(default=None, ge=-90, le=90)
+    longitude: Optional[float] = Field(default=None, ge=-180, le=180)
 
 
 class ServiceCreate(ServiceBase):
@@ -42,6 +47,48 @@ class Service(ServiceBase):
     provider: Optional[UserSchema] = None
     rating: Optional[float] = Field(default=0.0)
     review_count: Optional[int] = Field(default=0)
+    next_available_at: Optional[datetime] = None
+    # Only populated for results of a `search` query
+    search_rank: Optional[float] = None
+    highlight: Optional[str] = None
+    # Only populated when listing around a lat/lng point
+    distance_km: Optional[float] = None
 
     class Config:
         from_attributes = True
+
+
+class CategoryFacet(BaseModel):
+    category_id: Optional[int] = None
+    name: Optional[str] = None
+    count: int
+
+
+class PriceFacet(BaseModel):
+    min: float
+    max: float
+    count: int
+
+
+class RatingFacet(BaseModel):
+    """Services rated at least `min_rating` stars (and below the next bucket); 0 = unrated"""
+    min_rating: int
+    count: int
+
+
+class LocationFacet(BaseModel):
+    location: Optional[str] = None
+    count: int
+
+
+class ServiceFacets(BaseModel):
+    total: int = 0
+    categories: List[CategoryFacet] = []
+    price: List[PriceFacet] = []
+    rating: List[RatingFacet] = []
+    locations: List[LocationFacet] = []
+
+
+class ServicePage(CursorPage[Service]):
+    """A page of services, with facet counts when requested"""
+    facets: Optional[ServiceFacets] = None
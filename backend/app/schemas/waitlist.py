@@ -0,0 +1,36 @@
+from pydantic import BaseModel, model_validator
+from datetime import datetime, timezone
+from typing import Optional
+from ..models.waitlist import WaitlistStatus
+
+
+class WaitlistEntryCreate(BaseModel):
+    service_id: int
+    window_start: datetime
+    window_end: datetime
+
+    @model_validator(mode="after")
+    def check_window(self):
+        # Naive times are taken as UTC, like booking times
+        if self.window_start.tzinfo is None:
+            self.window_start = self.window_start.replace(tzinfo=timezone.utc)
+        if self.window_end.tzinfo is None:
+            self.window_end = self.window_end.replace(tzinfo=timezone.utc)
+        if self.window_end <= self.window_start:
+            raise ValueError("window_end must be after window_start")
+        return self
+
+
+class WaitlistEntry(BaseModel):
+    id: int
+    service_id: int
+    customer_id: int
+    window_start: datetime
+    window_end: datetime
+    status: WaitlistStatus
+    booking_id: Optional[int] = None
+    offer_expires_at: Optional[datetime] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
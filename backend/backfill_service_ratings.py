@@ -0,0 +1,24 @@
+"""
+Backfill/repair script for the denormalized service rating aggregates
+Recomputes services.rating_sum and services.review_count from the reviews table
+
+Usage:
+    python backfill_service_ratings.py              # all services
+    python backfill_service_ratings.py 12 57 203    # specific service ids
+"""
+import asyncio
+import sys
+from app.database import SessionLocal
+from app.core.ratings import recompute_service_ratings
+
+
+async def backfill_service_ratings(service_ids=None):
+    async with SessionLocal() as db:
+        updated = await recompute_service_ratings(db, service_ids)
+        await db.commit()
+        print(f"✅ Recomputed rating aggregates for {updated} service(s)")
+
+
+if __name__ == "__main__":
+    ids = [int(arg) for arg in sys.argv[1:]] or None
+    asyncio.run(backfill_service_ratings(ids))
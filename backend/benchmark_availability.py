@@ -0,0 +1,85 @@
+"""
+Benchmark: batch availability vs one call per service per day
+Picks services from GET /services/ on a running server, then fetches
+their availability over a date window twice: with one
+GET /availability/{provider_id}?service_id=... call per service and day
+(what a search page would otherwise do), and with a single
+POST /availability/batch. Each round uses a fresh window so the
+response cache does not hide the cost.
+
+Usage:
+    python benchmark_availability.py [services] [days] [rounds]
+"""
+import asyncio
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+import httpx
+
+BASE_URL = "http://localhost:8000/api/v1"
+
+
+async def single_calls(client, services, start: date, days: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        client.get(
+            f"{BASE_URL}/availability/{service['provider_id']}",
+            params={
+                "start_date": (start + timedelta(days=d)).isoformat(),
+                "service_id": service["id"],
+            },
+        )
+        for service in services
+        for d in range(days)
+    ))
+    return (time.perf_counter() - started) * 1000
+
+
+async def batch_call(client, services, start: date, days: int, fmt: str) -> float:
+    started = time.perf_counter()
+    resp = await client.post(f"{BASE_URL}/availability/batch", json={
+        "service_ids": [s["id"] for s in services],
+        "start_date": start.isoformat(),
+        "end_date": (start + timedelta(days=days - 1)).isoformat(),
+        "format": fmt,
+    })
+    resp.raise_for_status()
+    return (time.perf_counter() - started) * 1000
+
+
+async def main(count: int, days: int, rounds: int):
+    limits = httpx.Limits(max_connections=20)
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        resp = await client.get(f"{BASE_URL}/services/", params={"limit": count})
+        resp.raise_for_status()
+        services = [s for s in resp.json() if s.get("provider_id") is not None]
+        if not services:
+            print("No services with a provider found. Seed the database first.")
+            sys.exit(1)
+        print(f"{len(services)} services x {days} days, {rounds} rounds\n")
+
+        timings = {"single": [], "batch slots": [], "batch bitmap": []}
+        for r in range(rounds):
+            # A fresh window per mode and round misses the response cache
+            base = date.today() + timedelta(days=7 + r * 3 * days)
+            timings["single"].append(await single_calls(client, services, base, days))
+            timings["batch slots"].append(
+                await batch_call(client, services, base + timedelta(days=days), days, "slots"))
+            timings["batch bitmap"].append(
+                await batch_call(client, services, base + timedelta(days=2 * days), days, "bitmap"))
+
+    requests = {"single": len(services) * days, "batch slots": 1, "batch bitmap": 1}
+    for label, values in timings.items():
+        print(
+            f"{label:13} {requests[label]:5} requests  "
+            f"median {statistics.median(values):8.1f} ms  "
+            f"min {min(values):8.1f} ms  max {max(values):8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    asyncio.run(main(count, days, rounds))
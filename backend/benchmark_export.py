@@ -0,0 +1,78 @@
+"""
+Benchmark: memory of the streaming booking export vs loading ORM objects
+Runs against the configured database. For growing row counts it drains
+the NDJSON export generator (what GET /admin/bookings/export sends) and,
+for comparison, loads the same bookings as ORM objects with their
+service and customer eagerly loaded (what the paged listings do, without
+a page limit). Peak Python memory is measured with tracemalloc; the
+streaming peak should stay flat as the row count grows.
+
+Usage:
+    python benchmark_export.py [max_rows]
+"""
+import asyncio
+import sys
+import time
+import tracemalloc
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+from app.database import SessionLocal, engine
+from app.models.booking import Booking
+from app.core.export import booking_export_query, stream_export
+
+
+async def measure(label: str, run) -> None:
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows, size = await run()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<8} {rows:>9} rows  {size / 1e6:>8.1f} MB out  "
+          f"peak {peak / 1e6:>7.1f} MB  {elapsed:>6.2f}s")
+
+
+async def main(max_rows: int):
+    engine.sync_engine.echo = False
+    async with SessionLocal() as db:
+        total = await db.scalar(select(func.count(Booking.id)))
+    if not total:
+        print("No bookings found. Seed the database first.")
+        sys.exit(1)
+
+    limits = []
+    limit = 1000
+    while limit < min(total, max_rows):
+        limits.append(limit)
+        limit *= 10
+    limits.append(min(total, max_rows))
+    print(f"{total} bookings in the database\n")
+
+    for limit in limits:
+        print(f"{limit} rows:")
+
+        async def streamed():
+            rows = size = 0
+            async for chunk in stream_export(booking_export_query().limit(limit), "ndjson"):
+                rows += chunk.count(b"\n")
+                size += len(chunk)
+            return rows, size
+
+        async def loaded():
+            async with SessionLocal() as db:
+                result = await db.execute(
+                    select(Booking)
+                    .options(selectinload(Booking.service), selectinload(Booking.customer))
+                    .order_by(Booking.id)
+                    .limit(limit)
+                )
+                bookings = result.scalars().all()
+                return len(bookings), 0
+
+        await measure("stream", streamed)
+        await measure("orm", loaded)
+        print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
@@ -0,0 +1,94 @@
+"""
+Benchmark: "near me" service queries on a geohash-indexed catalog
+Loads synthetic services (1M by default) with random coordinates across
+the continental US inside a transaction, runs the radius/bounding-box
+queries used by list_services under EXPLAIN ANALYZE, then rolls back.
+
+Run migrations first (the geohash columns and index must exist).
+
+Usage:
+    python benchmark_geo.py [rows]
+"""
+import asyncio
+import random
+import sys
+import time
+from sqlalchemy import insert, select, text
+from sqlalchemy.dialects import postgresql
+from app.database import SessionLocal
+from app.models.service import Service
+from app.core.geo import apply_geo_filter, geohash_encode
+
+DEFAULT_ROWS = 1_000_000
+BATCH_SIZE = 5_000
+TARGET_MS = 10.0
+
+# (label, lat, lng, radius_km, bbox)
+SCENARIOS = [
+    ("Austin 2km", 30.2672, -97.7431, 2, None),
+    ("Austin 10km", 30.2672, -97.7431, 10, None),
+    ("Chicago 25km", 41.8781, -87.6298, 25, None),
+    ("Denver bbox", None, None, None, (39.60, -105.10, 39.90, -104.80)),
+]
+
+
+def compile_sql(query) -> str:
+    return str(query.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    ))
+
+
+async def load_catalog(db, rows: int):
+    print(f"Loading {rows:,} synthetic services...")
+    started = time.perf_counter()
+    rng = random.Random(42)
+    for offset in range(0, rows, BATCH_SIZE):
+        batch = []
+        for i in range(offset, min(offset + BATCH_SIZE, rows)):
+            lat = rng.uniform(25.0, 49.0)
+            lng = rng.uniform(-124.0, -67.0)
+            batch.append({
+                "name": f"Benchmark service {i}",
+                "price": 50.0,
+                "duration_minutes": 60,
+                "latitude": lat,
+                "longitude": lng,
+                "geohash": geohash_encode(lat, lng),
+            })
+        await db.execute(insert(Service), batch)
+    await db.execute(text("ANALYZE services"))
+    print(f"Loaded in {time.perf_counter() - started:.1f}s\n")
+
+
+async def benchmark_geo(rows: int):
+    async with SessionLocal() as db:
+        await load_catalog(db, rows)
+
+        summary = []
+        for label, lat, lng, radius_km, bbox in SCENARIOS:
+            query, distance = apply_geo_filter(
+                select(Service.id, Service.name), Service, lat, lng, radius_km, bbox)
+            if distance is not None:
+                query = query.add_columns(distance.label("distance_km")).order_by(distance)
+            query = query.limit(20)
+
+            result = await db.execute(
+                text("EXPLAIN (ANALYZE, BUFFERS) " + compile_sql(query)))
+            plan = [row[0] for row in result.all()]
+            print(f"--- {label}")
+            print("\n".join(plan))
+            print()
+            exec_line = next(l for l in plan if l.startswith("Execution Time"))
+            summary.append((label, float(exec_line.split()[2])))
+
+        await db.rollback()
+
+    print("=== Summary")
+    for label, ms in summary:
+        verdict = "OK" if ms < TARGET_MS else f"SLOWER THAN {TARGET_MS}ms"
+        print(f"{label:20} {ms:8.3f} ms  {verdict}")
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    asyncio.run(benchmark_geo(rows))
@@ -0,0 +1,104 @@
+"""
+Benchmark: legacy `ILIKE '%term%'` service search vs. full-text + trigram search
+Loads a synthetic catalog (1M services by default) inside a transaction,
+prints the EXPLAIN ANALYZE plan and timing for both strategies, then rolls
+everything back so the database is left untouched.
+
+Run migrations first (the search trigger and GIN indexes must exist).
+
+Usage:
+    python benchmark_search.py [rows] [term ...]
+"""
+import asyncio
+import sys
+import time
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+from app.database import SessionLocal
+from app.models.service import Service
+from app.core.search import apply_service_search
+
+DEFAULT_ROWS = 1_000_000
+DEFAULT_TERMS = ["yoga", "deep cleaning", "plumbr", "portrait photography downtown"]
+
+WORDS = [
+    "cleaning", "plumbing", "yoga", "massage", "portrait", "wedding", "haircut",
+    "grooming", "training", "repair", "detailing", "consulting", "makeup",
+    "pilates", "tutoring", "electrical", "painting", "gardening", "moving",
+    "photography", "therapy", "nails", "spa", "coaching", "accounting",
+]
+CITIES = ["Downtown", "Uptown", "Riverside", "Harbor", "Old Town", "Westside"]
+
+
+def compile_sql(query) -> str:
+    return str(query.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    ))
+
+
+async def load_catalog(db, rows: int):
+    print(f"Loading {rows:,} synthetic services...")
+    started = time.perf_counter()
+    await db.execute(
+        text("""
+            INSERT INTO services (name, description, price, duration_minutes, location)
+            SELECT
+                initcap(w[1 + (g % :n)] || ' ' || w[1 + ((g / 7) % :n)]),
+                'Professional ' || w[1 + ((g / 3) % :n)] || ' and ' ||
+                    w[1 + ((g / 11) % :n)] || ' service #' || g,
+                10 + (g % 200),
+                30 + 15 * (g % 8),
+                c[1 + (g % :c)]
+            FROM generate_series(1, :rows) AS g,
+                 (SELECT CAST(:words AS text[]) AS w, CAST(:cities AS text[]) AS c) AS v
+        """),
+        {"rows": rows, "words": WORDS, "n": len(WORDS),
+         "cities": CITIES, "c": len(CITIES)},
+    )
+    await db.execute(text("ANALYZE services"))
+    print(f"Loaded in {time.perf_counter() - started:.1f}s\n")
+
+
+async def explain(db, label: str, query):
+    result = await db.execute(
+        text("EXPLAIN (ANALYZE, BUFFERS) " + compile_sql(query)))
+    plan = [row[0] for row in result.all()]
+    print(f"--- {label}")
+    print("\n".join(plan))
+    print()
+    return next((line for line in plan if line.startswith("Execution Time")), "")
+
+
+async def benchmark_search(rows: int, terms):
+    async with SessionLocal() as db:
+        await load_catalog(db, rows)
+
+        summary = []
+        for term in terms:
+            legacy = (
+                select(Service)
+                .where(Service.name.ilike(f"%{term}%"))
+                .limit(20)
+            )
+            ranked, rank, highlight = apply_service_search(select(Service), term)
+            ranked = (
+                ranked.add_columns(rank.label("search_rank"), highlight.label("highlight"))
+                .order_by(rank.desc(), Service.id)
+                .limit(20)
+            )
+
+            legacy_time = await explain(db, f"ILIKE  '{term}'", legacy)
+            ranked_time = await explain(db, f"SEARCH '{term}'", ranked)
+            summary.append((term, legacy_time, ranked_time))
+
+        await db.rollback()
+
+    print("=== Summary")
+    for term, legacy_time, ranked_time in summary:
+        print(f"{term!r:40} ILIKE: {legacy_time:30} SEARCH: {ranked_time}")
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    terms = sys.argv[2:] or DEFAULT_TERMS
+    asyncio.run(benchmark_search(rows, terms))
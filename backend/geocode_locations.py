@@ -0,0 +1,55 @@
+"""
+Geocode services and provider profiles from the local gazetteer
+Fills latitude/longitude/geohash for rows whose free-form location matches
+an entry in data/gazetteer.csv. No network access is needed.
+
+Usage:
+    python geocode_locations.py          # rows that are not geocoded yet
+    python geocode_locations.py --all    # re-geocode every row
+"""
+import asyncio
+import sys
+from sqlalchemy import select
+from app.database import SessionLocal
+from app.models.service import Service
+from app.models.provider import ProviderProfile
+from app.core.geo import geo_fields
+from app.core.cache import invalidate_tags
+
+BATCH_SIZE = 1000
+
+
+async def geocode_table(db, model, redo: bool):
+    matched = unmatched = 0
+    last_id = 0
+    while True:
+        query = select(model).where(model.id > last_id, model.location.is_not(None))
+        if not redo:
+            query = query.where(model.geohash.is_(None))
+        result = await db.execute(query.order_by(model.id).limit(BATCH_SIZE))
+        rows = result.scalars().all()
+        if not rows:
+            break
+        for row in rows:
+            fields = geo_fields(row.location)
+            if fields["geohash"] is None:
+                unmatched += 1
+                continue
+            for field, value in fields.items():
+                setattr(row, field, value)
+            matched += 1
+        last_id = rows[-1].id
+        await db.commit()
+    print(f"{model.__tablename__}: geocoded {matched}, no gazetteer match for {unmatched}")
+
+
+async def geocode_locations(redo: bool = False):
+    async with SessionLocal() as db:
+        await geocode_table(db, Service, redo)
+        await geocode_table(db, ProviderProfile, redo)
+    await invalidate_tags("services", "providers")
+    print("✅ Geocoding complete")
+
+
+if __name__ == "__main__":
+    asyncio.run(geocode_locations(redo="--all" in sys.argv[1:]))
@@ -1,9 +1,12 @@
 import asyncio
+from sqlalchemy import text
 from app.database import engine, Base
 from app.models import *
 
 async def init_db():
     async with engine.begin() as conn:
+        # GiST exclusion constraints on integer columns need btree_gist
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
         await conn.run_sync(Base.metadata.create_all)
     print("Database tables created!")
 
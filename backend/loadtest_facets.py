@@ -0,0 +1,75 @@
+"""
+Load test: latency impact of facets=true on GET /services/
+Fires the same listing queries with and without facets against a running
+server and prints latency percentiles and throughput for each mode.
+Each request varies limit/skip so the response cache does not hide the
+query cost.
+
+Usage:
+    python loadtest_facets.py [requests] [concurrency]
+"""
+import asyncio
+import statistics
+import sys
+import time
+import httpx
+
+BASE_URL = "http://localhost:8000/api/v1"
+
+QUERIES = [
+    {},
+    {"min_price": 20, "max_price": 200},
+    {"search": "cleaning"},
+    {"sort": "rating", "order": "desc"},
+]
+
+
+async def run_mode(client, facets: bool, total: int, concurrency: int, first: int = 0):
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        params = dict(QUERIES[i % len(QUERIES)])
+        # Vary the page size so every request misses the response cache
+        params["limit"] = 10 + (i % 90)
+        params["skip"] = i // 90
+        if facets:
+            params["facets"] = "true"
+        async with semaphore:
+            started = time.perf_counter()
+            resp = await client.get(f"{BASE_URL}/services/", params=params)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if resp.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(first, first + total)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+    label = "facets=true " if facets else "facets=false"
+    print(
+        f"{label}  p50 {pct(50):7.1f} ms  p95 {pct(95):7.1f} ms  "
+        f"p99 {pct(99):7.1f} ms  mean {statistics.mean(latencies):7.1f} ms  "
+        f"{total / elapsed:7.1f} req/s  errors {errors}"
+    )
+
+
+async def main(total: int, concurrency: int):
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        # Warm up connections and the database on a disjoint key range
+        print("--- warm-up ---")
+        await run_mode(client, False, min(total, 50), concurrency, first=total)
+        print("--- measured ---")
+        await run_mode(client, False, total, concurrency)
+        await run_mode(client, True, total, concurrency)
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    asyncio.run(main(total, concurrency))
@@ -0,0 +1,103 @@
+"""
+Load test: latency of unrelated endpoints during a login burst
+Measures GET /health and GET /services/ latency percentiles on a running
+server at rest, then again while a burst of concurrent logins runs. With
+bcrypt on the dedicated hashing pool the p99 of the unrelated requests
+should stay close to the baseline; logins beyond the pool's queue limit
+come back as 503 with Retry-After instead of stalling the worker.
+
+Start the server with RATE_LIMIT_ENABLED=false: a burst of logins from
+one address is exactly what the per-IP auth throttle rejects.
+
+Usage:
+    python loadtest_login.py EMAIL PASSWORD [logins] [concurrency] [probes]
+"""
+import asyncio
+import statistics
+import sys
+import time
+import httpx
+
+BASE_URL = "http://localhost:8000/api/v1"
+ROOT_URL = BASE_URL.rsplit("/api/", 1)[0]
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def probe(client, count: int = 0, stop: asyncio.Event = None):
+    """Sequential requests to cheap endpoints, `count` of them or until
+    `stop` is set; returns latencies in ms."""
+    latencies = []
+    i = 0
+    while (stop is None and i < count) or (stop is not None and not stop.is_set()):
+        url = f"{ROOT_URL}/health" if i % 2 else f"{BASE_URL}/services/"
+        params = {} if i % 2 else {"limit": 1 + i % 50}
+        started = time.perf_counter()
+        await client.get(url, params=params)
+        latencies.append((time.perf_counter() - started) * 1000)
+        i += 1
+    return latencies
+
+
+async def login_burst(client, email: str, password: str, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    codes = {}
+
+    async def one():
+        async with semaphore:
+            resp = await client.post(
+                f"{BASE_URL}/auth/login", data={"username": email, "password": password})
+            codes[resp.status_code] = codes.get(resp.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return codes, time.perf_counter() - started
+
+
+def report(label: str, latencies):
+    print(f"  {label:<12} n={len(latencies):<5} "
+          f"p50={statistics.median(latencies):7.1f}ms  "
+          f"p95={percentile(latencies, 0.95):7.1f}ms  "
+          f"p99={percentile(latencies, 0.99):7.1f}ms  "
+          f"max={max(latencies):7.1f}ms")
+
+
+async def main(email: str, password: str, logins: int, concurrency: int, probes: int):
+    limits = httpx.Limits(max_connections=concurrency + 10)
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        resp = await client.post(
+            f"{BASE_URL}/auth/login", data={"username": email, "password": password})
+        if resp.status_code != 200:
+            print(f"Login as {email} failed ({resp.status_code}); pass valid credentials.")
+            sys.exit(1)
+
+        print(f"{logins} logins at concurrency {concurrency}, {probes} baseline probes\n")
+        baseline = await probe(client, probes)
+
+        stop = asyncio.Event()
+        probing = asyncio.create_task(probe(client, stop=stop))
+        codes, elapsed = await login_burst(client, email, password, logins, concurrency)
+        stop.set()
+        during = await probing
+
+        print("Unrelated requests:")
+        report("baseline", baseline)
+        report("during burst", during)
+        print(f"\nLogins: {codes} in {elapsed:.1f}s ({logins / elapsed:.1f}/s)")
+        print(f"p99 change: {percentile(during, 0.99) - percentile(baseline, 0.99):+.1f}ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    asyncio.run(main(
+        sys.argv[1],
+        sys.argv[2],
+        int(sys.argv[3]) if len(sys.argv) > 3 else 200,
+        int(sys.argv[4]) if len(sys.argv) > 4 else 50,
+        int(sys.argv[5]) if len(sys.argv) > 5 else 200,
+    ))
@@ -0,0 +1,19 @@
+"""
+Rebuild script for the service popularity ranking
+Recomputes service_popularity from bookings, reviews and favorites
+Run after bulk imports or to repair drift from the incremental updates
+"""
+import asyncio
+from app.database import SessionLocal
+from app.core.popularity import rebuild_popularity
+
+
+async def main():
+    async with SessionLocal() as db:
+        scored = await rebuild_popularity(db)
+        await db.commit()
+        print(f"✅ Rebuilt popularity scores for {scored} service(s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
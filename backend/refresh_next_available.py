@@ -0,0 +1,36 @@
+"""
+Refresh script for services.next_available_at
+Recomputes the earliest open slot of every service in batches
+Run after the migration that adds the column, or to repair drift
+"""
+import asyncio
+from sqlalchemy import select
+from app.database import SessionLocal
+from app.models.service import Service
+from app.core.availability import refresh_next_available, ROLLOVER_BATCH_SIZE
+
+
+async def main():
+    total = available = 0
+    last_id = 0
+    async with SessionLocal() as db:
+        while True:
+            result = await db.execute(
+                select(Service.id)
+                .where(Service.id > last_id)
+                .order_by(Service.id)
+                .limit(ROLLOVER_BATCH_SIZE)
+            )
+            batch = result.scalars().all()
+            if not batch:
+                break
+            values = await refresh_next_available(db, batch)
+            await db.commit()
+            total += len(batch)
+            available += sum(1 for at in values.values() if at is not None)
+            last_id = batch[-1]
+    print(f"✅ Refreshed next_available_at for {total} service(s), {available} with an open slot")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
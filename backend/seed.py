@@ -6,6 +6,7 @@ from app.models.user import User, UserRole
 from app.models.service import Service, Category
 from app.models.provider import ProviderProfile
 from app.core.security import get_password_hash
+from app.core.categories import notify_categories_changed
 
 
 async def seed():
@@ -80,6 +81,7 @@ async def seed():
             db.add(service)
             print(f"Created user {data['email']} with service")
 
+        await notify_categories_changed(db)
         await db.commit()
         print("Database seeded successfully!")
 
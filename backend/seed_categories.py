@@ -7,6 +7,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import SessionLocal
 from app.models.service import Category
+from app.core.categories import notify_categories_changed
 
 
 async def seed_categories():
@@ -82,6 +83,8 @@ async def seed_categories():
                 db.add(category)
                 print(f"Created category: {cat_data['name']}")
 
+        # Running API processes drop their cached category listing on commit
+        await notify_categories_changed(db)
         await db.commit()
         print("\n✅ Categories seeded successfully!")
         print(f"Total categories: {len(categories_data)}")
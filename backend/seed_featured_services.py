@@ -11,6 +11,8 @@ from app.models.service import Service, Category
 from app.models.provider import ProviderProfile
 from app.models.review import Review
 from app.core.security import get_password_hash
+from app.core.ratings import apply_review_delta
+from app.core.categories import notify_categories_changed
 
 
 async def seed_featured_services():
@@ -215,12 +217,14 @@ async def seed_featured_services():
                         comment=f"Great service! {'Highly recommend.' if rating == 5.0 else 'Good experience.'}"
                     )
                     db.add(review)
+                    await apply_review_delta(db, service.id, rating, 1)
                     sample_reviews.append(review)
                 
                 print(f"Created service: {service_data['title']} with {len(sample_reviews)} reviews")
             else:
                 print(f"Service {service_data['title']} already exists, skipping...")
         
+        await notify_categories_changed(db)
         await db.commit()
         print("\n✅ Featured services seeded successfully!")
         print("Note: Run migrations first if the 'location' column doesn't exist")
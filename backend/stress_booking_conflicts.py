@@ -0,0 +1,107 @@
+"""
+Stress test: concurrent bookings of one slot.
+Registers a batch of customers, then has all of them book the same slot
+of one service at once through POST /bookings/ (or POST
+/payments/create-checkout for a free service with --checkout) and checks
+that exactly one request wins and every other one gets 409.
+
+Start the server with RATE_LIMIT_ENABLED=false: every registration,
+login and booking comes from one address, far past the per-IP limits.
+A 429 anywhere is reported as a setup error, not a failed check.
+
+Usage:
+    python stress_booking_conflicts.py <service_id> [requests] [--checkout]
+"""
+import asyncio
+import sys
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+import httpx
+
+BASE_URL = "http://localhost:8000/api/v1"
+# Meets the register rules: 8+ characters, upper and lower case, a digit
+PASSWORD = "Stress-Password-1"
+
+
+RATE_LIMITED = "Rate limited (429): restart the server with RATE_LIMIT_ENABLED=false"
+
+
+def check(resp: httpx.Response) -> None:
+    if resp.status_code == 429:
+        print(f"❌ {RATE_LIMITED}")
+        sys.exit(2)
+    resp.raise_for_status()
+
+
+async def customer_token(client: httpx.AsyncClient, run_id: str, i: int) -> str:
+    email = f"stress-{run_id}-{i}@test.com"
+    check(await client.post(f"{BASE_URL}/auth/register", json={
+        "email": email,
+        "password": PASSWORD,
+        "full_name": f"Stress Customer {i}",
+        "role": "customer",
+    }))
+    resp = await client.post(f"{BASE_URL}/auth/login", data={
+        "username": email,
+        "password": PASSWORD,
+    })
+    check(resp)
+    return resp.json()["access_token"]
+
+
+async def main(service_id: int, total: int, checkout: bool):
+    run_id = uuid.uuid4().hex[:8]
+    # A distinct far-future slot per run, so earlier runs don't hold it
+    start = (datetime.now(timezone.utc) + timedelta(days=365 + int(run_id, 16) % 3650)).replace(
+        minute=0, second=0, microsecond=0)
+
+    limits = httpx.Limits(max_connections=total)
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        print(f"Registering {total} customers...")
+        semaphore = asyncio.Semaphore(20)
+
+        async def login(i):
+            async with semaphore:
+                return await customer_token(client, run_id, i)
+
+        tokens = await asyncio.gather(*(login(i) for i in range(total)))
+
+        url = f"{BASE_URL}/payments/create-checkout" if checkout else f"{BASE_URL}/bookings/"
+        body = {"service_id": service_id, "start_time": start.isoformat()}
+
+        # Release every request together
+        gate = asyncio.Event()
+
+        async def book(token):
+            await gate.wait()
+            resp = await client.post(url, json=body, headers={"Authorization": f"Bearer {token}"})
+            return resp.status_code
+
+        tasks = [asyncio.create_task(book(t)) for t in tokens]
+        await asyncio.sleep(0.1)
+        gate.set()
+        codes = Counter(await asyncio.gather(*tasks))
+
+    print(f"Slot {start.isoformat()}: " + ", ".join(
+        f"{code} x{count}" for code, count in sorted(codes.items())))
+    if codes.get(429):
+        print(f"❌ {RATE_LIMITED}")
+        sys.exit(2)
+    winners = codes.get(200 if checkout else 201, 0)
+    conflicts = codes.get(409, 0)
+    if winners == 1 and conflicts == total - 1:
+        print("✅ Exactly one booking won, every other request got 409")
+    else:
+        print(f"❌ Expected 1 winner and {total - 1} conflicts")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    service_id = int(args[0])
+    total = int(args[1]) if len(args) > 1 else 300
+    asyncio.run(main(service_id, total, "--checkout" in sys.argv))